@@ -45,12 +45,19 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'kumbh.middleware.MetricsMiddleware',
+    'kumbh.middleware.TracingMiddleware',
+    'kumbh.middleware.CompressionMiddleware',
+    'kumbh.middleware.LoadSheddingMiddleware',
+    'kumbh.middleware.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'kumbh.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'kumbh.middleware.PresenceMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -76,17 +83,95 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Production SQLite mode (see core/sqlite/base.py): WAL and tuned pragmas on
+# every connection, one writing thread per database file in each process, and
+# transactions that take the write lock up front so they never fail upgrading.
+# Run `manage.py sqlite_maintenance` periodically to checkpoint and analyze.
+# WAL rewrites the file header, so no database file is kept in git: create
+# them with `manage.py migrate` for each alias, then `manage.py loaddata seed`
+# for the sample zones and amenities.
+SQLITE_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'single_writer': True,
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # durable across crashes of the app, not of the OS
+        'busy_timeout': 5000,  # milliseconds a writer waits for another process
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # KiB per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+# 'sos' and 'locations' hold the high-write tables routed by
+# kumbh.routers.HotTableRouter, each in its own file with its own writer.
+# After adding them to an existing install, run `manage.py migrate --database
+# sos`, the same for locations, then `manage.py move_hot_tables`.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': SQLITE_OPTIONS,
+    },
+    'sos': {
+        'ENGINE': 'core.sqlite',
+        'NAME': BASE_DIR / 'db-sos.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+    },
+    'locations': {
+        'ENGINE': 'core.sqlite',
+        'NAME': BASE_DIR / 'db-locations.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+    },
+}
+
+DATABASE_ROUTERS = ['kumbh.routers.HotTableRouter', 'kumbh.routers.ReplicaRouter']
+HOT_TABLE_DATABASES = {
+    'kumbh.sosrequest': 'sos',
+    'kumbh.familymember': 'locations',
+}
+
+# 'default' is local to each worker process. State that every worker must
+# agree on goes in 'shared': a directory of files, which the workers of one
+# host all see. When serving from more than one host, point 'shared' at
+# Redis or Memcached instead, e.g.
+# {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'}.
+#
+# A file cache past MAX_ENTRIES deletes a random third of its files, live or
+# not, so it is sized above every key the settings below keep: a position and
+# a presence entry per pilgrim, a replica pin per client and two throttle
+# buckets per client and view. Expired files count until the hourly
+# prune_file_caches job deletes them. Each set() lists the directory to count
+# its entries, which slows as it fills; past a few hundred thousand keys use
+# Redis or Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 200_000},
+    },
 }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Password hashing runs on a bounded pool (see user/hashing.py)
+AUTHENTICATION_BACKENDS = [
+    'user.backends.PooledModelBackend',
+]
+
+PASSWORD_HASHERS = [
+    'user.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -120,6 +205,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded photos and their thumbnails (see kumbh/photos.py)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Scheme and host put in front of photo URLs in API responses, e.g.
+# 'https://kumbh.example.org'. Empty sends them relative to the API host.
+PUBLIC_BASE_URL = ''
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -130,12 +222,24 @@ AUTH_USER_MODEL = 'user.User'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # Same bytes as DRF's JSONRenderer, faster (see kumbh/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'kumbh.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'kumbh.throttling.TokenBucketThrottle',
+    ],
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # 'ip' throttle buckets key on the address the last of them saw; with 0
+    # the header is ignored, as clients can send any value in it.
+    'NUM_PROXIES': 0,
 }
 
 # JWT Settings
@@ -147,3 +251,136 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+
+# Realtime family location stream (see kumbh/realtime.py)
+# LocalBroker only fans out within one process; use a shared broker class
+# with the same interface when running several ASGI workers, or to push the
+# lost & found subscription matches found by `run_jobs`.
+REALTIME_BROKER = 'kumbh.realtime.LocalBroker'
+# Pending updates buffered per WebSocket client before the oldest are dropped
+REALTIME_QUEUE_SIZE = 32
+
+# Presence tracking (see kumbh/presence.py), all values in seconds
+PRESENCE_ONLINE_TTL = 60
+PRESENCE_AWAY_TTL = 15 * 60
+# Heartbeats older than this are forgotten and the user reports as offline
+PRESENCE_RETENTION = 24 * 60 * 60
+# Heartbeats are copied to this cache, which every worker must share, at most
+# once per PRESENCE_WRITE_INTERVAL per user
+PRESENCE_CACHE = 'shared'
+PRESENCE_WRITE_INTERVAL = 15
+
+# Background jobs (see kumbh/jobs.py and `python manage.py run_jobs`)
+JOBS_RETRY_BACKOFF = 30  # seconds before the first retry, doubled per attempt
+JOBS_STALE_AFTER = 15 * 60  # seconds before a running job is requeued
+INVITATION_RETENTION_DAYS = 30
+JOB_RETENTION_DAYS = 7
+
+# Users' last positions (see kumbh/locations.py). The cache must be shared by
+# every worker; misses are read back from the family member rows.
+LOCATION_CACHE = 'shared'
+LOCATION_CACHE_TTL = 6 * 60 * 60  # seconds
+
+# Lost/found matching engine (see kumbh/matching.py)
+MATCH_MIN_SCORE = 0.55  # pairs scoring below this are not stored
+MATCH_MAX_CANDIDATES = 20  # best pairs kept per new report
+MATCH_BLOCK_LIMIT = 500  # most recent candidates scored per report
+
+# Photo uploads (see kumbh/photos.py)
+PHOTO_MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # bytes
+PHOTO_THUMBNAIL_SIZES = (160, 640)  # longest edge in pixels, smallest is used in lists
+PHOTO_THUMBNAIL_WORKERS = 2  # processes rendering thumbnails off the request
+
+# Authenticated users cached in-process between requests (see user/authentication.py)
+AUTH_USER_CACHE_TTL = 60  # seconds; also bounds staleness across worker processes
+AUTH_USER_CACHE_SIZE = 10000
+
+# Password hashing pool (see user/hashing.py)
+PASSWORD_HASHING_WORKERS = 4  # threads hashing at once, roughly the cores given to logins
+# Calls allowed to wait before new ones get a 503. Waiting calls hold request
+# threads, so keep workers + queue well below the threads per process.
+PASSWORD_HASHING_QUEUE = 12
+PASSWORD_HASHING_RETRY_AFTER = 2  # seconds, sent as Retry-After with the 503
+# PBKDF2 cost for new hashes; Django's default is 1,000,000. Lower it during
+# the festival peak to make registrations cheaper; existing hashes keep theirs.
+PASSWORD_HASH_ITERATIONS = 1_000_000
+
+# Revoked JWTs (see user/revocation.py)
+TOKEN_REVOCATION_SYNC_INTERVAL = 5  # seconds between each worker's pull of new revocations
+TOKEN_REVOCATION_CAPACITY = 100000  # Bloom filter size before it is rebuilt larger
+TOKEN_REVOCATION_ERROR_RATE = 0.001
+
+# Token-bucket limits per view (see kumbh/throttling.py). Keys are view names,
+# optionally with ':<METHOD>'. Pilgrims often share a carrier NAT address, so
+# per-IP limits are kept generous and tighter limits go on 'user' buckets.
+# Raising an SOS (sos_requests_list:POST) is always exempt. The cache must be
+# shared by every worker, or each one allows the full rate.
+THROTTLE_CACHE = 'shared'
+THROTTLE_BUCKETS = {
+    'register': {'ip': '20/min'},
+    'login': {'ip': '60/min'},
+    'refresh_token': {'ip': '60/min'},
+    'create_family_invitation': {'ip': '60/min', 'user': '10/min'},
+    'lost_found_list:GET': {'ip': '300/min', 'user': '60/min'},
+    'lost_found_list:POST': {'ip': '60/min', 'user': '10/min'},
+    'photos_upload': {'ip': '60/min', 'user': '20/min'},
+}
+
+# Load shedding per worker process (see kumbh/load_shedding.py). Load 1.0 is
+# LOAD_SHEDDING_MAX_IN_FLIGHT concurrent requests or an average latency of
+# LOAD_SHEDDING_TARGET_LATENCY seconds, whichever is reached first.
+LOAD_SHEDDING_ENABLED = True
+LOAD_SHEDDING_MAX_IN_FLIGHT = 64
+LOAD_SHEDDING_TARGET_LATENCY = 0.5  # seconds
+LOAD_SHEDDING_THRESHOLDS = {'bulk': 0.7, 'read': 0.85, 'normal': 1.0}  # load at which each priority is shed
+LOAD_SHEDDING_RETRY_AFTER = 5  # seconds, sent with the 503
+LOAD_SHEDDING_CACHE = 'default'
+LOAD_SHEDDING_STALE_TTL = 60 * 60  # seconds a stale copy of a read can be served
+LOAD_SHEDDING_STALE_REFRESH = 30  # seconds between refreshes of the stale copy of one URL
+
+# Read-through response cache with stale-while-revalidate (see kumbh/response_cache.py).
+# TTLs are seconds a response is served before one request refreshes it;
+# saves to the underlying models make it stale immediately.
+RESPONSE_CACHE = 'default'
+RESPONSE_CACHE_TTLS = {
+    'zones': 60,
+    'amenities': 60,
+    'amenity_categories': 24 * 60 * 60,
+    'lost_found': 10,
+}
+RESPONSE_CACHE_STALE_TTL = 60 * 60  # seconds a stale response is kept to serve during a refresh
+
+# Read replicas (see kumbh.routers.ReplicaRouter). List aliases of DATABASES
+# that replicate 'default'; give each TEST = {'MIRROR': 'default'} so tests
+# read what they write. Locally an SQLite file refreshed with `manage.py
+# sync_replica` can stand in for one.
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_SECONDS = 5  # a client reads from the primary this long after it writes; keep above replica lag
+DATABASE_REPLICA_PIN_CACHE = 'shared'  # must be shared by every worker, or a write can be followed by a stale read
+
+# Response compression (see kumbh/middleware.py CompressionMiddleware). Brotli
+# needs the brotli package from requirements.txt; without it only gzip is offered.
+# Levels are Brotli quality (0-11) and gzip level (1-9).
+COMPRESSION_MIN_SIZE = 512  # bytes; smaller bodies are sent as they are
+COMPRESSION_LEVELS = {'br': 5, 'gzip': 6}  # compressed on every request
+COMPRESSION_CACHED_LEVELS = {'br': 9, 'gzip': 9}  # compressed once per response cache version
+COMPRESSION_CACHE = 'default'
+COMPRESSION_CACHE_TTL = 60 * 60  # seconds a compressed cached response is kept
+
+# Per-view request metrics, served to staff at /metrics (see kumbh/metrics.py).
+# Each worker process writes its counters to a file in METRICS_DIR, folded into
+# retired.json once it exits. Keep the directory local to the host.
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5.0  # seconds between writes of a worker's file
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # latency histogram, seconds
+
+# On-demand profiles of staff API requests made with ?__profile=1 (see kumbh/profiling.py)
+PROFILING_INTERVAL = 0.001  # seconds between stack samples
+
+# Request tracing (see kumbh/tracing.py). Sampled requests are written to
+# TRACING_FILE as OTLP/JSON lines; a sampled W3C traceparent header from the
+# caller always traces the request.
+TRACING_SAMPLE_RATE = 0.01  # fraction of requests traced
+TRACING_SAMPLE_RATES = {}  # per view name, e.g. {'accept_family_invitation': 1.0}
+TRACING_FILE = BASE_DIR / 'traces' / 'traces.jsonl'
+TRACING_SERVICE_NAME = 'kumbh'
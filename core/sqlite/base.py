@@ -0,0 +1,150 @@
+"""
+SQLite backend tuned for a busy production server.
+
+Use ENGINE 'core.sqlite'. On top of Django's sqlite3 backend it:
+
+- applies OPTIONS['pragmas'] to every new connection (WAL, synchronous,
+  busy_timeout, mmap and cache size by default), and
+- with OPTIONS['single_writer'], lets one thread at a time write to each
+  database file. A thread holds the file's writer lock from BEGIN to COMMIT
+  or ROLLBACK of a transaction, or for one write statement in autocommit
+  mode. Threads queue on the lock instead of racing on SQLite's file lock,
+  where a read transaction that upgrades to a write fails at once with
+  "database is locked". Other processes are still kept out by SQLite itself,
+  so set OPTIONS['transaction_mode'] to 'IMMEDIATE' and a busy_timeout.
+
+Reads never take the lock; in WAL mode they run alongside the writer.
+"""
+import threading
+
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.db.utils import OperationalError
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative is KiB, so 64 MB per connection
+    'temp_store': 'MEMORY',
+}
+# Statements that may run in autocommit mode without the writer lock
+READ_STATEMENTS = ('SELECT', 'PRAGMA', 'EXPLAIN', 'SAVEPOINT', 'RELEASE', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+_writer_locks = {}
+_writer_locks_lock = threading.Lock()
+
+
+def writer_lock(name):
+    """The process-wide writer lock for a database file"""
+    with _writer_locks_lock:
+        return _writer_locks.setdefault(str(name), threading.Lock())
+
+
+class WriterLockCursor(sqlite3_base.SQLiteCursorWrapper):
+    """Cursor that takes the writer lock around autocommit write statements"""
+
+    wrapper = None
+
+    def _locked(self, query):
+        wrapper = self.wrapper
+        return (
+            wrapper is not None
+            and not wrapper._holds_writer_lock
+            and not self.connection.in_transaction
+            and not query.lstrip()[:9].upper().startswith(READ_STATEMENTS)
+        )
+
+    def execute(self, query, params=None):
+        if not self._locked(query):
+            return super().execute(query, params)
+        with self.wrapper.acquire_writer_lock():
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if not self._locked(query):
+            return super().executemany(query, param_list)
+        with self.wrapper.acquire_writer_lock():
+            return super().executemany(query, param_list)
+
+
+class _Held:
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wrapper._release_writer_lock()
+
+
+class DatabaseWrapper(sqlite3_base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.single_writer = False
+        self._holds_writer_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.single_writer = params.pop('single_writer', False)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        if not self.single_writer:
+            return super().create_cursor(name)
+        cursor = self.connection.cursor(factory=WriterLockCursor)
+        cursor.wrapper = self
+        return cursor
+
+    def acquire_writer_lock(self):
+        """Take this database file's writer lock, waiting up to busy_timeout"""
+        timeout = int(self.pragmas.get('busy_timeout', 0)) / 1000
+        if not writer_lock(self.settings_dict['NAME']).acquire(timeout=timeout if timeout > 0 else -1):
+            raise OperationalError('database is locked (timed out waiting for the writer lock)')
+        self._holds_writer_lock = True
+        return _Held(self)
+
+    def _release_writer_lock(self):
+        if self._holds_writer_lock:
+            self._holds_writer_lock = False
+            writer_lock(self.settings_dict['NAME']).release()
+
+    def _start_transaction_under_autocommit(self):
+        if not self.single_writer:
+            return super()._start_transaction_under_autocommit()
+        self.acquire_writer_lock()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_writer_lock()
+            raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            # A failed COMMIT leaves the transaction open; Django rolls it
+            # back next, and that releases the lock
+            if self.connection is None or not self.connection.in_transaction:
+                self._release_writer_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_writer_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_writer_lock()
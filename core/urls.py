@@ -16,10 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from kumbh.views import prometheus_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
+    path('metrics', prometheus_metrics, name='metrics'),  # Prometheus scrape endpoint, staff only
     path('api/', include('kumbh.api_urls')),  # API endpoints for zones and amenities
     path('', include('kumbh.urls')),  # Admin views
 ]
@@ -1,5 +1,14 @@
+import json
+
 from django.contrib import admin
-from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound, LostFoundMatch, LostFoundSubscription, Photo, Job, TourGroup, TourGroupMember, RequestProfile
+from .name_index import matching_ids
+from .profiling import speedscope
 
 
 @admin.register(Zone)
@@ -80,6 +89,14 @@ class FamilyMemberAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Also find spelling and script variants of the name through the phonetic index
+        unfiltered = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            queryset |= unfiltered.filter(id__in=matching_ids(self.model, search_term))
+        return queryset, may_have_duplicates
 
 
 @admin.register(LostFound)
@@ -89,12 +106,13 @@ class LostFoundAdmin(admin.ModelAdmin):
     search_fields = ('person_name', 'user_email', 'description', 'location')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('photo',)
     fieldsets = (
         ('Report Details', {
             'fields': ('report_type', 'status', 'is_active')
         }),
         ('Person/Item Information', {
-            'fields': ('person_name', 'age', 'description', 'photo_url')
+            'fields': ('person_name', 'age', 'description', 'photo_url', 'photo')
         }),
         ('Location', {
             'fields': ('location', 'latitude', 'longitude')
@@ -107,6 +125,14 @@ class LostFoundAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Also find spelling and script variants of the name through the phonetic index
+        unfiltered = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            queryset |= unfiltered.filter(id__in=matching_ids(self.model, search_term))
+        return queryset, may_have_duplicates
 
 
 @admin.register(FamilyInvitation)
@@ -124,3 +150,114 @@ class FamilyInvitationAdmin(admin.ModelAdmin):
             'fields': ('expires_at', 'created_at', 'accepted_at')
         }),
     )
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('name', 'status')
+    ordering = ('-run_at',)
+    readonly_fields = ('attempts', 'last_error', 'locked_by', 'locked_at', 'finished_at', 'created_at', 'updated_at')
+
+
+class TourGroupMemberInline(admin.TabularInline):
+    model = TourGroupMember
+    extra = 0
+    readonly_fields = ('joined_at',)
+
+
+@admin.register(TourGroup)
+class TourGroupAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'leader_email', 'is_active', 'created_at')
+    list_filter = ('is_active', 'created_at')
+    search_fields = ('name', 'leader_email', 'join_token')
+    ordering = ('-created_at',)
+    readonly_fields = ('join_token', 'created_at', 'updated_at')
+    inlines = [TourGroupMemberInline]
+
+
+@admin.register(LostFoundMatch)
+class LostFoundMatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'lost', 'found', 'score', 'distance_km', 'hours_apart', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    ordering = ('-score',)
+    raw_id_fields = ('lost', 'found')
+    readonly_fields = ('score', 'name_score', 'age_score', 'distance_km', 'hours_apart', 'created_at', 'updated_at')
+
+
+@admin.register(Photo)
+class PhotoAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'content_type', 'size', 'width', 'height', 'status', 'uploaded_by', 'created_at')
+    list_filter = ('status', 'content_type', 'created_at')
+    search_fields = ('sha256', 'uploaded_by')
+    ordering = ('-created_at',)
+    readonly_fields = ('sha256', 'file', 'content_type', 'size', 'width', 'height', 'thumbnails', 'phash', 'created_at')
+
+
+@admin.register(LostFoundSubscription)
+class LostFoundSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('user_email', 'query', 'report_type', 'radius_km', 'is_active', 'last_matched_at', 'created_at')
+    list_filter = ('report_type', 'is_active', 'created_at')
+    search_fields = ('user_email', 'query')
+    ordering = ('-created_at',)
+    readonly_fields = ('last_matched_at', 'created_at', 'updated_at')
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view', 'status_code', 'duration_ms', 'query_count', 'query_ms', 'requested_by', 'downloads')
+    list_filter = ('view', 'method', 'status_code', 'created_at')
+    search_fields = ('path', 'view', 'requested_by')
+    ordering = ('-created_at',)
+    exclude = ('stacks', 'queries')
+    readonly_fields = ('requested_by', 'method', 'path', 'view', 'status_code', 'duration_ms', 'sample_count',
+                       'query_count', 'query_ms', 'created_at', 'downloads', 'sql')
+
+    def has_add_permission(self, request):
+        # Profiles are only made by ProfilingMiddleware
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/collapsed/', self.admin_site.admin_view(self.download_collapsed), name='kumbh_requestprofile_collapsed'),
+            path('<int:pk>/speedscope/', self.admin_site.admin_view(self.download_speedscope), name='kumbh_requestprofile_speedscope'),
+        ] + super().get_urls()
+
+    @admin.display(description='Download')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">speedscope</a> | <a href="{}">collapsed stacks</a>',
+            reverse('admin:kumbh_requestprofile_speedscope', args=[obj.pk]),
+            reverse('admin:kumbh_requestprofile_collapsed', args=[obj.pk]),
+        )
+
+    @admin.display(description='SQL issued')
+    def sql(self, obj):
+        return format_html(
+            '<table><tr><th>At ms</th><th>ms</th><th>Database</th><th>SQL</th></tr>{}</table>',
+            format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>', (
+                (query['at_ms'], query['ms'], query['alias'], query['sql']) for query in obj.queries
+            )),
+        )
+
+    def _profile(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return get_object_or_404(RequestProfile, pk=pk)
+
+    @staticmethod
+    def _attachment(content, content_type, filename):
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def download_collapsed(self, request, pk):
+        profile = self._profile(request, pk)
+        return self._attachment(profile.stacks, 'text/plain; charset=utf-8', f'profile-{pk}.folded')
+
+    def download_speedscope(self, request, pk):
+        profile = self._profile(request, pk)
+        return self._attachment(json.dumps(speedscope(profile)), 'application/json', f'profile-{pk}.speedscope.json')
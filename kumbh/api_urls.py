@@ -10,10 +10,24 @@ from .views import (
     family_members_list,
     family_members_detail,
     update_user_location,
+    presence_ping,
+    family_presence,
     create_family_invitation,
     accept_family_invitation,
+    tour_groups_list,
+    join_tour_group,
+    tour_group_positions,
     lost_found_list,
     lost_found_detail,
+    lost_found_matches,
+    lost_found_similar_photos,
+    lost_found_subscriptions,
+    lost_found_subscription_detail,
+    lost_found_subscription_hits,
+    photos_upload,
+    photos_detail,
+    export_dataset,
+    load_shedding_stats,
 )
 
 app_name = 'kumbh_api'
@@ -37,12 +51,30 @@ urlpatterns = [
     path('family-members/<int:pk>/', family_members_detail, name='family-members-detail'),
     path('family-members/update-location/', update_user_location, name='update-user-location'),
     
+    # Presence APIs
+    path('presence/ping/', presence_ping, name='presence-ping'),
+    path('presence/family/', family_presence, name='family-presence'),
+    
     # Family Invitation APIs
     path('family-invitations/create/', create_family_invitation, name='create-family-invitation'),
     path('family-invitations/accept/', accept_family_invitation, name='accept-family-invitation'),
     
+    # Tour Group APIs
+    path('tour-groups/', tour_groups_list, name='tour-groups-list'),
+    path('tour-groups/join/', join_tour_group, name='join-tour-group'),
+    path('tour-groups/<int:pk>/positions/', tour_group_positions, name='tour-group-positions'),
+    
     # Lost & Found APIs
     path('lost-found/', lost_found_list, name='lost-found-list'),
     path('lost-found/<int:pk>/', lost_found_detail, name='lost-found-detail'),
+    path('lost-found/<int:pk>/matches/', lost_found_matches, name='lost-found-matches'),
+    path('lost-found/<int:pk>/similar-photos/', lost_found_similar_photos, name='lost-found-similar-photos'),
+    path('lost-found/subscriptions/', lost_found_subscriptions, name='lost-found-subscriptions'),
+    path('lost-found/subscriptions/<int:pk>/', lost_found_subscription_detail, name='lost-found-subscription-detail'),
+    path('lost-found/subscriptions/<int:pk>/hits/', lost_found_subscription_hits, name='lost-found-subscription-hits'),
+    path('photos/', photos_upload, name='photos-upload'),
+    path('photos/<int:pk>/', photos_detail, name='photos-detail'),
+    path('exports/<str:dataset>/', export_dataset, name='export-dataset'),
+    path('load-shedding/', load_shedding_stats, name='load-shedding-stats'),
 ]
 
@@ -5,3 +5,7 @@ class KumbhConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kumbh'
 
+    def ready(self):
+        # Register background jobs so they can be enqueued by name and
+        # connect the signal handlers that keep derived indexes in sync
+        from . import matching, name_index, percolator, response_cache, search, tasks  # noqa: F401
@@ -0,0 +1,57 @@
+"""
+Response compression: Brotli when the brotli package is installed and the
+client accepts it, gzip otherwise.
+
+Only text formats that carry no secrets are compressed. HTML is left alone:
+admin pages embed CSRF tokens next to reflected input, which compression
+would expose to BREACH-style attacks.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml',
+})
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Best supported encoding for an Accept-Encoding header, or None; Brotli wins ties"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding] = weight
+    best, best_weight = None, 0.0
+    for coding in available_encodings():
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(content, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(content, quality=level)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def compressible(content_type):
+    return content_type.split(';', 1)[0].strip().lower() in COMPRESSIBLE_TYPES
@@ -0,0 +1,135 @@
+"""
+Streaming data exports for the authorities' daily dumps.
+
+Rows are read with values_list().iterator(), so the database cursor is
+consumed in chunks and no model instances are built, and are encoded into
+byte chunks of about EXPORT_CHUNK_SIZE that are yielded as soon as they fill.
+Optional gzip compression happens on the same stream. Memory use therefore
+stays flat no matter how many rows are exported.
+"""
+import csv
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import LostFound, SosRequest
+
+EXPORT_CHUNK_SIZE = 64 * 1024  # bytes per yielded chunk
+CURSOR_CHUNK_SIZE = 2000  # rows fetched from the database at a time
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    fields: tuple
+
+
+DATASETS = {
+    'sos': Dataset(SosRequest, (
+        'id', 'user_email', 'user_name', 'sos_type', 'latitude', 'longitude', 'description',
+        'status', 'assigned_team', 'is_active', 'created_at', 'updated_at',
+    )),
+    'lost-found': Dataset(LostFound, (
+        'id', 'report_type', 'user_email', 'user_name', 'user_phone', 'person_name', 'age',
+        'description', 'location', 'latitude', 'longitude', 'photo_url', 'photo_id', 'status',
+        'is_active', 'created_at', 'updated_at',
+    )),
+}
+
+
+class _Echo:
+    """File-like object whose write() returns what was written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def parse_bound(value):
+    """Aware datetime from an ISO date (midnight, local time) or datetime; ValueError if invalid"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def day_bounds(value):
+    """(since, until) covering one calendar day"""
+    since = parse_bound(value)
+    return since, since + timedelta(days=1)
+
+
+def export_rows(dataset, since=None, until=None):
+    """Tuples of the dataset's fields, oldest first, read from a chunked cursor"""
+    queryset = dataset.model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset.order_by('id').values_list(*dataset.fields).iterator(chunk_size=CURSOR_CHUNK_SIZE)
+
+
+def _encode_ndjson(fields, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def _encode_csv(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def _chunked(lines):
+    """Join encoded lines into byte chunks of about EXPORT_CHUNK_SIZE"""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(name, output='ndjson', since=None, until=None, compress=False):
+    """Byte chunks of an export; `name` is a DATASETS key and `output` a FORMATS key"""
+    dataset = DATASETS[name]
+    rows = export_rows(dataset, since, until)
+    encode = _encode_csv if output == 'csv' else _encode_ndjson
+    chunks = _chunked(encode(dataset.fields, rows))
+    return _gzipped(chunks) if compress else chunks
+
+
+def export_filename(name, output, compress=False, label=None):
+    suffix = f'-{label}' if label else ''
+    extension = FORMATS[output][1] + ('.gz' if compress else '')
+    return f'{name}{suffix}.{extension}'
@@ -0,0 +1,98 @@
+"""Geohash cells and distances used for blocking and scoring by location"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# 5 characters is a cell of roughly 4.9 km x 4.9 km
+CELL_PRECISION = 5
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def encode(latitude, longitude, precision=CELL_PRECISION):
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """Centre point and half-size (lat_err, lng_err) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    lat = (lat_range[0] + lat_range[1]) / 2
+    lng = (lng_range[0] + lng_range[1]) / 2
+    return lat, lng, (lat_range[1] - lat_range[0]) / 2, (lng_range[1] - lng_range[0]) / 2
+
+
+def neighbors(geohash):
+    """The cell itself and its eight surrounding cells"""
+    lat, lng, lat_err, lng_err = decode(geohash)
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            cell_lat = max(min(lat + dlat * 2 * lat_err, 90.0), -90.0)
+            cell_lng = (lng + dlng * 2 * lng_err + 180.0) % 360.0 - 180.0
+            cell = encode(cell_lat, cell_lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def cells_within(latitude, longitude, radius_km, precision=CELL_PRECISION):
+    """Cells covering a circle, found by sampling a grid over its bounding box"""
+    lat, lng = float(latitude), float(longitude)
+    _, _, lat_err, lng_err = decode(encode(lat, lng, precision))
+    dlat = radius_km / 111.0
+    dlng = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+    cells = set()
+    steps_lat = int(dlat / lat_err) + 1
+    steps_lng = int(dlng / lng_err) + 1
+    for i in range(-steps_lat, steps_lat + 1):
+        for j in range(-steps_lng, steps_lng + 1):
+            point_lat = max(min(lat + i * lat_err, 90.0), -90.0)
+            point_lng = (lng + j * lng_err + 180.0) % 360.0 - 180.0
+            cells.add(encode(point_lat, point_lng, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lng1, lat2, lng2 = (math.radians(float(v)) for v in (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
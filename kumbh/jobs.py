@@ -0,0 +1,186 @@
+"""
+Lightweight database-backed background job runner.
+
+Jobs are plain functions registered with @register. enqueue() stores a Job
+row; the run_jobs management command claims due jobs, runs them and retries
+failures with exponential backoff. Periodic jobs reschedule themselves after
+every run, so no external broker or scheduler is needed. A partial unique
+constraint on Job keeps one queued or running instance of each periodic job
+even when several runners schedule it at once.
+"""
+import logging
+import os
+import socket
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_BACKOFF = 30  # seconds, doubled on every attempt
+DEFAULT_STALE_AFTER = 15 * 60  # seconds before a running job is assumed dead
+
+
+@dataclass
+class JobSpec:
+    name: str
+    func: object
+    interval: timedelta = None
+    max_attempts: int = 3
+
+
+registry = {}
+
+
+def register(name, interval=None, max_attempts=3):
+    """
+    Register a function as a job.
+
+    Jobs with an `interval` are periodic: the runner keeps exactly one queued
+    instance of them and schedules the next one when a run finishes.
+    """
+    def decorator(func):
+        registry[name] = JobSpec(name=name, func=func, interval=interval, max_attempts=max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """Queue a registered job to run at `run_at` (default: now)"""
+    if name not in registry:
+        raise ValueError(f'Unknown job: {name}')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or registry[name].max_attempts,
+    )
+
+
+def _enqueue_periodic(spec, run_at):
+    """Queue the next run of a periodic job; None if another runner already has one queued or running"""
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=spec.name,
+                payload={},
+                run_at=run_at,
+                max_attempts=spec.max_attempts,
+                periodic=True,
+            )
+    except IntegrityError:
+        return None
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def schedule_periodic(now=None):
+    """Make sure every periodic job has a queued or running instance"""
+    now = now or timezone.now()
+    active = set(
+        Job.objects.filter(status__in=['queued', 'running']).values_list('name', flat=True).distinct()
+    )
+    scheduled = []
+    for spec in registry.values():
+        if spec.interval is not None and spec.name not in active:
+            job = _enqueue_periodic(spec, now)
+            if job is not None:
+                scheduled.append(job)
+    return scheduled
+
+
+def recover_stale(now=None):
+    """Requeue jobs whose worker died while running them"""
+    now = now or timezone.now()
+    stale_after = getattr(settings, 'JOBS_STALE_AFTER', DEFAULT_STALE_AFTER)
+    return Job.objects.filter(
+        status='running',
+        locked_at__lt=now - timedelta(seconds=stale_after),
+    ).update(status='queued', locked_by=None, locked_at=None)
+
+
+def claim_next(worker_id, now=None):
+    """
+    Atomically claim the oldest due job.
+
+    The conditional UPDATE only succeeds for one worker, so several run_jobs
+    processes can share the same table safely.
+    """
+    now = now or timezone.now()
+    while True:
+        job_id = (
+            Job.objects.filter(status='queued', run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome"""
+    spec = registry.get(job.name)
+    now = timezone.now()
+    try:
+        if spec is None:
+            raise LookupError(f'No job registered as {job.name!r}')
+        result = spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s #%s failed (attempt %s/%s)', job.name, job.pk, job.attempts, job.max_attempts)
+        job.last_error = error
+        job.locked_by = None
+        job.locked_at = None
+        if spec is not None and job.attempts < job.max_attempts:
+            backoff = getattr(settings, 'JOBS_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF)
+            job.status = 'queued'
+            job.run_at = now + timedelta(seconds=backoff * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+        job.save()
+    else:
+        logger.info('Job %s #%s succeeded: %s', job.name, job.pk, result)
+        job.status = 'succeeded'
+        job.finished_at = now
+        job.locked_by = None
+        job.locked_at = None
+        job.last_error = None
+        job.save()
+
+    if spec is not None and spec.interval is not None and job.status in ('succeeded', 'failed'):
+        _enqueue_periodic(spec, now + spec.interval)
+    return job
+
+
+def run_pending(worker_id=None, limit=None):
+    """Run due jobs until none are left (or `limit` is reached); returns the count"""
+    worker_id = worker_id or default_worker_id()
+    recover_stale()
+    schedule_periodic()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
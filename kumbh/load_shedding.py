@@ -0,0 +1,138 @@
+"""
+Priority-aware load shedding.
+
+Each worker process tracks its in-flight requests and a time-decayed average
+latency, and turns them into a load figure where 1.0 means "at capacity"
+(LOAD_SHEDDING_MAX_IN_FLIGHT requests, or LOAD_SHEDDING_TARGET_LATENCY
+seconds). As load rises, requests are shed by priority:
+
+    bulk      exports, uploads, admin and dashboard pages   503 first
+    read      list/detail reads of maps and reports          stale copy, else 503
+    normal    everything else                                503 last
+    critical  SOS create and update                          always admitted
+
+The latency average decays toward zero while nothing completes, so a burst
+of shedding cannot keep the worker shedding after the load is gone.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+CRITICAL = 'critical'
+NORMAL = 'normal'
+READ = 'read'
+BULK = 'bulk'
+
+# (view name, method) pairs that are never shed
+CRITICAL_VIEWS = frozenset({
+    ('sos_requests_list', 'POST'),
+    ('sos_requests_detail', 'PATCH'),
+})
+# GET views that may be answered with a stale copy under load
+READ_VIEWS = frozenset({
+    'zones_list', 'zones_detail', 'amenities_list', 'amenities_detail', 'amenities_categories',
+    'lost_found_list', 'lost_found_detail',
+})
+BULK_VIEWS = frozenset({
+    'export_dataset', 'photos_upload', 'lost_found_similar_photos',
+})
+# URL namespaces served by Django admin and the staff dashboard
+BULK_NAMESPACES = frozenset({'admin', 'kumbh'})
+# Views in those namespaces that pilgrims use
+PUBLIC_NAMESPACE_VIEWS = frozenset({'invitation_accept_view', 'media_file'})
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_TARGET_LATENCY = 0.5
+# Load at which each priority starts being shed
+DEFAULT_THRESHOLDS = {BULK: 0.7, READ: 0.85, NORMAL: 1.0}
+LATENCY_SMOOTHING = 0.1  # weight of the newest sample in the moving average
+LATENCY_HALF_LIFE = 5.0  # seconds for the average to halve with no completed requests
+
+
+def view_name(view_func):
+    """Name of the view behind a resolved callable; DRF @api_view functions keep theirs on .cls"""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    return view_class.__name__ if view_class is not None else view_func.__name__
+
+
+def classify(request, view_func):
+    name = view_name(view_func)
+    if (name, request.method) in CRITICAL_VIEWS:
+        return CRITICAL
+    if name in BULK_VIEWS:
+        return BULK
+    match = request.resolver_match
+    if match is not None and match.namespace in BULK_NAMESPACES and name not in PUBLIC_NAMESPACE_VIEWS:
+        return BULK
+    if request.method in ('GET', 'HEAD') and name in READ_VIEWS:
+        return READ
+    return NORMAL
+
+
+class LoadShedder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self._latency = 0.0
+        self._latency_at = time.monotonic()
+        self.admitted = defaultdict(int)
+        self.shed = defaultdict(int)
+        self.served_stale = 0
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, duration=None):
+        """Finish a request; `duration` is recorded for admitted requests only"""
+        with self._lock:
+            self.in_flight -= 1
+            if duration is not None:
+                now = time.monotonic()
+                self._latency = (1 - LATENCY_SMOOTHING) * self._decayed(now) + LATENCY_SMOOTHING * duration
+                self._latency_at = now
+
+    def _decayed(self, now):
+        return self._latency * math.pow(0.5, (now - self._latency_at) / LATENCY_HALF_LIFE)
+
+    def latency(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def load(self):
+        max_in_flight = getattr(settings, 'LOAD_SHEDDING_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+        target_latency = getattr(settings, 'LOAD_SHEDDING_TARGET_LATENCY', DEFAULT_TARGET_LATENCY)
+        return max(self.in_flight / max_in_flight, self.latency() / target_latency)
+
+    def should_shed(self, priority):
+        if priority == CRITICAL or not getattr(settings, 'LOAD_SHEDDING_ENABLED', True):
+            return False
+        thresholds = getattr(settings, 'LOAD_SHEDDING_THRESHOLDS', DEFAULT_THRESHOLDS)
+        return self.load() >= thresholds[priority]
+
+    def record(self, priority, admitted, stale=False):
+        with self._lock:
+            if admitted:
+                self.admitted[priority] += 1
+            else:
+                self.shed[priority] += 1
+            if stale:
+                self.served_stale += 1
+
+    def stats(self):
+        load = self.load()
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'latency_ms': round(self._decayed(time.monotonic()) * 1000, 2),
+                'load': round(load, 3),
+                'admitted': dict(self.admitted),
+                'shed': dict(self.shed),
+                'served_stale': self.served_stale,
+            }
+
+
+shedder = LoadShedder()
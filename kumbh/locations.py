@@ -0,0 +1,109 @@
+"""
+Latest known position per user, kept in the LOCATION_CACHE cache.
+
+update_user_location writes here alongside the FamilyMember rows so group
+position queries can be answered with a single cache.get_many() call.
+
+The cache must be shared by every worker, or a position written through one
+worker is missing on the others. Positions the cache does not have (expired,
+evicted, or never cached) are read from the FamilyMember rows that
+update_user_location also writes, and put back in the cache.
+"""
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from .models import FamilyMember
+from .presence import phone_matches
+
+DEFAULT_TTL = 6 * 60 * 60  # seconds
+
+# Positions are stored with the precision of the FamilyMember columns, so a
+# cache hit and a read back from the rows give the same strings
+QUANTUM = Decimal(1).scaleb(-FamilyMember._meta.get_field('latitude').decimal_places)
+
+
+def _cache():
+    return caches[getattr(settings, 'LOCATION_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'LOCATION_CACHE_TTL', DEFAULT_TTL)
+
+
+def cache_key(email):
+    return f'location:{email.lower()}'
+
+
+def coordinate(value):
+    """A latitude or longitude as a Decimal at column precision; raises ValueError if it is not a number"""
+    try:
+        value = Decimal(str(value)).quantize(QUANTUM)
+    except ArithmeticError:
+        raise ValueError(f'Not a coordinate: {value!r}') from None
+    if not value.is_finite():
+        raise ValueError(f'Not a coordinate: {value!r}')
+    return value
+
+
+def _position(latitude, longitude, updated_at):
+    return {
+        'lat': str(coordinate(latitude)),
+        'lng': str(coordinate(longitude)),
+        'last_location_update': updated_at.isoformat(),
+    }
+
+
+def store(email, latitude, longitude, updated_at):
+    _cache().set(cache_key(email), _position(latitude, longitude, updated_at), timeout=_timeout())
+
+
+def tracking_rows(emails):
+    """
+    Active FamilyMember rows whose phone may have been generated from one of
+    `emails`: a coarse prefix match, to be confirmed with phone_matches()
+    """
+    prefixes = {email.split('@')[0] + '_' for email in emails}
+    return FamilyMember.objects.filter(reduce(or_, (Q(phone__startswith=prefix) for prefix in prefixes)), is_active=True)
+
+
+def persisted(emails):
+    """
+    Return {email: position} from the FamilyMember rows update_user_location wrote.
+
+    Those are the other users' rows whose phone was generated from the email
+    (see update_user_location); the most recently updated one wins.
+    """
+    if not emails:
+        return {}
+    rows = (
+        tracking_rows(emails)
+        .filter(last_location_update__isnull=False, latitude__isnull=False, longitude__isnull=False)
+        .order_by('-last_location_update')
+        .values_list('phone', 'user_email', 'latitude', 'longitude', 'last_location_update')
+    )
+    positions = {}
+    for phone, owner, latitude, longitude, updated_at in rows:
+        for email in emails:
+            if email not in positions and owner != email and phone_matches(phone, email):
+                positions[email] = _position(latitude, longitude, updated_at)
+    return positions
+
+
+def get_many(emails):
+    """Return {email: position or None} for the given emails in one cache round trip, plus a query for misses"""
+    cache = _cache()
+    keys = {cache_key(email): email for email in emails}
+    found = cache.get_many(list(keys))
+    positions = {email: found.get(key) for key, email in keys.items()}
+    missing = [email for email, position in positions.items() if position is None]
+    if missing:
+        recovered = persisted(missing)
+        if recovered:
+            cache.set_many({cache_key(email): position for email, position in recovered.items()}, timeout=_timeout())
+            positions.update(recovered)
+    return positions
@@ -0,0 +1,123 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from kumbh.search import FIELD_WEIGHTS, FTS_SETUP_SQL, FTS_TABLE, _fts_query, tokenize
+
+FIRST_NAMES = [
+    'Ramesh', 'Suresh', 'Sita', 'Gita', 'Mohan', 'Radha', 'Krishna', 'Lakshmi', 'Arjun', 'Priya',
+    'Vikram', 'Anita', 'Rahul', 'Pooja', 'Amit', 'Sunita', 'Raju', 'Kavita', 'Deepak', 'Meena',
+]
+LAST_NAMES = ['Kumar', 'Devi', 'Sharma', 'Verma', 'Yadav', 'Singh', 'Patil', 'Joshi', 'Gupta', 'Mishra']
+WORDS = [
+    'boy', 'girl', 'old', 'man', 'woman', 'red', 'blue', 'white', 'saffron', 'shirt', 'saree', 'kurta',
+    'bag', 'phone', 'wallet', 'glasses', 'tall', 'short', 'crying', 'near', 'stall', 'temple', 'bridge',
+    'wearing', 'carrying', 'speaks', 'hindi', 'marathi', 'bengali', 'walking', 'stick', 'tilak',
+]
+LOCATIONS = ['Har Ki Pauri', 'Triveni Ghat', 'Ram Jhula', 'Main Bazaar', 'Lakshman Jhula', 'Bharat Mandir', 'Sector 4', 'Camp 12']
+QUERIES = ['ramesh', 'sita devi', 'red shirt', 'triveni', 'old woman saree', 'kumar bag', 'lakshmi', 'blue kurta temple']
+
+
+class Command(BaseCommand):
+    help = 'Measure lost & found search latency (LIKE scan vs FTS5) on a synthetic SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000, help='Number of synthetic reports')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'bench.sqlite3'))
+            self._populate(conn, rows)
+            self.stdout.write(f'{rows} reports, page size {options["page_size"]}, {options["repeat"]} runs per query')
+            self.stdout.write(f'{"query":<22}{"LIKE p50":>12}{"LIKE p95":>12}{"FTS5 p50":>12}{"FTS5 p95":>12}')
+            for query in QUERIES:
+                like = self._time(conn, self._like_sql(query), options)
+                fts = self._time(conn, self._fts_sql(query), options)
+                self.stdout.write(
+                    f'{query:<22}{like[0]:>10.2f}ms{like[1]:>10.2f}ms{fts[0]:>10.2f}ms{fts[1]:>10.2f}ms'
+                )
+            conn.close()
+
+    def _populate(self, conn, rows):
+        started = time.perf_counter()
+        conn.execute(
+            'CREATE TABLE lost_found (id INTEGER PRIMARY KEY, person_name TEXT, description TEXT, '
+            'location TEXT, report_type TEXT, status TEXT, is_active BOOL, created_at TEXT)'
+        )
+
+        rng = random.Random(42)
+        # A long tail of rarer names and words so term frequencies look like
+        # real free text instead of a tiny vocabulary that every row repeats
+        syllables = ['ra', 'me', 'sh', 'su', 'ni', 'ta', 'ka', 'vi', 'ja', 'ya', 'pa', 'la', 'di', 'ma', 'ku', 'go']
+        rare_names = [
+            ''.join(rng.choices(syllables, k=rng.randint(2, 4))).capitalize() for _ in range(5000)
+        ]
+        rare_words = [''.join(rng.choices(syllables, k=rng.randint(2, 5))) for _ in range(20000)]
+        rare_weights = [1 / (rank + 1) for rank in range(len(rare_words))]
+
+        def first_name():
+            return rng.choice(FIRST_NAMES) if rng.random() < 0.2 else rng.choice(rare_names)
+
+        def generate():
+            for i in range(rows):
+                words = rng.choices(WORDS, k=rng.randint(2, 5)) + rng.choices(
+                    rare_words, weights=rare_weights, k=rng.randint(3, 10)
+                )
+                rng.shuffle(words)
+                yield (
+                    f'{first_name()} {rng.choice(LAST_NAMES)}',
+                    ' '.join(words),
+                    rng.choice(LOCATIONS),
+                    rng.choice(['lost', 'found']),
+                    'open',
+                    1,
+                    f'2025-01-{1 + i % 28:02d}T{i % 24:02d}:00:00',
+                )
+
+        conn.executemany(
+            'INSERT INTO lost_found (person_name, description, location, report_type, status, is_active, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            generate(),
+        )
+        # Building the index once after the bulk load is much faster than
+        # letting the triggers index row by row
+        for statement in FTS_SETUP_SQL:
+            conn.execute(statement)
+        conn.commit()
+        self.stdout.write(f'Populated in {time.perf_counter() - started:.1f}s')
+
+    def _like_sql(self, query):
+        # Mirrors the previous icontains search: whole string, any of three columns
+        pattern = f'%{query}%'
+        return (
+            'SELECT id FROM lost_found WHERE is_active = 1 AND status = ? AND '
+            '(person_name LIKE ? OR description LIKE ? OR location LIKE ?) ORDER BY created_at DESC LIMIT ?',
+            ['open', pattern, pattern, pattern],
+        )
+
+    def _fts_sql(self, query):
+        weights = ', '.join(str(w) for w in FIELD_WEIGHTS)
+        return (
+            f'SELECT lf.id FROM {FTS_TABLE} JOIN lost_found lf ON lf.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH ? AND lf.is_active = 1 AND lf.status = ? '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}), lf.created_at DESC LIMIT ?',
+            [_fts_query(tokenize(query)), 'open'],
+        )
+
+    def _time(self, conn, statement, options):
+        sql, params = statement
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            conn.execute(sql, params + [options['page_size']]).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from kumbh.models import Amenity, SosRequest, Zone
+from kumbh.renderers import ORJSONRenderer
+from kumbh.row_serializers import serialize_rows
+from kumbh.serializers import AmenityListSerializer, SosRequestSerializer, ZoneSerializer
+
+NAMES = ['Sector 4', 'Triveni Ghat', 'Har Ki Pauri', 'त्रिवेणी घाट', 'Ram Jhula', 'Camp 12 — North', 'Main Bazaar']
+
+
+def _coordinate(rng, low, high):
+    return Decimal(f'{rng.uniform(low, high):.6f}')
+
+
+class Command(BaseCommand):
+    help = 'Compare ModelSerializer + JSONRenderer with values_list() rows + ORJSONRenderer on scratch test databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='Rows per table')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default', 'sos', 'locations'})
+        try:
+            self._populate(options['rows'])
+            self.stdout.write(f"{options['rows']} rows per table, median of {options['repeat']} runs")
+            self.stdout.write(f'{"endpoint":<12}{"serializer":>12}{"fast path":>12}{"speedup":>9}  bytes')
+            for label, queryset, serializer_class, extra in (
+                ('zones', Zone.objects.filter(is_active=True), ZoneSerializer, {}),
+                ('amenities', Amenity.objects.filter(is_active=True), AmenityListSerializer, {'category': None}),
+                ('sos', SosRequest.objects.filter(is_active=True), SosRequestSerializer, {}),
+            ):
+                self._compare(label, queryset, serializer_class, extra, options['repeat'])
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+    def _populate(self, rows):
+        rng = random.Random(42)
+        Zone.objects.bulk_create(
+            Zone(
+                name=f'{rng.choice(NAMES)} {i}',
+                status=rng.choice(Zone.STATUS_CHOICES)[0],
+                color=rng.choice(Zone.COLOR_CHOICES)[0],
+                zone_type='polygon' if i % 3 == 0 else 'circle',
+                capacity=rng.randint(0, 100),
+                latitude=None if i % 3 == 0 else _coordinate(rng, 25.40, 25.46),
+                longitude=None if i % 3 == 0 else _coordinate(rng, 81.82, 81.90),
+                polygon=[[rng.uniform(25.40, 25.46), rng.uniform(81.82, 81.90)] for _ in range(4)] if i % 3 == 0 else None,
+                description=None if i % 2 else 'Crowd   control point',
+            )
+            for i in range(rows)
+        )
+        Amenity.objects.bulk_create(
+            Amenity(
+                name=f'{rng.choice(NAMES)} {i}',
+                category=rng.choice(Amenity.CATEGORY_CHOICES)[0],
+                latitude=_coordinate(rng, 25.40, 25.46),
+                longitude=_coordinate(rng, 81.82, 81.90),
+                description='Open 24 hours',
+            )
+            for i in range(rows)
+        )
+        SosRequest.objects.bulk_create(
+            SosRequest(
+                user_email=f'pilgrim{i}@example.com',
+                user_name=rng.choice(NAMES),
+                sos_type=rng.choice(SosRequest.TYPE_CHOICES)[0],
+                latitude=_coordinate(rng, 25.40, 25.46),
+                longitude=_coordinate(rng, 81.82, 81.90),
+                status=rng.choice(SosRequest.STATUS_CHOICES)[0],
+            )
+            for i in range(rows)
+        )
+
+    def _compare(self, label, queryset, serializer_class, extra, repeat):
+        def before():
+            data = serializer_class(queryset, many=True).data
+            return JSONRenderer().render({'count': queryset.count(), **extra, 'results': data})
+
+        def after():
+            results = serialize_rows(queryset, serializer_class)
+            return ORJSONRenderer().render({'count': len(results), **extra, 'results': results})
+
+        expected, actual = before(), after()
+        if expected != actual:
+            raise CommandError(f'{label}: fast path output differs from the serializer')
+        slow, fast = self._time(before, repeat), self._time(after, repeat)
+        self.stdout.write(f'{label:<12}{slow:>10.1f}ms{fast:>10.1f}ms{slow / fast:>8.1f}x  {len(actual)}')
+
+    def _time(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+MEMBERS = 1000
+
+MODES = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'production': {'ENGINE': 'core.sqlite', 'OPTIONS': settings.DATABASES['default'].get('OPTIONS', {})},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent read/write throughput of stock and production SQLite settings on a scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Run time per mode')
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='Share of operations that write')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['threads']} threads, {options['seconds']:.0f}s per mode, "
+            f"{options['write_ratio']:.0%} writes (read a row, then insert and update in one transaction)"
+        )
+        self.stdout.write(f'{"mode":<12}{"ops/s":>10}{"writes/s":>10}{"errors":>8}{"write p50":>12}{"write p95":>12}')
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode, config in MODES.items():
+                alias = f'benchmark_{mode}'
+                connections.settings[alias] = {
+                    **connections.settings['default'],
+                    **config,
+                    'NAME': os.path.join(tmp, f'{mode}.sqlite3'),
+                }
+                try:
+                    self._populate(alias)
+                    ops, writes, errors, latencies = self._run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+                latencies.sort()
+                p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+                seconds = options['seconds']
+                self.stdout.write(
+                    f'{mode:<12}{ops / seconds:>10.0f}{writes / seconds:>10.0f}{errors:>8}{p50:>10.2f}ms{p95:>10.2f}ms'
+                )
+
+    def _populate(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE members (id INTEGER PRIMARY KEY, pings INTEGER, last_seen REAL)')
+            cursor.execute(
+                'CREATE TABLE pings (id INTEGER PRIMARY KEY, member_id INTEGER, latitude REAL, longitude REAL, at REAL)'
+            )
+            cursor.execute('CREATE INDEX pings_member ON pings (member_id, at)')
+            cursor.executemany('INSERT INTO members VALUES (%s, 0, 0)', [(i,) for i in range(MEMBERS)])
+
+    def _run(self, alias, options):
+        deadline = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        totals = {'ops': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+
+        def worker(seed):
+            rng = random.Random(seed)
+            ops = writes = errors = 0
+            latencies = []
+            connection = connections[alias]
+            while time.monotonic() < deadline:
+                member = rng.randrange(MEMBERS)
+                started = time.perf_counter()
+                try:
+                    if rng.random() < options['write_ratio']:
+                        with transaction.atomic(using=alias), connection.cursor() as cursor:
+                            cursor.execute('SELECT pings FROM members WHERE id = %s', [member])
+                            count = cursor.fetchone()[0]
+                            cursor.execute(
+                                'INSERT INTO pings (member_id, latitude, longitude, at) VALUES (%s, %s, %s, %s)',
+                                [member, rng.uniform(25.4, 25.5), rng.uniform(81.8, 81.9), time.time()],
+                            )
+                            cursor.execute(
+                                'UPDATE members SET pings = %s, last_seen = %s WHERE id = %s',
+                                [count + 1, time.time(), member],
+                            )
+                        writes += 1
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        with connection.cursor() as cursor:
+                            cursor.execute(
+                                'SELECT count(*), max(at) FROM pings WHERE member_id = %s', [member]
+                            )
+                            cursor.fetchone()
+                    ops += 1
+                except OperationalError:
+                    errors += 1
+            connection.close()
+            with lock:
+                totals['ops'] += ops
+                totals['writes'] += writes
+                totals['errors'] += errors
+                totals['latencies'].extend(latencies)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return totals['ops'], totals['writes'], totals['errors'], totals['latencies']
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kumbh.exports import DATASETS, FORMATS, day_bounds, parse_bound, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream an export of SOS requests or lost/found reports as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS), help='Dataset to export')
+        parser.add_argument('--output', choices=sorted(FORMATS), default='ndjson', help='Output format')
+        parser.add_argument('--date', help='Export one day (YYYY-MM-DD)')
+        parser.add_argument('--since', help='Only rows created at or after this ISO date/datetime')
+        parser.add_argument('--until', help='Only rows created before this ISO date/datetime')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--file', help='Write to this path instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            if options['date']:
+                since, until = day_bounds(options['date'])
+            else:
+                since = parse_bound(options['since']) if options['since'] else None
+                until = parse_bound(options['until']) if options['until'] else None
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        chunks = stream_export(options['dataset'], options['output'], since, until, options['gzip'])
+        if options['file']:
+            with open(options['file'], 'wb') as out:
+                written = sum(out.write(chunk) for chunk in chunks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['file']}"))
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
@@ -0,0 +1,54 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from kumbh import name_index
+from kumbh.routers import database_for
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Copy rows of tables routed to their own database (HOT_TABLE_DATABASES) out of the default database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Delete the rows from the default database once copied')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        tables = source.introspection.table_names()
+        for label in getattr(settings, 'HOT_TABLE_DATABASES', {}):
+            alias = database_for(label)
+            model = apps.get_model(label)
+            if alias is None or model._meta.db_table not in tables:
+                self.stdout.write(f'{label}: nothing to move')
+                continue
+
+            copied = 0
+            rows = model._base_manager.using(DEFAULT_DB_ALIAS).order_by('pk')
+            last_pk = None
+            while True:
+                batch = list((rows.filter(pk__gt=last_pk) if last_pk is not None else rows)[:BATCH_SIZE])
+                if not batch:
+                    break
+                # Primary keys are kept, so rows already copied are skipped on a re-run
+                with transaction.atomic(using=alias):
+                    model._base_manager.using(alias).bulk_create(batch, ignore_conflicts=True)
+                copied += len(batch)
+                last_pk = batch[-1].pk
+            self.stdout.write(f'{label}: copied {copied} rows to {alias}')
+
+            if model in name_index.SOURCES and copied:
+                # Migration 0013 skips indexing routed tables, and bulk_create
+                # sends no post_save, so the copied names are indexed here
+                indexed = name_index.rebuild(model)
+                self.stdout.write(f'{label}: indexed {indexed} names')
+
+            if options['delete'] and copied:
+                # Raw SQL: deleting through the ORM would fire post_delete and
+                # drop the name index entries of the rows that were just moved
+                with source.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {source.ops.quote_name(model._meta.db_table)}')
+                    deleted = cursor.rowcount
+                self.stdout.write(f'{label}: deleted {deleted} rows from {DEFAULT_DB_ALIAS}')
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from kumbh.jobs import default_worker_id, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued and periodic background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run due jobs once and exit')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when no job is due')
+        parser.add_argument('--worker-id', default=None, help='Identifier recorded on claimed jobs')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+
+        if options['once']:
+            count = run_pending(worker_id)
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} job(s)'))
+            return
+
+        self.stdout.write(f'Job runner {worker_id} started')
+        try:
+            while True:
+                count = run_pending(worker_id)
+                if count:
+                    self.stdout.write(f'Ran {count} job(s)')
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Job runner stopped'))
@@ -0,0 +1,71 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _wal_size(connection):
+    path = f"{connection.settings_dict['NAME']}-wal"
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _pragma(cursor, name):
+    return cursor.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint the WAL, refresh query planner statistics and reclaim free pages of the SQLite databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', help='Database alias; defaults to every SQLite database')
+        parser.add_argument('--vacuum-pages', type=int, default=1000, help='Free pages to reclaim per run (0 for all)')
+        parser.add_argument(
+            '--enable-incremental-vacuum',
+            action='store_true',
+            help='Switch auto_vacuum to INCREMENTAL; this runs a full VACUUM once and locks the database meanwhile',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or [alias for alias in connections if connections[alias].vendor == 'sqlite']
+        for alias in aliases:
+            if alias not in connections:
+                raise CommandError(f'Unknown database: {alias}')
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                raise CommandError(f'{alias} is not an SQLite database')
+            self._maintain(alias, connection, options)
+
+    def _maintain(self, alias, connection, options):
+        with connection.cursor() as cursor:
+            page_size = _pragma(cursor, 'page_size')
+            wal_before = _wal_size(connection)
+            self.stdout.write(
+                f"{alias} ({connection.settings_dict['NAME']}): journal_mode={_pragma(cursor, 'journal_mode')}, "
+                f"{_pragma(cursor, 'page_count') * page_size / 1024 / 1024:.1f} MB, "
+                f"{_pragma(cursor, 'freelist_count')} free pages, WAL {wal_before / 1024:.0f} KB"
+            )
+
+            if options['enable_incremental_vacuum'] and _pragma(cursor, 'auto_vacuum') != 2:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+                self.stdout.write('  auto_vacuum set to INCREMENTAL')
+
+            # Lets the planner pick indexes from fresh statistics; cheap when
+            # little has changed since the last run
+            cursor.execute('PRAGMA analysis_limit = 1000')
+            cursor.execute('ANALYZE')
+            cursor.execute('PRAGMA optimize')
+
+            if _pragma(cursor, 'auto_vacuum') == 2:
+                free = _pragma(cursor, 'freelist_count')
+                cursor.execute(f"PRAGMA incremental_vacuum({options['vacuum_pages'] or free})")
+                self.stdout.write(f"  reclaimed {free - _pragma(cursor, 'freelist_count')} free pages")
+            else:
+                self.stdout.write('  incremental vacuum off (see --enable-incremental-vacuum)')
+
+            busy, log_frames, checkpointed = cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+            if busy:
+                self.stdout.write(
+                    f'  checkpoint incomplete, readers still active: {checkpointed} of {log_frames} frames copied'
+                )
+            self.stdout.write(f'  WAL {wal_before / 1024:.0f} KB -> {_wal_size(connection) / 1024:.0f} KB')
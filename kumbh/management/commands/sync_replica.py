@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database over SQLite replicas, standing in for replication when developing locally'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying every INTERVAL seconds, simulating replication lag')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite databases; real replicas replicate on their own')
+        replicas = [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ()) if alias in settings.DATABASES]
+        if not replicas:
+            raise CommandError('No DATABASE_REPLICAS are configured')
+
+        while True:
+            source.ensure_connection()
+            for alias in replicas:
+                started = time.perf_counter()
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    # The backup API copies a consistent snapshot, even while the default database is written to
+                    source.connection.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: synced in {(time.perf_counter() - started) * 1000:.0f}ms')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,183 @@
+"""
+Automatic matching of lost reports against found reports.
+
+Candidates are only drawn from blocks that share a key with the new report:
+the same phonetic name key, or a neighbouring geohash cell with a similar age.
+Each candidate pair is scored on name similarity, age difference, distance and
+time gap, and the best pairs are stored as LostFoundMatch rows. Matching runs
+as a background job whenever a report is created, and again when an update
+changes a field the score depends on (MATCH_FIELDS); candidates that no longer
+score high enough are then dropped.
+"""
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_save
+
+from .geo import haversine_km, neighbors
+from .models import LostFound, LostFoundMatch
+from .names import normalize
+
+AGE_BAND = 5  # years either side of the report's age
+MAX_AGE_GAP = 15  # years at which age similarity drops to zero
+MAX_DISTANCE_KM = 10.0
+MAX_HOURS = 72.0
+
+WEIGHTS = {
+    'name': 0.45,
+    'age': 0.2,
+    'distance': 0.2,
+    'time': 0.15,
+}
+# Component score used when one side of a pair is missing the data
+UNKNOWN = 0.5
+
+DEFAULT_MIN_SCORE = 0.55
+DEFAULT_MAX_CANDIDATES = 20
+DEFAULT_BLOCK_LIMIT = 500
+
+# Fields whose change on an update re-runs matching for the report
+MATCH_FIELDS = ('report_type', 'person_name', 'age', 'latitude', 'longitude')
+
+
+@dataclass
+class MatchScore:
+    score: float
+    name_score: float
+    age_score: float
+    distance_km: float
+    hours_apart: float
+
+
+def name_similarity(a, b):
+    a, b = normalize(a), normalize(b)
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score_pair(lost, found):
+    """Score how likely two reports describe the same person"""
+    name_score = name_similarity(lost.person_name, found.person_name)
+    if lost.name_key and lost.name_key == found.name_key:
+        # Same phonetic key: spelling variants of the same name
+        name_score = max(name_score, 0.85)
+
+    if lost.age is not None and found.age is not None:
+        age_score = max(0.0, 1 - abs(lost.age - found.age) / MAX_AGE_GAP)
+    else:
+        age_score = UNKNOWN
+
+    distance_km = None
+    distance_score = UNKNOWN
+    if None not in (lost.latitude, lost.longitude, found.latitude, found.longitude):
+        distance_km = haversine_km(lost.latitude, lost.longitude, found.latitude, found.longitude)
+        distance_score = max(0.0, 1 - distance_km / MAX_DISTANCE_KM)
+
+    hours_apart = abs((found.created_at - lost.created_at).total_seconds()) / 3600
+    time_score = max(0.0, 1 - hours_apart / MAX_HOURS)
+
+    score = (
+        WEIGHTS['name'] * name_score
+        + WEIGHTS['age'] * age_score
+        + WEIGHTS['distance'] * distance_score
+        + WEIGHTS['time'] * time_score
+    )
+    return MatchScore(score, name_score, age_score, distance_km, hours_apart)
+
+
+def blocking_query(report):
+    """Q matching reports that share at least one block with `report`"""
+    blocks = Q()
+    if report.name_key:
+        blocks |= Q(name_key=report.name_key)
+    if report.geo_cell:
+        nearby = Q(geo_cell__in=neighbors(report.geo_cell))
+        if report.age is not None:
+            nearby &= Q(age__range=(report.age - AGE_BAND, report.age + AGE_BAND)) | Q(age__isnull=True)
+        blocks |= nearby
+    return blocks
+
+
+def candidates_for(report):
+    blocks = blocking_query(report)
+    if not blocks:
+        return LostFound.objects.none()
+    opposite = 'found' if report.report_type == 'lost' else 'lost'
+    limit = getattr(settings, 'MATCH_BLOCK_LIMIT', DEFAULT_BLOCK_LIMIT)
+    return LostFound.objects.filter(
+        blocks,
+        report_type=opposite,
+        status='open',
+        is_active=True,
+    ).order_by('-created_at')[:limit]
+
+
+def match_report(report):
+    """Score `report` against its candidates and store the best pairs"""
+    min_score = getattr(settings, 'MATCH_MIN_SCORE', DEFAULT_MIN_SCORE)
+    max_candidates = getattr(settings, 'MATCH_MAX_CANDIDATES', DEFAULT_MAX_CANDIDATES)
+
+    scored = []
+    for candidate in candidates_for(report):
+        lost, found = (report, candidate) if report.report_type == 'lost' else (candidate, report)
+        result = score_pair(lost, found)
+        if result.score >= min_score:
+            scored.append((lost, found, result))
+    scored.sort(key=lambda item: item[2].score, reverse=True)
+    kept = scored[:max_candidates]
+
+    with transaction.atomic():
+        # Unreviewed candidates from an earlier run that no longer make the cut
+        stale = LostFoundMatch.objects.filter(Q(lost=report) | Q(found=report), status='candidate')
+        for lost, found, _ in kept:
+            stale = stale.exclude(lost=lost, found=found)
+        stale.delete()
+        for lost, found, result in kept:
+            LostFoundMatch.objects.update_or_create(
+                lost=lost,
+                found=found,
+                defaults={
+                    'score': result.score,
+                    'name_score': result.name_score,
+                    'age_score': result.age_score,
+                    'distance_km': result.distance_km,
+                    'hours_apart': result.hours_apart,
+                },
+            )
+    return len(kept)
+
+
+def matches_for(report):
+    """Stored candidate matches for a report, best first"""
+    if report.report_type == 'lost':
+        return LostFoundMatch.objects.filter(lost=report).exclude(status='rejected').select_related('found__photo')
+    return LostFoundMatch.objects.filter(found=report).exclude(status='rejected').select_related('lost__photo')
+
+
+def _note_match_changes(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._match_fields_changed = False
+    if raw or instance._state.adding:
+        return
+    fields = [field for field in MATCH_FIELDS if update_fields is None or field in update_fields]
+    if not fields:
+        return
+    stored = LostFound.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._match_fields_changed = stored is not None and any(
+        # to_python() so a '25.4' from a form equals the stored Decimal
+        stored[field] != sender._meta.get_field(field).to_python(getattr(instance, field)) for field in fields
+    )
+
+
+def _enqueue_matching(sender, instance, created, **kwargs):
+    if not (created or getattr(instance, '_match_fields_changed', False)):
+        return
+    from .jobs import enqueue
+    transaction.on_commit(lambda: enqueue('match_lost_found', {'report_id': instance.pk}))
+
+
+pre_save.connect(_note_match_changes, sender=LostFound, dispatch_uid='lost_found_matching_changes')
+post_save.connect(_enqueue_matching, sender=LostFound, dispatch_uid='lost_found_matching')
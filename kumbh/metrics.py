@@ -0,0 +1,386 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+MetricsMiddleware records, for each view name and method, a latency
+histogram, responses by status code, database queries and their time, and
+response bytes. Recording takes no lock: every thread adds to its own store,
+and the stores are only merged when the process writes its snapshot.
+
+Worker processes share nothing in memory, so each one writes its snapshot
+to METRICS_DIR as <pid>-<start>.json at most every METRICS_FLUSH_INTERVAL
+seconds (and on exit), and /metrics sums the files of every worker. A
+worker's gauges are dropped once its file is older than a few flush
+intervals; if its process has also exited, the next scrape folds its
+counters into retired.json and deletes the file, so the totals keep them
+while the directory stays small. Process ids are checked on this host, so
+METRICS_DIR must not be shared between hosts. Empty it after changing
+METRICS_BUCKETS.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import locks
+
+from . import response_cache
+from .load_shedding import shedder
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_FLUSH_INTERVAL = 5.0
+GAUGE_MAX_AGE = 3  # flush intervals after which a worker's gauges are considered gone
+UNMATCHED = 'unmatched'  # requests that resolved no view, so 404 scans cannot add series
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+RETIRED = 'retired.json'  # counters of workers that have exited
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'metrics'))
+
+
+def buckets():
+    return tuple(getattr(settings, 'METRICS_BUCKETS', DEFAULT_BUCKETS))
+
+
+class QueryCounter:
+    """connection.execute_wrapper() hook counting the queries of one request"""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class _Series:
+    __slots__ = ('count', 'seconds', 'buckets', 'statuses', 'queries', 'query_seconds', 'bytes')
+
+    def __init__(self, size):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * size  # per bucket, not cumulative; the last one is +Inf
+        self.statuses = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.bytes = 0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'seconds': self.seconds,
+            'buckets': list(self.buckets),
+            'statuses': dict(self.statuses),
+            'queries': self.queries,
+            'query_seconds': self.query_seconds,
+            'bytes': self.bytes,
+        }
+
+
+def _merge(into, series):
+    into['count'] += series['count']
+    into['seconds'] += series['seconds']
+    into['buckets'] = [a + b for a, b in zip(into['buckets'], series['buckets'])]
+    for code, count in series['statuses'].items():
+        into['statuses'][code] = into['statuses'].get(code, 0) + count
+    into['queries'] += series['queries']
+    into['query_seconds'] += series['query_seconds']
+    into['bytes'] += series['bytes']
+
+
+def _empty(size):
+    return _Series(size).as_dict()
+
+
+def _totals(bounds):
+    """An empty snapshot, to fold worker snapshots into"""
+    return {
+        'buckets': list(bounds),
+        'series': {},
+        'load_shedding': {'admitted': {}, 'shed': {}, 'served_stale': 0},
+        'response_cache': {},
+    }
+
+
+def _fold(into, snapshot):
+    """Add the counters of a snapshot with the same buckets to `into`"""
+    size = len(into['buckets']) + 1
+    for key, values in snapshot['series'].items():
+        _merge(into['series'].setdefault(key, _empty(size)), values)
+    shedding = into['load_shedding']
+    for outcome in ('admitted', 'shed'):
+        for priority, count in snapshot['load_shedding'][outcome].items():
+            shedding[outcome][priority] = shedding[outcome].get(priority, 0) + count
+    shedding['served_stale'] += snapshot['load_shedding']['served_stale']
+    for result, count in snapshot['response_cache'].items():
+        into['response_cache'][result] = into['response_cache'].get(result, 0) + count
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the list of stores, not the stores
+        self._stores = []  # (thread, {(view, method): _Series})
+        self._retired = {}  # merged series of threads that have exited
+        self._flush_lock = threading.Lock()
+        self._next_flush = 0.0
+        self._pid = None
+        self._path = None
+
+    def _store(self):
+        store = getattr(self._local, 'store', None)
+        if store is None:
+            store = self._local.store = {}
+            with self._lock:
+                self._stores.append((threading.current_thread(), store))
+        return store
+
+    def observe(self, view, method, status_code, seconds, queries=0, query_seconds=0.0, size=0):
+        bounds = buckets()
+        store = self._store()
+        key = (view, method if method in METHODS else 'other')
+        series = store.get(key)
+        if series is None:
+            series = store[key] = _Series(len(bounds) + 1)
+        series.count += 1
+        series.seconds += seconds
+        series.buckets[bisect.bisect_left(bounds, seconds)] += 1
+        series.statuses[status_code] = series.statuses.get(status_code, 0) + 1
+        series.queries += queries
+        series.query_seconds += query_seconds
+        series.bytes += size
+
+    def snapshot(self):
+        """This process's series merged across threads, as {'view\\tmethod': series dict}"""
+        size = len(buckets()) + 1
+        with self._lock:
+            alive = []
+            for thread, store in self._stores:
+                if thread.is_alive():
+                    alive.append((thread, store))
+                else:
+                    # Threads of a thread-per-request server come and go
+                    for key, series in list(store.items()):
+                        _merge(self._retired.setdefault(key, _empty(size)), series.as_dict())
+            self._stores = alive
+            merged = {key: {**series, 'buckets': list(series['buckets']), 'statuses': dict(series['statuses'])}
+                      for key, series in self._retired.items()}
+            stores = [store for _, store in alive]
+        for store in stores:
+            # dict() copies in one step, while the owning thread may be adding keys
+            for key, series in dict(store).items():
+                _merge(merged.setdefault(key, _empty(size)), series.as_dict())
+        return {f'{view}\t{method}': series for (view, method), series in merged.items()}
+
+    def _file(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            # A new process, or a worker forked from a preloaded parent
+            self._pid = pid
+            self._path = metrics_dir() / f'{pid}-{time.time_ns()}.json'
+        return self._path
+
+    def flush(self):
+        with self._flush_lock:
+            self._write()
+
+    def _write(self):
+        data = {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'buckets': buckets(),
+            'series': self.snapshot(),
+            'load_shedding': shedder.stats(),
+            'response_cache': dict(response_cache.stats),
+        }
+        path = self._file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, path)
+
+    def maybe_flush(self):
+        """Write the snapshot if the flush interval has passed, unless another thread is writing it"""
+        now = time.monotonic()
+        if now < self._next_flush or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = now + getattr(settings, 'METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+            self._write()
+        finally:
+            self._flush_lock.release()
+
+
+registry = Registry()
+
+
+@atexit.register
+def _flush_on_exit():
+    if registry._pid is not None:
+        registry.flush()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, but belongs to another user
+    return True
+
+
+def _max_age():
+    return GAUGE_MAX_AGE * getattr(settings, 'METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+
+def prune(now=None):
+    """Fold the files of workers that have exited into RETIRED and delete them"""
+    directory = metrics_dir()
+    now = time.time() if now is None else now
+    gone = []
+    for path in directory.glob('*-*.json'):
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        # A live worker that is idle has an old file too, and will write it again
+        if now - snapshot['written_at'] > _max_age() and not _running(snapshot['pid']):
+            gone.append(path)
+    if not gone:
+        return []
+    retired_path = directory / RETIRED
+    with open(directory / '.lock', 'a') as lock_file:
+        # Another process scraping at the same time may be folding the same files
+        locks.lock(lock_file, locks.LOCK_EX)
+        try:
+            try:
+                retired = json.loads(retired_path.read_text())
+            except FileNotFoundError:
+                retired = _totals(buckets())
+            folded = []
+            for path in gone:
+                try:
+                    snapshot = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                if snapshot['buckets'] == retired['buckets']:
+                    _fold(retired, snapshot)
+                folded.append(path)
+            temporary = retired_path.with_suffix('.tmp')
+            temporary.write_text(json.dumps(retired))
+            os.replace(temporary, retired_path)
+            for path in folded:
+                path.unlink()
+        finally:
+            locks.unlock(lock_file)
+    return folded
+
+
+def read_all():
+    """Snapshots of every worker, with this process's written first so it is current"""
+    registry.flush()
+    snapshots = []
+    for path in sorted(metrics_dir().glob('*.json')):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Removed or replaced while listing
+            continue
+    return snapshots
+
+
+def exposition():
+    """Prometheus text exposition of every worker's metrics"""
+    bounds = buckets()
+    now = time.time()
+    prune(now)
+    totals = _totals(bounds)
+    gauges = []
+    for snapshot in read_all():
+        if tuple(snapshot['buckets']) != bounds:
+            continue
+        _fold(totals, snapshot)
+        if 'pid' in snapshot and now - snapshot['written_at'] <= _max_age():
+            gauges.append((snapshot['pid'], snapshot['load_shedding']))
+    series = totals['series']
+    shedding = totals['load_shedding']
+    shed_counts = {
+        (priority, outcome): count for outcome in ('admitted', 'shed') for priority, count in shedding[outcome].items()
+    }
+    shed_counts[('read', 'stale')] = shedding['served_stale']
+    cache_counts = totals['response_cache']
+
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    keys = sorted(series)
+    family('kumbh_http_request_duration_seconds', 'histogram', 'Time from request to response, by view and method.')
+    for key in keys:
+        view, method = key.split('\t')
+        values = series[key]
+        cumulative = 0
+        for bound, count in zip(bounds + ('+Inf',), values['buckets']):
+            cumulative += count
+            le = bound if bound == '+Inf' else _number(float(bound))
+            lines.append(f'kumbh_http_request_duration_seconds_bucket{_labels(view=view, method=method, le=le)} {cumulative}')
+        lines.append(f'kumbh_http_request_duration_seconds_sum{_labels(view=view, method=method)} {_number(values["seconds"])}')
+        lines.append(f'kumbh_http_request_duration_seconds_count{_labels(view=view, method=method)} {values["count"]}')
+
+    family('kumbh_http_responses_total', 'counter', 'Responses by view, method and status code.')
+    for key in keys:
+        view, method = key.split('\t')
+        for code, count in sorted(series[key]['statuses'].items()):
+            lines.append(f'kumbh_http_responses_total{_labels(view=view, method=method, status=code)} {count}')
+
+    for name, field, help_text in (
+        ('kumbh_db_queries_total', 'queries', 'Database queries made while handling requests.'),
+        ('kumbh_db_query_duration_seconds_total', 'query_seconds', 'Time spent in database queries.'),
+        ('kumbh_http_response_bytes_total', 'bytes', 'Response body bytes sent, after compression; streamed bodies are not counted.'),
+    ):
+        family(name, 'counter', help_text)
+        for key in keys:
+            view, method = key.split('\t')
+            lines.append(f'{name}{_labels(view=view, method=method)} {_number(series[key][field])}')
+
+    family('kumbh_load_shedding_requests_total', 'counter', 'Requests admitted, shed, or answered stale, by priority.')
+    for (priority, outcome), count in sorted(shed_counts.items()):
+        lines.append(f'kumbh_load_shedding_requests_total{_labels(priority=priority, outcome=outcome)} {count}')
+    family('kumbh_load_shedding_in_flight', 'gauge', 'Requests in flight per worker.')
+    for pid, shedding in gauges:
+        lines.append(f'kumbh_load_shedding_in_flight{_labels(pid=pid)} {shedding["in_flight"]}')
+    family('kumbh_load_shedding_load', 'gauge', 'Load per worker, where 1.0 is at capacity.')
+    for pid, shedding in gauges:
+        lines.append(f'kumbh_load_shedding_load{_labels(pid=pid)} {_number(float(shedding["load"]))}')
+
+    family('kumbh_response_cache_lookups_total', 'counter', 'Response cache lookups by result.')
+    for result, count in sorted(cache_counts.items()):
+        lines.append(f'kumbh_response_cache_lookups_total{_labels(result=result)} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,439 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import compression, profiling, tracing
+from .load_shedding import BULK, READ, classify, shedder, view_name
+from .metrics import UNMATCHED, QueryCounter, registry
+from .models import RequestProfile
+from .presence import tracker
+from .routers import replica_aliases, replica_reads
+
+STALE_PREFIX = 'shed:stale:'
+DEFAULT_RETRY_AFTER = 5
+DEFAULT_STALE_TTL = 60 * 60
+DEFAULT_STALE_REFRESH = 30
+STALE_PATHS_LIMIT = 10000  # distinct paths remembered before the refresh times are reset
+
+
+class LoadSheddingMiddleware:
+    """
+    Shed low-priority requests when this worker is overloaded (see kumbh/load_shedding.py).
+
+    The decision is made in process_view, once the view is known. Shed reads
+    get the last good copy of the same URL if one was kept; everything else
+    that is shed gets a 503 with Retry-After. Keep this near the top of
+    MIDDLEWARE so shed requests skip the rest of the view middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._stale_saved = {}
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        shedder.begin()
+        admitted = False
+        try:
+            response = self.get_response(request)
+            priority = getattr(request, '_load_priority', None)
+            admitted = priority is not None and not getattr(request, '_load_shed', False)
+            if admitted and priority == READ:
+                self._keep_stale(request, response)
+            return response
+        finally:
+            shedder.end(time.perf_counter() - started if admitted else None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        priority = classify(request, view_func)
+        request._load_priority = priority
+        if not shedder.should_shed(priority):
+            shedder.record(priority, admitted=True)
+            return None
+
+        request._load_shed = True
+        if priority == READ:
+            response = self._stale_response(request)
+            if response is not None:
+                shedder.record(priority, admitted=False, stale=True)
+                return response
+        shedder.record(priority, admitted=False)
+        response = JsonResponse(
+            {'detail': 'The service is under heavy load, please retry shortly.'}
+            if priority != BULK else
+            {'detail': 'This page is paused during peak load, please retry shortly.'},
+            status=503,
+        )
+        response['Retry-After'] = str(getattr(settings, 'LOAD_SHEDDING_RETRY_AFTER', DEFAULT_RETRY_AFTER))
+        response['X-Load-Shed'] = priority
+        return response
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'LOAD_SHEDDING_CACHE', 'default')]
+
+    def _keep_stale(self, request, response):
+        """Remember a successful read, at most once per LOAD_SHEDDING_STALE_REFRESH per URL"""
+        if request.method != 'GET' or response.status_code != 200 or response.streaming:
+            return
+        path = request.get_full_path()
+        now = time.monotonic()
+        refresh = getattr(settings, 'LOAD_SHEDDING_STALE_REFRESH', DEFAULT_STALE_REFRESH)
+        if now - self._stale_saved.get(path, -refresh) < refresh:
+            return
+        if len(self._stale_saved) >= STALE_PATHS_LIMIT:
+            self._stale_saved.clear()
+        self._stale_saved[path] = now
+        self._cache().set(
+            STALE_PREFIX + path,
+            (response.content, response['Content-Type'], time.time()),
+            timeout=getattr(settings, 'LOAD_SHEDDING_STALE_TTL', DEFAULT_STALE_TTL),
+        )
+
+    def _stale_response(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        kept = self._cache().get(STALE_PREFIX + request.get_full_path())
+        if kept is None:
+            return None
+        content, content_type, saved_at = kept
+        response = HttpResponse(content, content_type=content_type)
+        response['Age'] = str(max(int(time.time() - saved_at), 0))
+        response['X-Load-Shed'] = 'stale'
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status, database queries and response size per view (see kumbh/metrics.py).
+
+    Installed first so the latency covers every other middleware and the size
+    is what is sent after compression.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        # What connection.execute_wrapper() does, for every alias at once
+        wrapped = [connections[alias] for alias in connections]
+        for connection in wrapped:
+            connection.execute_wrappers.append(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(counter)
+        duration = time.perf_counter() - started
+        registry.observe(
+            getattr(request, 'metrics_view', UNMATCHED),
+            request.method,
+            response.status_code,
+            duration,
+            counter.count,
+            counter.seconds,
+            0 if response.streaming else len(response.content),
+        )
+        registry.maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func)
+        return None
+
+
+class TracingMiddleware:
+    """
+    Trace sampled requests: a server span for the request with spans for the
+    view, serializers and SQL queries beneath it (see kumbh/tracing.py).
+
+    Sampling waits for process_view(), where the view is known, so requests
+    that are not sampled never get the SQL hook. Sampled responses carry
+    their trace id in X-Trace-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        tracing.instrument()
+
+    def __call__(self, request):
+        request.trace_started_ns = time.time_ns()
+        with tracing.request_scope():
+            response = self.get_response(request)
+        trace = getattr(request, 'trace', None)
+        if trace is None:
+            return response
+        root, tracer, wrapped = trace
+        for connection in wrapped:
+            connection.execute_wrappers.remove(tracer)
+        root.attributes['http.response.status_code'] = response.status_code
+        if response.status_code >= 500:
+            root.status = (tracing.STATUS_ERROR, response.reason_phrase)
+        tracing.finish(root)
+        response['X-Trace-Id'] = root.trace.trace_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = view_name(view_func)
+        parent = tracing.parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+        if parent is not None:
+            # The caller already decided
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = None, None, tracing.sampled(name)
+        if not sampled:
+            return None
+
+        route = request.resolver_match.route if request.resolver_match is not None else ''
+        root = tracing.start(
+            trace_id,
+            parent_id,
+            name=f'{request.method} /{route}' if route else request.method,
+            kind=tracing.SERVER,
+            start_ns=request.trace_started_ns,
+            attributes={
+                'http.request.method': request.method,
+                'url.path': request.path,
+                'http.route': f'/{route}' if route else None,
+                'code.function': name,
+            },
+        )
+        tracer = tracing.QueryTracer()
+        wrapped = [connections[alias] for alias in connections]
+        for connection in wrapped:
+            connection.execute_wrappers.append(tracer)
+        request.trace = (root, tracer, wrapped)
+        return None
+
+
+DEFAULT_COMPRESSION_MIN_SIZE = 512
+DEFAULT_COMPRESSION_LEVELS = {'br': 5, 'gzip': 6}
+DEFAULT_COMPRESSION_CACHED_LEVELS = {'br': 9, 'gzip': 9}
+DEFAULT_COMPRESSION_CACHE_TTL = 60 * 60
+COMPRESSED_PREFIX = 'compressed:'
+NO_TRANSFORM = _lazy_re_compile(r'\bno-transform\b')
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with Brotli or gzip, whichever the client prefers (see kumbh/compression.py).
+
+    Responses from response_cache.cached_response() name the cache entry
+    version they were rendered from; their compressed bodies are cached under
+    that version at the higher COMPRESSION_CACHED_LEVELS, so a hot list is
+    compressed once per version and encoding instead of on every request.
+    Streaming responses (exports gzip their own) are passed through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._applies(response):
+            return response
+        # Any response that could be compressed depends on Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        version = getattr(response, 'compression_key', None)
+        if version is not None:
+            content = self._cached(response, version, encoding)
+        else:
+            levels = getattr(settings, 'COMPRESSION_LEVELS', DEFAULT_COMPRESSION_LEVELS)
+            content = compression.compress(response.content, encoding, levels[encoding])
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # The compressed body is a different representation, as Django's GZipMiddleware also says
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def _applies(response):
+        if response.streaming or response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        if NO_TRANSFORM.search(response.get('Cache-Control', '')):
+            return False
+        if not compression.compressible(response.get('Content-Type', '')):
+            return False
+        return len(response.content) >= getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_COMPRESSION_MIN_SIZE)
+
+    @staticmethod
+    def _cached(response, version, encoding):
+        # The same data renders differently per media type (?format=, indent=)
+        media_type = getattr(response, 'accepted_media_type', None) or response.get('Content-Type', '')
+        digest = hashlib.blake2b(f'{version}|{media_type}'.encode(), digest_size=16).hexdigest()
+        key = f'{COMPRESSED_PREFIX}{digest}:{encoding}'
+        cache = caches[getattr(settings, 'COMPRESSION_CACHE', 'default')]
+        content = cache.get(key)
+        if content is None:
+            levels = getattr(settings, 'COMPRESSION_CACHED_LEVELS', DEFAULT_COMPRESSION_CACHED_LEVELS)
+            content = compression.compress(response.content, encoding, levels[encoding])
+            cache.set(key, content, timeout=getattr(settings, 'COMPRESSION_CACHE_TTL', DEFAULT_COMPRESSION_CACHE_TTL))
+        return content
+
+
+# GET views whose reads may be served by a replica, plus the Django admin
+REPLICA_VIEWS = frozenset({'zones_list', 'amenities_list', 'lost_found_list'})
+REPLICA_NAMESPACES = frozenset({'admin'})
+DEFAULT_REPLICA_PIN_SECONDS = 5
+PIN_PREFIX = 'replica:pin:'
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def client_key(request):
+    """Identify the client that sent a request, without authenticating it"""
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if credential:
+        return hashlib.blake2b(credential.encode(), digest_size=16).hexdigest()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class ReadReplicaMiddleware:
+    """
+    Let reads of REPLICA_VIEWS GETs and admin pages go to DATABASE_REPLICAS (see kumbh/routers.py).
+
+    A client that made a POST, PUT, PATCH or DELETE is pinned to the primary
+    for DATABASE_REPLICA_PIN_SECONDS, so it sees its own writes even when the
+    replicas lag. Clients are told apart by their Authorization header or
+    session cookie, falling back to the address.
+
+    The pin must be seen by whichever worker serves the client's next request,
+    so DATABASE_REPLICA_PIN_CACHE has to be a cache shared by all of them;
+    with replicas configured, a per-process cache refuses to start.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if replica_aliases() and isinstance(self._cache(), PROCESS_LOCAL_CACHES):
+            raise ImproperlyConfigured(
+                'DATABASE_REPLICA_PIN_CACHE must name a cache shared by every worker, '
+                'not a local-memory or dummy cache, when DATABASE_REPLICAS are configured'
+            )
+
+    def __call__(self, request):
+        token = replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_aliases():
+            self._cache().set(
+                PIN_PREFIX + client_key(request),
+                1,
+                timeout=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_REPLICA_PIN_SECONDS),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or not replica_aliases():
+            return None
+        match = request.resolver_match
+        if view_name(view_func) not in REPLICA_VIEWS and (match is None or match.namespace not in REPLICA_NAMESPACES):
+            return None
+        if self._cache().get(PIN_PREFIX + client_key(request)) is None:
+            replica_reads.set(True)
+        return None
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'DATABASE_REPLICA_PIN_CACHE', 'default')]
+
+
+class ProfilingMiddleware:
+    """
+    Profile staff requests to /api/ sent with ?__profile=1 or X-Profile: 1 (see kumbh/profiling.py).
+
+    Installed after AuthenticationMiddleware so staff signed in to the
+    dashboard qualify as well as JWT bearers. The profile covers this
+    middleware's get_response(): the view and the middleware after it. Its
+    id is returned in the X-Profile-Id header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.requested(request):
+            return self.get_response(request)
+        user = self._staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        recorder = profiling.QueryRecorder()
+        wrapped = [connections[alias] for alias in connections]
+        for connection in wrapped:
+            connection.execute_wrappers.append(recorder)
+        try:
+            with profiling.Sampler() as sampler:
+                response = self.get_response(request)
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(recorder)
+        duration = time.perf_counter() - recorder.started
+
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            requested_by=user.get_username(),
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            view=view_name(match.func) if match is not None else '',
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 3),
+            sample_count=sampler.samples,
+            query_count=len(recorder.queries),
+            query_ms=round(sum(query['ms'] for query in recorder.queries), 3),
+            stacks=sampler.collapsed(),
+            queries=recorder.queries,
+        )
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    @staticmethod
+    def _staff_user(request):
+        """The staff user behind a request, from the session or the API's authenticators"""
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            api_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+            try:
+                user = api_request.user
+            except APIException:
+                return None
+        return user if user.is_authenticated and user.is_staff else None
+
+
+class PresenceMiddleware:
+    """Refresh the presence heartbeat of the authenticated user on every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the JWT-authenticated user back onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            tracker.touch(user.email)
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0008_lostfound'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Registered job name', max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Keyword arguments passed to the job')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', help_text='Current job status', max_length=20)),
+                ('run_at', models.DateTimeField(help_text='Earliest time the job may run')),
+                ('attempts', models.IntegerField(default=0, help_text='Number of times the job has been started')),
+                ('max_attempts', models.IntegerField(default=3, help_text='Attempts before the job is marked as failed')),
+                ('last_error', models.TextField(blank=True, help_text='Error from the last failed attempt', null=True)),
+                ('locked_by', models.CharField(blank=True, help_text='Worker currently running the job', max_length=100, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, help_text='When the running worker claimed the job', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'jobs',
+                'ordering': ['run_at'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TourGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the tour group', max_length=255)),
+                ('leader_email', models.EmailField(help_text='Email of the user who created the group', max_length=254)),
+                ('join_token', models.CharField(help_text='Token shared as a link or QR code to join the group', max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tour Group',
+                'verbose_name_plural': 'Tour Groups',
+                'db_table': 'tour_groups',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TourGroupMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_email', models.EmailField(help_text='Email of the member', max_length=254)),
+                ('name', models.CharField(help_text='Display name of the member', max_length=255)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='kumbh.tourgroup')),
+            ],
+            options={
+                'verbose_name': 'Tour Group Member',
+                'verbose_name_plural': 'Tour Group Members',
+                'db_table': 'tour_group_members',
+                'ordering': ['joined_at'],
+                'indexes': [models.Index(fields=['user_email'], name='tour_group_member_email_idx')],
+                'unique_together': {('group', 'user_email')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from kumbh.search import FTS_SETUP_SQL, fts5_supported
+
+    # Other backends fall back to the in-process index in kumbh.search
+    if not fts5_supported(schema_editor.connection):
+        return
+    for statement in FTS_SETUP_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    from kumbh.search import FTS_TEARDOWN_SQL
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_TEARDOWN_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0010_tourgroup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
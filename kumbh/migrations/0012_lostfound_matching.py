@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_match_keys(apps, schema_editor):
+    from kumbh.geo import encode
+    from kumbh.names import name_key
+
+    LostFound = apps.get_model('kumbh', 'LostFound')
+    for report in LostFound.objects.all().iterator():
+        if report.latitude is not None and report.longitude is not None:
+            report.geo_cell = encode(report.latitude, report.longitude)
+        report.name_key = name_key(report.person_name) or None
+        report.save(update_fields=['geo_cell', 'name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0011_lostfound_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lostfound',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Geohash cell of the location, used to find nearby reports', max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='lostfound',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text="Phonetic key of the person's name, used to find similar names", max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='LostFoundMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Overall match score (0-1)')),
+                ('name_score', models.FloatField(help_text='Name similarity (0-1)')),
+                ('age_score', models.FloatField(help_text='Age closeness (0-1)')),
+                ('distance_km', models.FloatField(blank=True, help_text='Distance between the two locations', null=True)),
+                ('hours_apart', models.FloatField(help_text='Time between the two reports')),
+                ('status', models.CharField(choices=[('candidate', 'Candidate'), ('confirmed', 'Confirmed'), ('rejected', 'Rejected')], default='candidate', help_text='Review status', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('found', models.ForeignKey(help_text='The found report', on_delete=django.db.models.deletion.CASCADE, related_name='lost_matches', to='kumbh.lostfound')),
+                ('lost', models.ForeignKey(help_text='The lost report', on_delete=django.db.models.deletion.CASCADE, related_name='found_matches', to='kumbh.lostfound')),
+            ],
+            options={
+                'verbose_name': 'Lost & Found Match',
+                'verbose_name_plural': 'Lost & Found Matches',
+                'db_table': 'lost_found_matches',
+                'ordering': ['-score'],
+                'unique_together': {('lost', 'found')},
+            },
+        ),
+        migrations.RunPython(backfill_match_keys, migrations.RunPython.noop),
+    ]
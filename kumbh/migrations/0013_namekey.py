@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:54
+
+from django.db import migrations, models, router
+
+
+def build_name_index(apps, schema_editor):
+    from kumbh.names import name_key, name_keys
+
+    NameKey = apps.get_model('kumbh', 'NameKey')
+    LostFound = apps.get_model('kumbh', 'LostFound')
+    FamilyMember = apps.get_model('kumbh', 'FamilyMember')
+
+    for report in LostFound.objects.all().iterator():
+        # Blocking keys now skip honorifics and understand Devanagari
+        report.name_key = name_key(report.person_name) or None
+        report.save(update_fields=['name_key'])
+        NameKey.objects.bulk_create(
+            [NameKey(source='lost_found', object_id=report.pk, key=key) for key in name_keys(report.person_name)],
+            ignore_conflicts=True,
+        )
+    # Family members may live in their own database (kumbh/routers.py), which
+    # is not migrated yet while this one is; new installs have none to index
+    if router.db_for_read(FamilyMember) != schema_editor.connection.alias:
+        return
+    for member in FamilyMember.objects.all().iterator():
+        NameKey.objects.bulk_create(
+            [NameKey(source='family_member', object_id=member.pk, key=key) for key in name_keys(member.name)],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0012_lostfound_matching'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Phonetic key of a name token', max_length=64)),
+                ('source', models.CharField(choices=[('lost_found', 'Lost & Found Report'), ('family_member', 'Family Member')], help_text='Model the name belongs to', max_length=20)),
+                ('object_id', models.BigIntegerField(help_text='Primary key of the row the name belongs to')),
+            ],
+            options={
+                'verbose_name': 'Name Key',
+                'verbose_name_plural': 'Name Keys',
+                'db_table': 'name_keys',
+                'indexes': [models.Index(fields=['source', 'key'], name='name_keys_source_key_idx')],
+                'unique_together': {('source', 'object_id', 'key')},
+            },
+        ),
+        migrations.RunPython(build_name_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0013_namekey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LostFoundSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_email', models.EmailField(help_text='Email of the user to notify', max_length=254)),
+                ('query', models.CharField(blank=True, default='', help_text='Name of the person being looked for', max_length=255)),
+                ('report_type', models.CharField(choices=[('lost', 'Lost'), ('found', 'Found')], default='found', help_text='Type of report to watch for', max_length=20)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, help_text='Centre of the area to watch', max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, help_text='Centre of the area to watch', max_digits=9, null=True)),
+                ('radius_km', models.FloatField(default=5.0, help_text='Radius of the area to watch')),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_matched_at', models.DateTimeField(blank=True, help_text='When a report last matched', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Lost & Found Subscription',
+                'verbose_name_plural': 'Lost & Found Subscriptions',
+                'db_table': 'lost_found_subscriptions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionHit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_hits', to='kumbh.lostfound')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hits', to='kumbh.lostfoundsubscription')),
+            ],
+            options={
+                'db_table': 'lost_found_subscription_hits',
+                'ordering': ['-created_at'],
+                'unique_together': {('subscription', 'report')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, help_text="'n:<name key>' or 'g:<geohash cell>'", max_length=80)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='kumbh.lostfoundsubscription')),
+            ],
+            options={
+                'db_table': 'lost_found_subscription_terms',
+                'unique_together': {('subscription', 'term')},
+            },
+        ),
+    ]
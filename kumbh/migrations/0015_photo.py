@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0014_lostfound_subscriptions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Photo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(help_text='SHA-256 of the file contents', max_length=64, unique=True)),
+                ('file', models.FileField(help_text='Original upload', max_length=255, upload_to='photos/')),
+                ('content_type', models.CharField(blank=True, default='', max_length=100)),
+                ('size', models.PositiveIntegerField(help_text='File size in bytes')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnails', models.JSONField(blank=True, default=dict, help_text='Thumbnail paths keyed by size in pixels')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', help_text='Thumbnail generation status', max_length=20)),
+                ('uploaded_by', models.EmailField(blank=True, help_text='Email of the user who first uploaded the photo', max_length=254, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Photo',
+                'verbose_name_plural': 'Photos',
+                'db_table': 'photos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lostfound',
+            name='photo',
+            field=models.ForeignKey(blank=True, help_text='Photo uploaded to this server', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='kumbh.photo'),
+        ),
+    ]
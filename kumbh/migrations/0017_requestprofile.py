@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0016_photo_phash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_by', models.CharField(help_text='Staff user who asked for the profile', max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(help_text='Path and query string', max_length=2000)),
+                ('view', models.CharField(blank=True, default='', help_text='View that handled the request', max_length=100)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField(help_text='Wall time of the profiled part of the request')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('query_ms', models.FloatField(default=0)),
+                ('stacks', models.TextField(blank=True, default='', help_text='Collapsed stacks weighted by microseconds')),
+                ('queries', models.JSONField(blank=True, default=list, help_text='SQL issued, in order, with database alias and milliseconds')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Request Profile',
+                'verbose_name_plural': 'Request Profiles',
+                'db_table': 'request_profiles',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
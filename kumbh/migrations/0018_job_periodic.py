@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kumbh', '0017_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='periodic',
+            field=models.BooleanField(default=False, help_text='Scheduled run of a periodic job, of which one at a time may be queued or running'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('periodic', True), ('status__in', ['queued', 'running'])), fields=('name',), name='jobs_one_active_periodic'),
+        ),
+    ]
@@ -192,6 +192,41 @@ class FamilyInvitation(models.Model):
         return timezone.now() > self.expires_at
 
 
+class Photo(models.Model):
+    """Uploaded photo, stored once per distinct content"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    sha256 = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the file contents")
+    file = models.FileField(upload_to='photos/', max_length=255, help_text="Original upload")
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    size = models.PositiveIntegerField(help_text="File size in bytes")
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    thumbnails = models.JSONField(default=dict, blank=True, help_text="Thumbnail paths keyed by size in pixels")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', help_text="Thumbnail generation status")
+    uploaded_by = models.EmailField(blank=True, null=True, help_text="Email of the user who first uploaded the photo")
+    phash = models.CharField(max_length=16, blank=True, null=True, help_text="64-bit perceptual hash as hex")
+    # The hash split into four 16-bit chunks, each indexed for similarity lookups
+    phash_0 = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    phash_1 = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    phash_2 = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    phash_3 = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'photos'
+        ordering = ['-created_at']
+        verbose_name = 'Photo'
+        verbose_name_plural = 'Photos'
+        
+    def __str__(self):
+        return f"Photo {self.sha256[:12]} ({self.get_status_display()})"
+
+
 class LostFound(models.Model):
     """Lost and Found report model"""
     TYPE_CHOICES = [
@@ -216,8 +251,11 @@ class LostFound(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True, help_text="Latitude of the location")
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True, help_text="Longitude of the location")
     photo_url = models.URLField(blank=True, null=True, help_text="URL of the photo (if uploaded)")
+    photo = models.ForeignKey(Photo, on_delete=models.SET_NULL, blank=True, null=True, related_name='reports', help_text="Photo uploaded to this server")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open', help_text="Current status of the report")
     is_active = models.BooleanField(default=True)
+    geo_cell = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False, help_text="Geohash cell of the location, used to find nearby reports")
+    name_key = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False, help_text="Phonetic key of the person's name, used to find similar names")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -229,3 +267,233 @@ class LostFound(models.Model):
         
     def __str__(self):
         return f"{self.get_report_type_display()} - {self.person_name} ({self.user_email})"
+    
+    def refresh_match_keys(self):
+        """Recompute the blocking keys used by the lost/found matching engine"""
+        from .geo import encode
+        from .names import name_key
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = encode(self.latitude, self.longitude)
+        else:
+            self.geo_cell = None
+        self.name_key = name_key(self.person_name) or None
+    
+    def save(self, *args, **kwargs):
+        self.refresh_match_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell', 'name_key'}
+        super().save(*args, **kwargs)
+
+
+class LostFoundMatch(models.Model):
+    """Candidate pairing of a lost report with a found report, scored by the matching engine"""
+    STATUS_CHOICES = [
+        ('candidate', 'Candidate'),
+        ('confirmed', 'Confirmed'),
+        ('rejected', 'Rejected'),
+    ]
+    
+    lost = models.ForeignKey(LostFound, on_delete=models.CASCADE, related_name='found_matches', help_text="The lost report")
+    found = models.ForeignKey(LostFound, on_delete=models.CASCADE, related_name='lost_matches', help_text="The found report")
+    score = models.FloatField(help_text="Overall match score (0-1)")
+    name_score = models.FloatField(help_text="Name similarity (0-1)")
+    age_score = models.FloatField(help_text="Age closeness (0-1)")
+    distance_km = models.FloatField(blank=True, null=True, help_text="Distance between the two locations")
+    hours_apart = models.FloatField(help_text="Time between the two reports")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='candidate', help_text="Review status")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'lost_found_matches'
+        ordering = ['-score']
+        verbose_name = 'Lost & Found Match'
+        verbose_name_plural = 'Lost & Found Matches'
+        unique_together = [['lost', 'found']]
+        
+    def __str__(self):
+        return f"Lost #{self.lost_id} <-> Found #{self.found_id} ({self.score:.2f})"
+
+
+class Job(models.Model):
+    """Background job stored in the database and executed by the run_jobs command"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100, help_text="Registered job name")
+    payload = models.JSONField(default=dict, blank=True, help_text="Keyword arguments passed to the job")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', help_text="Current job status")
+    run_at = models.DateTimeField(help_text="Earliest time the job may run")
+    attempts = models.IntegerField(default=0, help_text="Number of times the job has been started")
+    max_attempts = models.IntegerField(default=3, help_text="Attempts before the job is marked as failed")
+    last_error = models.TextField(blank=True, null=True, help_text="Error from the last failed attempt")
+    locked_by = models.CharField(max_length=100, blank=True, null=True, help_text="Worker currently running the job")
+    locked_at = models.DateTimeField(blank=True, null=True, help_text="When the running worker claimed the job")
+    periodic = models.BooleanField(default=False, help_text="Scheduled run of a periodic job, of which one at a time may be queued or running")
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name'],
+                condition=models.Q(periodic=True, status__in=['queued', 'running']),
+                name='jobs_one_active_periodic',
+            ),
+        ]
+        
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class TourGroup(models.Model):
+    """Tour group that pilgrims join with one shared token instead of pairwise invitations"""
+    name = models.CharField(max_length=255, help_text="Name of the tour group")
+    leader_email = models.EmailField(help_text="Email of the user who created the group")
+    join_token = models.CharField(max_length=64, unique=True, help_text="Token shared as a link or QR code to join the group")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'tour_groups'
+        ordering = ['-created_at']
+        verbose_name = 'Tour Group'
+        verbose_name_plural = 'Tour Groups'
+        
+    def __str__(self):
+        return f"{self.name} ({self.leader_email})"
+
+
+class TourGroupMember(models.Model):
+    """Membership of a user in a tour group"""
+    group = models.ForeignKey(TourGroup, on_delete=models.CASCADE, related_name='members')
+    user_email = models.EmailField(help_text="Email of the member")
+    name = models.CharField(max_length=255, help_text="Display name of the member")
+    joined_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'tour_group_members'
+        ordering = ['joined_at']
+        verbose_name = 'Tour Group Member'
+        verbose_name_plural = 'Tour Group Members'
+        unique_together = [['group', 'user_email']]
+        indexes = [
+            models.Index(fields=['user_email'], name='tour_group_member_email_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.name} in {self.group.name}"
+
+
+class NameKey(models.Model):
+    """Phonetic key of one name token, indexed so name lookups avoid LIKE scans"""
+    SOURCE_CHOICES = [
+        ('lost_found', 'Lost & Found Report'),
+        ('family_member', 'Family Member'),
+    ]
+    
+    key = models.CharField(max_length=64, help_text="Phonetic key of a name token")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, help_text="Model the name belongs to")
+    object_id = models.BigIntegerField(help_text="Primary key of the row the name belongs to")
+    
+    class Meta:
+        db_table = 'name_keys'
+        verbose_name = 'Name Key'
+        verbose_name_plural = 'Name Keys'
+        unique_together = [['source', 'object_id', 'key']]
+        indexes = [
+            models.Index(fields=['source', 'key'], name='name_keys_source_key_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.key} -> {self.source} #{self.object_id}"
+
+
+class LostFoundSubscription(models.Model):
+    """Saved search that is checked against every new lost & found report"""
+    TYPE_CHOICES = LostFound.TYPE_CHOICES
+    
+    user_email = models.EmailField(help_text="Email of the user to notify")
+    query = models.CharField(max_length=255, blank=True, default='', help_text="Name of the person being looked for")
+    report_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='found', help_text="Type of report to watch for")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True, help_text="Centre of the area to watch")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True, help_text="Centre of the area to watch")
+    radius_km = models.FloatField(default=5.0, help_text="Radius of the area to watch")
+    is_active = models.BooleanField(default=True)
+    last_matched_at = models.DateTimeField(blank=True, null=True, help_text="When a report last matched")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'lost_found_subscriptions'
+        ordering = ['-created_at']
+        verbose_name = 'Lost & Found Subscription'
+        verbose_name_plural = 'Lost & Found Subscriptions'
+        
+    def __str__(self):
+        return f"{self.user_email} watching for {self.report_type}: {self.query or 'any name'}"
+
+
+class SubscriptionTerm(models.Model):
+    """Reverse index entry mapping a name key or geohash cell to a subscription"""
+    subscription = models.ForeignKey(LostFoundSubscription, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=80, db_index=True, help_text="'n:<name key>' or 'g:<geohash cell>'")
+    
+    class Meta:
+        db_table = 'lost_found_subscription_terms'
+        unique_together = [['subscription', 'term']]
+        
+    def __str__(self):
+        return f"{self.term} -> subscription #{self.subscription_id}"
+
+
+class SubscriptionHit(models.Model):
+    """A report that matched a saved search"""
+    subscription = models.ForeignKey(LostFoundSubscription, on_delete=models.CASCADE, related_name='hits')
+    report = models.ForeignKey(LostFound, on_delete=models.CASCADE, related_name='subscription_hits')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'lost_found_subscription_hits'
+        ordering = ['-created_at']
+        unique_together = [['subscription', 'report']]
+        
+    def __str__(self):
+        return f"Report #{self.report_id} matched subscription #{self.subscription_id}"
+
+
+class RequestProfile(models.Model):
+    """Sampled profile of one staff request made with ?__profile=1 (see kumbh/profiling.py)"""
+    requested_by = models.CharField(max_length=255, help_text="Staff user who asked for the profile")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000, help_text="Path and query string")
+    view = models.CharField(max_length=100, blank=True, default='', help_text="View that handled the request")
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField(help_text="Wall time of the profiled part of the request")
+    sample_count = models.PositiveIntegerField(default=0)
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    stacks = models.TextField(blank=True, default='', help_text="Collapsed stacks weighted by microseconds")
+    queries = models.JSONField(default=list, blank=True, help_text="SQL issued, in order, with database alias and milliseconds")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'request_profiles'
+        ordering = ['-created_at']
+        verbose_name = 'Request Profile'
+        verbose_name_plural = 'Request Profiles'
+        
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
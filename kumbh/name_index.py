@@ -0,0 +1,93 @@
+"""
+Phonetic name index for lost & found reports and family members.
+
+Every save writes one NameKey row per name token, so a lookup is an indexed
+equality query on the phonetic keys of the search term instead of a LIKE scan.
+"""
+from django.db import router, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+
+from .models import FamilyMember, LostFound, NameKey
+from .names import name_keys
+
+SOURCES = {
+    LostFound: ('lost_found', 'person_name'),
+    FamilyMember: ('family_member', 'name'),
+}
+
+
+def index_object(instance):
+    """Replace the stored keys for one row"""
+    source, field = SOURCES[type(instance)]
+    keys = name_keys(getattr(instance, field))
+    NameKey.objects.filter(source=source, object_id=instance.pk).exclude(key__in=keys).delete()
+    NameKey.objects.bulk_create(
+        [NameKey(source=source, object_id=instance.pk, key=key) for key in keys],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(model, batch_size=2000):
+    """Replace the keys of every row of `model`, e.g. after rows were copied in without signals; returns the row count"""
+    source, field = SOURCES[model]
+    rows = 0
+    with transaction.atomic(using=router.db_for_write(NameKey)):
+        NameKey.objects.filter(source=source).delete()
+        batch = []
+        for pk, name in model._base_manager.values_list('pk', field).iterator(chunk_size=batch_size):
+            batch.extend(NameKey(source=source, object_id=pk, key=key) for key in name_keys(name))
+            rows += 1
+            if len(batch) >= batch_size:
+                NameKey.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        NameKey.objects.bulk_create(batch, ignore_conflicts=True)
+    return rows
+
+
+# Most ids returned as a list when the model and the index are in different
+# databases, newest first; every one is a query parameter for id__in
+CROSS_DATABASE_LIMIT = 500
+
+
+def matching_ids(model, name):
+    """
+    Primary keys of the rows whose name sounds like `name`, to filter with id__in.
+
+    Every token of the query must match a token of the stored name, so
+    "Ramesh Kumar" finds "Rameshh Kumar" but not "Ramesh Verma". When `model`
+    is in the index's database this is an unevaluated values queryset, run
+    as a subquery; otherwise (see kumbh/routers.py) a list of at most
+    CROSS_DATABASE_LIMIT ints.
+    """
+    source, _ = SOURCES[model]
+    keys = name_keys(name)
+    if not keys:
+        return []
+    ids = (
+        NameKey.objects.filter(source=source, key__in=keys)
+        .values('object_id')
+        .annotate(matched=Count('key', distinct=True))
+        .filter(matched=len(keys))
+        .values_list('object_id', flat=True)
+    )
+    if router.db_for_read(model) == router.db_for_read(NameKey):
+        return ids
+    return list(ids.order_by('-object_id')[:CROSS_DATABASE_LIMIT])
+
+
+def _index_on_save(sender, instance, update_fields=None, **kwargs):
+    _, field = SOURCES[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    index_object(instance)
+
+
+def _unindex_on_delete(sender, instance, **kwargs):
+    source, _ = SOURCES[sender]
+    NameKey.objects.filter(source=source, object_id=instance.pk).delete()
+
+
+for _model in SOURCES:
+    post_save.connect(_index_on_save, sender=_model, dispatch_uid=f'name_index_save_{_model.__name__}')
+    post_delete.connect(_unindex_on_delete, sender=_model, dispatch_uid=f'name_index_delete_{_model.__name__}')
@@ -0,0 +1,141 @@
+"""
+Name normalisation and phonetic keys for matching people across reports.
+
+Names arrive typed in many spellings and in both Devanagari and Latin script.
+normalize() transliterates Devanagari to Latin and strips everything but
+letters; phonetic_key() then folds the spelling variants common in Indian
+names, so रमेश, Ramesh, Rameshh and Ramesch all share the key 'rms'.
+"""
+import re
+import unicodedata
+
+NON_LETTERS_RE = re.compile(r'[^a-z ]+')
+
+# Devanagari (Hindi/Marathi) to Latin, close to how people type names in English
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'ळ': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+    'क़': 'q', 'ख़': 'kh', 'ग़': 'g', 'ज़': 'z', 'ड़': 'r', 'ढ़': 'rh', 'फ़': 'f', 'य़': 'y',
+}
+DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ee', 'उ': 'u', 'ऊ': 'oo', 'ऋ': 'ri',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o',
+}
+DEVANAGARI_MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ee', 'ु': 'u', 'ू': 'oo', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o',
+}
+# Nukta letters are stored decomposed (base + nukta), matching NFC input
+DEVANAGARI_CONSONANTS = {unicodedata.normalize('NFD', k): v for k, v in DEVANAGARI_CONSONANTS.items()}
+VIRAMA = '्'
+NUKTA = '़'
+DEVANAGARI_SIGNS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+
+# Spelling variants that sound the same, applied before vowels are dropped
+PHONETIC_RULES = [
+    ('sch', 's'),
+    ('sh', 's'),
+    ('ph', 'f'),
+    ('kh', 'k'),
+    ('gh', 'g'),
+    ('th', 't'),
+    ('dh', 'd'),
+    ('bh', 'b'),
+    ('jh', 'j'),
+    ('ch', 'c'),
+    ('ck', 'k'),
+    ('x', 'ks'),
+    ('q', 'k'),
+    ('w', 'v'),
+    ('z', 'j'),
+]
+
+# Honorifics and titles that carry no identity
+STOP_TOKENS = {'shri', 'sri', 'shree', 'smt', 'kumari', 'mr', 'mrs', 'ms', 'dr', 'ji'}
+
+
+def transliterate(text):
+    """Romanise Devanagari; other characters pass through unchanged"""
+    out = []
+    chars = list(text or '')
+    i = 0
+    while i < len(chars):
+        char = chars[i]
+        if i + 1 < len(chars) and chars[i + 1] == NUKTA and char + NUKTA in DEVANAGARI_CONSONANTS:
+            char = char + NUKTA
+            i += 1
+        if char in DEVANAGARI_CONSONANTS:
+            out.append(DEVANAGARI_CONSONANTS[char])
+            following = chars[i + 1] if i + 1 < len(chars) else ''
+            if following in DEVANAGARI_MATRAS:
+                out.append(DEVANAGARI_MATRAS[following])
+                i += 1
+            elif following == VIRAMA:
+                i += 1
+            elif following and 'ऀ' <= following <= 'ॿ':
+                # Inherent vowel; dropped at the end of a word as in spoken Hindi
+                out.append('a')
+        elif char in DEVANAGARI_VOWELS:
+            out.append(DEVANAGARI_VOWELS[char])
+        elif char in DEVANAGARI_SIGNS:
+            out.append(DEVANAGARI_SIGNS[char])
+        elif char in DEVANAGARI_MATRAS or char in (VIRAMA, NUKTA):
+            pass
+        else:
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def normalize(name):
+    """Lowercase ASCII letters and single spaces only"""
+    name = unicodedata.normalize('NFKD', transliterate(unicodedata.normalize('NFC', name or '')))
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    return ' '.join(NON_LETTERS_RE.sub(' ', name).split())
+
+
+def phonetic_key(token):
+    """
+    Consonant skeleton of a single name token.
+
+    Keeps the first letter, folds similar-sounding spellings, drops vowels
+    and 'h'/'y', and collapses repeated letters, so Ramesh, Rameshh and
+    Ramesch all map to 'rms'.
+    """
+    token = normalize(token).replace(' ', '')
+    if not token:
+        return ''
+    for src, dst in PHONETIC_RULES:
+        token = token.replace(src, dst)
+    first, rest = token[0], token[1:]
+    rest = re.sub(r'[aeiouhy]', '', rest)
+    key = first
+    for char in rest:
+        if char != key[-1]:
+            key += char
+    return key
+
+
+def name_tokens(name):
+    return [token for token in normalize(name).split() if token not in STOP_TOKENS]
+
+
+def name_keys(name):
+    """Phonetic keys of every meaningful token in a name"""
+    keys = []
+    for token in name_tokens(name):
+        key = phonetic_key(token)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def name_key(name):
+    """Blocking key for a full name: the phonetic key of its first token"""
+    keys = name_keys(name)
+    return keys[0] if keys else ''
@@ -0,0 +1,129 @@
+"""
+Standing searches ("percolator") for lost & found reports.
+
+Instead of re-running every saved search on a timer, each subscription is
+indexed under a single selective term: the phonetic key of the first name
+it is looking for, or the geohash cells covering its area when no name is
+given. A hit needs every name key anyway, so one key is enough to find it.
+When a report is created its own terms are looked up in that reverse index,
+and only the handful of subscriptions found there are checked in full.
+
+That lookup runs as a 'percolate_report' job (see kumbh/tasks.py) rather
+than in the request that saved the report, so the notifications are
+published from the `run_jobs` process and need a REALTIME_BROKER shared
+with the web workers.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .geo import cells_within, encode, haversine_km
+from .models import LostFound, LostFoundSubscription, SubscriptionHit, SubscriptionTerm
+from .names import name_key, name_keys
+from .realtime import publish_to_user
+
+MAX_RADIUS_KM = 25.0
+
+
+def subscription_terms(subscription):
+    key = name_key(subscription.query)
+    if key:
+        return [f'n:{key}']
+    if subscription.latitude is not None and subscription.longitude is not None:
+        radius = min(subscription.radius_km, MAX_RADIUS_KM)
+        return [f'g:{cell}' for cell in cells_within(subscription.latitude, subscription.longitude, radius)]
+    return []
+
+
+def report_terms(report):
+    terms = [f'n:{key}' for key in name_keys(report.person_name)]
+    if report.latitude is not None and report.longitude is not None:
+        terms.append(f'g:{report.geo_cell or encode(report.latitude, report.longitude)}')
+    return terms
+
+
+def index_subscription(subscription):
+    """Replace the reverse index entries for one subscription"""
+    SubscriptionTerm.objects.filter(subscription=subscription).delete()
+    if not subscription.is_active:
+        return
+    SubscriptionTerm.objects.bulk_create(
+        [SubscriptionTerm(subscription=subscription, term=term) for term in subscription_terms(subscription)],
+        ignore_conflicts=True,
+    )
+
+
+def subscription_matches(subscription, report):
+    """Full check of a candidate subscription against a report"""
+    if subscription.report_type != report.report_type:
+        return False
+    wanted = set(name_keys(subscription.query))
+    if wanted and not wanted.issubset(name_keys(report.person_name)):
+        return False
+    has_area = subscription.latitude is not None and subscription.longitude is not None
+    has_location = report.latitude is not None and report.longitude is not None
+    if has_area and has_location:
+        distance = haversine_km(subscription.latitude, subscription.longitude, report.latitude, report.longitude)
+        if distance > min(subscription.radius_km, MAX_RADIUS_KM):
+            return False
+    elif has_area and not wanted:
+        # Area-only searches need a located report
+        return False
+    return True
+
+
+def percolate(report):
+    """
+    Record and push a hit for every subscription that matches a new report.
+
+    Returns the subscriptions hit for the first time: running it again for
+    the same report, as a retried job does, notifies nobody twice.
+    """
+    terms = report_terms(report)
+    if not terms:
+        return []
+    candidate_ids = (
+        SubscriptionTerm.objects.filter(term__in=terms)
+        .values_list('subscription_id', flat=True)
+        .distinct()
+    )
+    candidates = LostFoundSubscription.objects.filter(
+        id__in=candidate_ids,
+        is_active=True,
+        report_type=report.report_type,
+    ).exclude(user_email=report.user_email)
+
+    already_hit = set(SubscriptionHit.objects.filter(report=report).values_list('subscription_id', flat=True))
+    matched = [s for s in candidates if s.id not in already_hit and subscription_matches(s, report)]
+    if not matched:
+        return []
+
+    SubscriptionHit.objects.bulk_create(
+        [SubscriptionHit(subscription=s, report=report) for s in matched],
+        ignore_conflicts=True,
+    )
+    LostFoundSubscription.objects.filter(id__in=[s.id for s in matched]).update(last_matched_at=timezone.now())
+    for subscription in matched:
+        publish_to_user(subscription.user_email, {
+            'type': 'lost_found.match',
+            'subscription_id': subscription.id,
+            'report_id': report.id,
+            'report_type': report.report_type,
+            'person_name': report.person_name,
+            'location': report.location,
+        })
+    return matched
+
+
+def _index_subscription_on_save(sender, instance, **kwargs):
+    index_subscription(instance)
+
+
+def _percolate_on_create(sender, instance, created, **kwargs):
+    if created and instance.is_active:
+        from .jobs import enqueue
+        transaction.on_commit(lambda: enqueue('percolate_report', {'report_id': instance.pk}))
+
+
+post_save.connect(_index_subscription_on_save, sender=LostFoundSubscription, dispatch_uid='percolator_index_subscription')
+post_save.connect(_percolate_on_create, sender=LostFound, dispatch_uid='percolator_percolate_report')
@@ -0,0 +1,253 @@
+"""
+Photo uploads for lost & found reports.
+
+Uploads are streamed to a temporary file in chunks while their SHA-256 is
+computed, so a photo is never held in memory and identical uploads are stored
+once. Thumbnails are rendered after the request, in a process pool, and the
+photo is marked ready when they are written.
+
+Similar photos are found by Hamming distance between 64-bit perceptual
+hashes, using multi-index hashing: the hash is stored as four indexed 16-bit
+chunks, and two hashes within distance d must agree to within d // 4 bits on
+at least one chunk (pigeonhole). A lookup enumerates those chunk values, reads
+the few rows they hit through the indexes and checks the full distance only
+for them.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from PIL import Image, UnidentifiedImageError
+
+from .models import Photo
+from .thumbnails import render_thumbnails
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+DEFAULT_THUMBNAIL_SIZES = (160, 640)
+DEFAULT_THUMBNAIL_WORKERS = 2
+
+HASH_CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+DEFAULT_MAX_DISTANCE = 10
+
+# Pillow format name -> file extension
+ALLOWED_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+}
+
+
+class InvalidPhoto(ValueError):
+    pass
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Write uploads straight to a temporary file, hashing each chunk as it arrives"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_size = getattr(settings, 'PHOTO_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.too_large = True
+            self.file.close()
+            raise SkipFile()
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+def thumbnail_sizes():
+    return tuple(getattr(settings, 'PHOTO_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES))
+
+
+def photo_path(sha256, extension):
+    """Content-addressed storage path of an original, relative to MEDIA_ROOT"""
+    return f'photos/{sha256[:2]}/{sha256}.{extension}'
+
+
+def _probe(path):
+    """Format and dimensions from the image header, without decoding pixels"""
+    try:
+        with Image.open(path) as image:
+            return image.format, image.size
+    except (UnidentifiedImageError, OSError):
+        raise InvalidPhoto('File is not a supported image')
+
+
+def store_upload(uploaded, uploaded_by=None):
+    """
+    Store an upload received by HashingUploadHandler.
+
+    Returns (photo, created); created is False when the same content was
+    uploaded before, in which case nothing new is written to disk.
+    """
+    existing = Photo.objects.filter(sha256=uploaded.sha256).first()
+    if existing is not None:
+        return existing, False
+
+    image_format, (width, height) = _probe(uploaded.temporary_file_path())
+    if image_format not in ALLOWED_FORMATS:
+        raise InvalidPhoto(f'Unsupported image format: {image_format}')
+
+    # FileSystemStorage moves the temporary file into place rather than copying it
+    name = default_storage.save(photo_path(uploaded.sha256, ALLOWED_FORMATS[image_format]), uploaded)
+    try:
+        with transaction.atomic():
+            photo = Photo.objects.create(
+                sha256=uploaded.sha256,
+                file=name,
+                content_type=Image.MIME.get(image_format, ''),
+                size=uploaded.size,
+                width=width,
+                height=height,
+                uploaded_by=uploaded_by,
+            )
+    except IntegrityError:
+        # The same photo was stored by a concurrent upload
+        default_storage.delete(name)
+        return Photo.objects.get(sha256=uploaded.sha256), False
+
+    transaction.on_commit(lambda: schedule_thumbnails(photo))
+    return photo, True
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'PHOTO_THUMBNAIL_WORKERS', DEFAULT_THUMBNAIL_WORKERS),
+                # Forking a threaded server process is unsafe; workers import only kumbh.thumbnails
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _reset_executor(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+
+
+def schedule_thumbnails(photo):
+    """Render a photo's thumbnails in the process pool"""
+    args = (default_storage.path(photo.file.name), str(settings.MEDIA_ROOT), photo.sha256, thumbnail_sizes())
+    executor = get_executor()
+    try:
+        future = executor.submit(render_thumbnails, *args)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool and try once more
+        _reset_executor(executor)
+        future = get_executor().submit(render_thumbnails, *args)
+    future.add_done_callback(partial(_thumbnails_done, photo.pk))
+    return future
+
+
+def _thumbnails_done(photo_id, future):
+    # Runs on the executor's management thread, which has its own DB connection
+    try:
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception('Thumbnail rendering failed for photo %s', photo_id)
+            Photo.objects.filter(pk=photo_id).update(status='failed')
+            return
+        Photo.objects.filter(pk=photo_id).update(status='ready', **hash_fields(result.pop('phash')), **result)
+    finally:
+        connection.close()
+
+
+def media_url(path):
+    """
+    URL of a stored file, absolute when PUBLIC_BASE_URL is set.
+
+    Never built from the request's Host header: responses carrying these
+    URLs are cached and shared by every client.
+    """
+    return getattr(settings, 'PUBLIC_BASE_URL', '').rstrip('/') + default_storage.url(path)
+
+
+def thumbnail_url(photo, size=None):
+    """URL of a photo's thumbnail (the smallest by default), or of the original until it is ready"""
+    if photo.status == 'ready' and photo.thumbnails:
+        size = str(size or min(int(s) for s in photo.thumbnails))
+        if size in photo.thumbnails:
+            return media_url(photo.thumbnails[size])
+    return media_url(photo.file.name)
+
+
+def hash_chunks(value):
+    """Split a 64-bit hash into 16-bit chunks, most significant first"""
+    return [(value >> (CHUNK_BITS * (HASH_CHUNKS - 1 - i))) & CHUNK_MASK for i in range(HASH_CHUNKS)]
+
+
+def hash_fields(value):
+    """Model field values for a perceptual hash"""
+    fields = {'phash': f'{value:016x}'}
+    for i, chunk in enumerate(hash_chunks(value)):
+        fields[f'phash_{i}'] = chunk
+    return fields
+
+
+def _chunk_variants(chunk, radius):
+    """Every 16-bit value within `radius` bits of `chunk`"""
+    variants = {chunk}
+    for _ in range(radius):
+        variants |= {v ^ (1 << bit) for v in variants for bit in range(CHUNK_BITS)}
+    return variants
+
+
+def similar_photos(phash, max_distance=DEFAULT_MAX_DISTANCE, exclude=None):
+    """
+    (distance, photo_id) for every photo whose hash is within `max_distance`
+    bits of `phash` (a hex string), nearest first.
+    """
+    value = int(phash, 16)
+    radius = max_distance // HASH_CHUNKS
+    blocks = Q()
+    for i, chunk in enumerate(hash_chunks(value)):
+        blocks |= Q(**{f'phash_{i}__in': _chunk_variants(chunk, radius)})
+
+    candidates = Photo.objects.filter(blocks)
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+
+    results = []
+    for photo_id, other in candidates.values_list('id', 'phash').iterator():
+        distance = (value ^ int(other, 16)).bit_count()
+        if distance <= max_distance:
+            results.append((distance, photo_id))
+    results.sort()
+    return results
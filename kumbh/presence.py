@@ -0,0 +1,126 @@
+"""
+Presence tracking for family members.
+
+Every authenticated request, location update or ping refreshes a user's
+heartbeat. Status is derived from the age of the last heartbeat, so a phone
+that stops talking to us goes from online to away to offline without any
+database writes.
+
+Heartbeats are kept in memory per process and copied to PRESENCE_CACHE, which
+must be shared by every worker, at most once every PRESENCE_WRITE_INTERVAL
+seconds per user. A lookup takes the newer of the two, so a user seen by any
+worker is reported by all of them, up to that interval late.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+ONLINE = 'online'
+AWAY = 'away'
+OFFLINE = 'offline'
+
+DEFAULT_ONLINE_TTL = 60  # seconds
+DEFAULT_AWAY_TTL = 15 * 60
+DEFAULT_RETENTION = 24 * 60 * 60
+DEFAULT_WRITE_INTERVAL = 15
+
+# Stale heartbeats are pruned once every this many touches
+PRUNE_EVERY = 1000
+
+
+def phone_matches(phone, email):
+    """
+    Whether a FamilyMember phone value was generated from `email`.
+
+    Members added through invitations get phone = email prefix + '_' + a
+    number or, when that is taken, the email with '@' and '.' spelled out
+    and cut to 20 characters (see accept_family_invitation).
+    """
+    if not phone or not email:
+        return False
+    phone, email = phone.lower(), email.lower()
+    if phone == email.replace('@', '_at_').replace('.', '_')[:20]:
+        return True
+    prefix, _, number = phone.rpartition('_')
+    return prefix == email.split('@')[0] and number.isdigit()
+
+
+class PresenceTracker:
+    """Thread-safe map of user email -> last heartbeat timestamp, mirrored to a shared cache"""
+
+    def __init__(self, online_ttl=None, away_ttl=None, retention=None, write_interval=None):
+        self.online_ttl = online_ttl if online_ttl is not None else getattr(settings, 'PRESENCE_ONLINE_TTL', DEFAULT_ONLINE_TTL)
+        self.away_ttl = away_ttl if away_ttl is not None else getattr(settings, 'PRESENCE_AWAY_TTL', DEFAULT_AWAY_TTL)
+        self.retention = retention if retention is not None else getattr(settings, 'PRESENCE_RETENTION', DEFAULT_RETENTION)
+        self.write_interval = (
+            write_interval if write_interval is not None
+            else getattr(settings, 'PRESENCE_WRITE_INTERVAL', DEFAULT_WRITE_INTERVAL)
+        )
+        self._last_seen = {}
+        self._written = {}  # email -> heartbeat last copied to the shared cache
+        self._touches = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'PRESENCE_CACHE', 'default')]
+
+    @staticmethod
+    def _key(email):
+        return f'presence:{email}'
+
+    def touch(self, email, now=None):
+        """Record a heartbeat for a user"""
+        if not email:
+            return
+        email = email.lower()
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._last_seen[email] = now
+            write = now - self._written.get(email, 0) >= self.write_interval
+            if write:
+                self._written[email] = now
+            self._touches += 1
+            if self._touches % PRUNE_EVERY == 0:
+                self._prune(now)
+        if write:
+            self._cache().set(self._key(email), now, timeout=self.retention)
+
+    def _prune(self, now):
+        cutoff = now - self.retention
+        for email, seen in list(self._last_seen.items()):
+            if seen < cutoff:
+                del self._last_seen[email]
+                self._written.pop(email, None)
+
+    def status_for(self, last_seen, now=None):
+        if last_seen is None:
+            return OFFLINE
+        age = (now if now is not None else time.time()) - last_seen
+        if age <= self.online_ttl:
+            return ONLINE
+        if age <= self.away_ttl:
+            return AWAY
+        return OFFLINE
+
+    def get(self, email, now=None):
+        """Return (status, last_seen) for a user"""
+        return self.get_many([email], now)[email] if email else (OFFLINE, None)
+
+    def get_many(self, emails, now=None):
+        """Bulk lookup, as {email: (status, last_seen)}, with one cache round trip"""
+        now = now if now is not None else time.time()
+        emails = [email for email in emails if email]
+        shared = self._cache().get_many([self._key(email.lower()) for email in emails])
+        result = {}
+        with self._lock:
+            for email in emails:
+                seen = [self._last_seen.get(email.lower()), shared.get(self._key(email.lower()))]
+                last_seen = max((value for value in seen if value is not None), default=None)
+                result[email] = (self.status_for(last_seen, now), last_seen)
+        return result
+
+
+tracker = PresenceTracker()
@@ -0,0 +1,166 @@
+"""
+On-demand sampling profiler for single requests.
+
+A staff request to /api/... with ?__profile=1 or an X-Profile: 1 header runs
+with a Sampler: a background thread that reads the request thread's stack
+every PROFILING_INTERVAL seconds and weights each stack by the time since the
+previous sample. Queries are recorded through connection.execute_wrapper()
+(statements and timings only; parameters are left out as they can carry
+personal data). The result is saved as a RequestProfile, listed in the
+Django admin with downloads as collapsed stacks (flamegraph.pl, speedscope)
+and as a speedscope JSON file.
+
+Nothing runs for other requests beyond a check of the path and query string.
+The sampler thread needs the GIL to take a sample, and a thread running
+Python code only gives it up every switch interval (5 ms by default), so the
+switch interval is lowered to the sampling interval while any profile runs.
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+DEFAULT_INTERVAL = 0.001
+QUERY_PARAMETER = '__profile'
+HEADER = 'HTTP_X_PROFILE'
+
+_switch_lock = threading.Lock()
+_running = 0
+_switch_interval = None
+
+
+def requested(request):
+    """Whether a request asks to be profiled; says nothing about whether it may be"""
+    if not request.path.startswith('/api/'):
+        return False
+    if f'{QUERY_PARAMETER}=' in request.META.get('QUERY_STRING', ''):
+        return request.GET.get(QUERY_PARAMETER) == '1'
+    return request.META.get(HEADER) == '1'
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    # ';' separates frames in the collapsed format
+    return f"{frame.f_globals.get('__name__', '?')}.{name}".replace(';', ':')
+
+
+class Sampler:
+    """Collects the stacks of one thread, weighted by microseconds"""
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval if interval is not None else getattr(settings, 'PROFILING_INTERVAL', DEFAULT_INTERVAL)
+        self.stacks = defaultdict(int)
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def __enter__(self):
+        global _running, _switch_interval
+        with _switch_lock:
+            if _running == 0:
+                _switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, _switch_interval))
+            _running += 1
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _running
+        self._stop.set()
+        self._thread.join()
+        with _switch_lock:
+            _running -= 1
+            if _running == 0:
+                sys.setswitchinterval(_switch_interval)
+
+    def _run(self):
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None or self._stop.is_set():
+                # Gone, or already waiting for this thread to stop
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += round((now - previous) * 1_000_000)
+            self.samples += 1
+            previous = now
+
+    def collapsed(self):
+        return collapsed(self.stacks)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper() hook keeping every statement of a request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'at_ms': round((started - self.started) * 1000, 3),
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+def collapsed(stacks):
+    """Collapsed stack text: one 'frame;frame;frame weight' line per distinct stack"""
+    return ''.join(f'{stack} {weight}\n' for stack, weight in sorted(stacks.items()) if weight > 0)
+
+
+def parse_collapsed(text):
+    stacks = {}
+    for line in text.splitlines():
+        stack, _, weight = line.rpartition(' ')
+        if stack:
+            stacks[stack] = stacks.get(stack, 0) + int(weight)
+    return stacks
+
+
+def speedscope(profile):
+    """speedscope's file format (https://www.speedscope.app/file-format-schema.json) for a RequestProfile"""
+    frames = []
+    indexes = {}
+    samples = []
+    weights = []
+    for stack, weight in parse_collapsed(profile.stacks).items():
+        sample = []
+        for name in stack.split(';'):
+            if name not in indexes:
+                indexes[name] = len(frames)
+                frames.append({'name': name})
+            sample.append(indexes[name])
+        samples.append(sample)
+        weights.append(weight)
+    name = f'{profile.method} {profile.path}'
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'kumbh',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'microseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
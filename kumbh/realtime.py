@@ -0,0 +1,249 @@
+"""
+Realtime family location stream.
+
+Location updates written through the API are published to a per-family group
+on a pub/sub broker; every WebSocket client subscribed to that group gets the
+update pushed to it instead of polling the family members endpoint.
+"""
+import asyncio
+import json
+import logging
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .presence import tracker as presence_tracker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = 'kumbh.realtime.LocalBroker'
+DEFAULT_QUEUE_SIZE = 32
+
+FAMILY_SOCKET_PATH = '/ws/family/'
+
+
+def family_group(user_email):
+    """Broker group that receives location updates for a user's family list"""
+    return f'family:{user_email.lower()}'
+
+
+def user_group(user_email):
+    """Broker group for notifications addressed to a single user"""
+    return f'user:{user_email.lower()}'
+
+
+class Subscription:
+    """Bounded outbox for one connected client, owned by its event loop"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message):
+        # Runs on the subscriber's loop. A slow client loses its oldest pending
+        # update instead of stalling the publisher; the newest position always wins.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub broker.
+
+    Only reaches subscribers connected to the same worker process. Deployments
+    running several workers should point REALTIME_BROKER at a class with the
+    same subscribe/unsubscribe/publish interface backed by a shared broker.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, group, subscription):
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscription)
+
+    def unsubscribe(self, group, subscription):
+        with self._lock:
+            subscribers = self._groups.get(group)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._groups[group]
+
+    def publish(self, group, message):
+        """Fan a message out to every subscriber of a group; safe from any thread"""
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+                delivered += 1
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(group, subscription)
+        return delivered
+
+    def stats(self):
+        with self._lock:
+            return {
+                'groups': len(self._groups),
+                'subscribers': sum(len(s) for s in self._groups.values()),
+            }
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by REALTIME_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(settings, 'REALTIME_BROKER', DEFAULT_BROKER))
+                _broker = broker_class()
+    return _broker
+
+
+def publish_family_locations(updates):
+    """
+    Publish location updates once the surrounding transaction commits.
+
+    `updates` is an iterable of (watcher_email, message) pairs, where the
+    watcher is the user whose family list contains the member that moved.
+    """
+    updates = list(updates)
+    if not updates:
+        return
+
+    def _publish():
+        broker = get_broker()
+        for watcher_email, message in updates:
+            broker.publish(family_group(watcher_email), message)
+
+    transaction.on_commit(_publish)
+
+
+def publish_to_user(user_email, message):
+    """Publish a notification to one user once the surrounding transaction commits"""
+    transaction.on_commit(lambda: get_broker().publish(user_group(user_email), message))
+
+
+def location_message(member_id, user_email, latitude, longitude, updated_at):
+    """Payload pushed to clients for one family member position"""
+    return {
+        'type': 'family_member.location',
+        'member_id': member_id,
+        'user_email': user_email,
+        'lat': str(latitude),
+        'lng': str(longitude),
+        'last_location_update': updated_at.isoformat() if updated_at else None,
+    }
+
+
+# WebSocket endpoint
+@sync_to_async
+def _authenticate(raw_token):
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.exceptions import InvalidToken
+    from user.authentication import CachedJWTAuthentication
+
+    authenticator = CachedJWTAuthentication()
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return authenticator.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@sync_to_async(thread_sensitive=False)
+def _touch(user_email):
+    # The heartbeat may write to PRESENCE_CACHE, a file or network round trip
+    presence_tracker.touch(user_email)
+
+
+def _query_token(scope):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    values = query.get('token')
+    return values[0] if values else None
+
+
+async def family_location_socket(scope, receive, send):
+    """
+    Push family member positions to an authenticated client.
+
+    Connect to /ws/family/?token=<access token>. The server sends one JSON
+    message per location update, plus notifications addressed to the user
+    such as lost & found subscription matches; clients may send "ping" to
+    receive "pong".
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    raw_token = _query_token(scope)
+    user = await _authenticate(raw_token) if raw_token else None
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    await send({'type': 'websocket.accept'})
+    await _touch(user.email)
+
+    queue_size = getattr(settings, 'REALTIME_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+    subscription = Subscription(asyncio.get_running_loop(), queue_size)
+    groups = [family_group(user.email), user_group(user.email)]
+    broker = get_broker()
+    for group in groups:
+        broker.subscribe(group, subscription)
+
+    async def forward():
+        while True:
+            message = await subscription.queue.get()
+            await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def listen():
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event.get('text') == 'ping':
+                await _touch(user.email)
+                subscription.offer({'type': 'pong'})
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(listen())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning('Family location socket closed with error: %s', task.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+        for group in groups:
+            broker.unsubscribe(group, subscription)
+
+
+async def websocket_application(scope, receive, send):
+    """Route WebSocket connections by path"""
+    if scope['path'] == FAMILY_SOCKET_PATH:
+        await family_location_socket(scope, receive, send)
+        return
+
+    await receive()
+    await send({'type': 'websocket.close', 'code': 4404})
@@ -0,0 +1,161 @@
+"""
+Read-through cache for hot list responses, with stale-while-revalidate.
+
+Each endpoint caches its response data for RESPONSE_CACHE_TTLS[endpoint]
+seconds. Past that, or once a model save has invalidated the endpoint, the
+entry is stale but kept: the first request to see it takes a short refresh
+lock and rebuilds it, while every other request keeps getting the stale copy
+instead of all querying the database together. Only a cold entry makes
+requests wait, and then only for the one request that is building it.
+
+Invalidation bumps a per-endpoint generation number rather than deleting
+entries, so a save marks every variant of the endpoint stale at once and the
+old data is still there to serve during the refresh. With the default
+per-process local-memory cache, saves only invalidate the worker that made
+them and other workers catch up within the TTL; a shared cache backend makes
+invalidation immediate everywhere.
+
+Responses from cached_response() carry a `compression_key` naming the entry
+version, which CompressionMiddleware uses to keep the compressed body next to
+the entry, so each version is compressed once rather than once per request.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Amenity, LostFound, Photo, Zone
+
+DEFAULT_TTLS = {
+    'zones': 60,
+    'amenities': 60,
+    'amenity_categories': 24 * 60 * 60,
+    'lost_found': 10,
+}
+DEFAULT_STALE_TTL = 60 * 60  # how long a stale entry is kept to serve during a refresh
+LOCK_TIMEOUT = 30  # seconds before a refresh lock left by a crashed request expires
+COLD_WAIT = 2.0  # seconds a request waits for another one to fill a cold entry
+COLD_POLL = 0.02
+
+# Models whose saves make an endpoint's cached responses stale
+INVALIDATED_BY = {
+    Zone: ('zones',),
+    Amenity: ('amenities',),
+    LostFound: ('lost_found',),
+    Photo: ('lost_found',),  # thumbnail URLs change once a photo is rendered
+}
+
+stats = {'hit': 0, 'stale': 0, 'miss': 0, 'refresh': 0}
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE', 'default')]
+
+
+def _generation_key(endpoint):
+    return f'response:{endpoint}:generation'
+
+
+def _entry_key(endpoint, variant):
+    # Hashed because variants carry raw query values, unsafe in memcached keys
+    digest = hashlib.blake2b(repr(variant).encode(), digest_size=16).hexdigest()
+    return f'response:{endpoint}:{digest}'
+
+
+def invalidate(endpoint):
+    """Mark every cached response of an endpoint stale"""
+    cache = _cache()
+    key = _generation_key(endpoint)
+    # add() then incr() so concurrent invalidations never lose a bump
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def cached(endpoint, variant, build):
+    """
+    Return build()'s result for (endpoint, variant), from the cache when possible.
+
+    `variant` is a tuple of whatever the response depends on, such as query
+    parameters. `build` must return picklable data.
+    """
+    return _lookup(endpoint, variant, build)[0]
+
+
+def cached_response(endpoint, variant, build):
+    """200 Response with cached()'s data, tagged with the version of the cache entry"""
+    data, version = _lookup(endpoint, variant, build)
+    response = Response(data, status=status.HTTP_200_OK)
+    response.compression_key = version
+    return response
+
+
+def _version(key, entry):
+    # Every refresh writes a new fresh_until, so it tells versions apart
+    return f'{key}:{entry[2]}:{entry[1]!r}'
+
+
+def _lookup(endpoint, variant, build):
+    """(data, version of the entry it came from or None)"""
+    cache = _cache()
+    key = _entry_key(endpoint, variant)
+    generation_key = _generation_key(endpoint)
+    found = cache.get_many([key, generation_key])
+    generation = found.get(generation_key, 0)
+    entry = found.get(key)
+
+    if entry is not None:
+        data, fresh_until, entry_generation = entry
+        if time.time() < fresh_until and entry_generation == generation:
+            stats['hit'] += 1
+            return data, _version(key, entry)
+        if not cache.add(key + ':lock', 1, timeout=LOCK_TIMEOUT):
+            # Another request is already refreshing it
+            stats['stale'] += 1
+            return data, _version(key, entry)
+        return _refresh(cache, endpoint, key, generation, build)
+
+    if cache.add(key + ':lock', 1, timeout=LOCK_TIMEOUT):
+        return _refresh(cache, endpoint, key, generation, build)
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            stats['hit'] += 1
+            return entry[0], _version(key, entry)
+    # The request holding the lock is too slow or died; build without it
+    stats['miss'] += 1
+    return build(), None
+
+
+def _refresh(cache, endpoint, key, generation, build):
+    stats['refresh'] += 1
+    try:
+        data = build()
+        ttls = getattr(settings, 'RESPONSE_CACHE_TTLS', DEFAULT_TTLS)
+        stale_ttl = getattr(settings, 'RESPONSE_CACHE_STALE_TTL', DEFAULT_STALE_TTL)
+        ttl = ttls.get(endpoint, DEFAULT_TTLS.get(endpoint, 60))
+        entry = (data, time.time() + ttl, generation)
+        cache.set(key, entry, timeout=ttl + stale_ttl)
+        return data, _version(key, entry)
+    finally:
+        cache.delete(key + ':lock')
+
+
+def _invalidate_on_change(sender, **kwargs):
+    # After commit, so a refresh racing the write cannot cache the old rows as current
+    for endpoint in INVALIDATED_BY[sender]:
+        transaction.on_commit(lambda endpoint=endpoint: invalidate(endpoint))
+
+
+for _model in INVALIDATED_BY:
+    post_save.connect(_invalidate_on_change, sender=_model, dispatch_uid=f'response_cache_save_{_model.__name__}')
+    post_delete.connect(_invalidate_on_change, sender=_model, dispatch_uid=f'response_cache_delete_{_model.__name__}')
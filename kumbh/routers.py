@@ -0,0 +1,101 @@
+"""
+Database routers.
+
+HotTableRouter moves high-write tables into their own SQLite files.
+
+SQLite lets one writer at a time into a database file, so SOS requests and
+location updates would otherwise queue behind every other write. Models
+listed in HOT_TABLE_DATABASES ('app_label.modelname' -> alias) are read,
+written and migrated only in their alias; everything else stays in 'default'.
+A route whose alias is not in DATABASES is ignored, so dropping the extra
+databases from settings puts the tables back in 'default'.
+
+Routed models must not have foreign keys to models in other databases, and
+querysets over them cannot be used as subqueries of a query on another
+database (see kumbh.name_index.matching_ids).
+
+ReplicaRouter, below, sends the reads of selected requests to read replicas.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def database_for(label):
+    """Alias holding a model given as 'app_label.modelname', or None for the default database"""
+    alias = getattr(settings, 'HOT_TABLE_DATABASES', {}).get(label)
+    return alias if alias in settings.DATABASES else None
+
+
+class HotTableRouter:
+    def _database(self, model):
+        return database_for(model._meta.label_lower)
+
+    def db_for_read(self, model, **hints):
+        return self._database(model)
+
+    def db_for_write(self, model, **hints):
+        return self._database(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        first, second = self._database(type(obj1)), self._database(type(obj2))
+        if first is None and second is None:
+            return None
+        return (first or DEFAULT_DB_ALIAS) == (second or DEFAULT_DB_ALIAS)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name is not None:
+            alias = database_for(f'{app_label}.{model_name}')
+            if alias is not None:
+                return db == alias
+        if db in getattr(settings, 'HOT_TABLE_DATABASES', {}).values():
+            # Hot databases hold their routed tables and nothing else, data
+            # migrations included
+            return False
+        return None
+
+
+# Set by ReadReplicaMiddleware for requests whose reads may go to a replica
+replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+# Apps read from the primary only: sessions and users must reflect logins,
+# logouts and revocations as soon as they happen
+PRIMARY_ONLY_APPS = frozenset({'sessions', 'auth', 'user', 'contenttypes'})
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ()) if alias in settings.DATABASES]
+
+
+class ReplicaRouter:
+    """
+    Send reads of replica-safe requests to a read replica.
+
+    Only requests that ReadReplicaMiddleware marked (GETs of a few list views
+    and the admin, from clients that have not written recently) read from one
+    of DATABASE_REPLICAS; every other read and all writes use the primary.
+    Replicas are never migrated, they get the schema from replication.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A replica holds the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        return None
@@ -0,0 +1,184 @@
+"""
+Read-only fast path for serializing many rows.
+
+ModelSerializer spends most of its time per row and per field walking
+attributes and dispatching to field classes. serialize_rows() reads the
+columns a serializer needs with values_list() and builds each dict with
+precomputed converters that reproduce the serializer's output exactly, so
+the rendered JSON is byte for byte the same.
+
+Only plain model fields, `get_<field>_display` sources and the field types
+below are supported; serializers with anything else (method fields, nested
+or related fields, dotted sources) raise ImproperlyConfigured and must keep
+using the serializer.
+"""
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, fields as drf_fields
+from rest_framework.settings import api_settings
+
+
+def _decimal(field, utc):
+    places = field.decimal_places
+    max_digits = field.max_digits
+    to_representation = field.to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or places is None or places < 1:
+        return to_representation
+
+    def convert(value):
+        # The database converter has usually quantized the value already, and
+        # then formatting it is all DRF does. Values with too many digits are
+        # left to DRF, which refuses them.
+        text = f'{value:f}'
+        dot = text.find('.')
+        if dot != -1 and len(text) - dot - 1 == places and (
+            max_digits is None or len(text) - 1 - (text[0] == '-') <= max_digits
+        ):
+            return text
+        return to_representation(value)
+    return convert
+
+
+def _datetime(field, utc):
+    to_representation = field.to_representation
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if hasattr(field, 'timezone') or not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+        return to_representation
+
+    def convert(value):
+        if value.tzinfo is dt_timezone.utc and utc:
+            # Already in the current time zone
+            return value.isoformat()[:-6] + 'Z'
+        if not timezone.is_aware(value):
+            return to_representation(value)
+        value = value.astimezone(timezone.get_current_timezone()).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _choice(field, utc):
+    lookup = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return lookup.get(str(value), value)
+    return convert
+
+
+def _display(model_field):
+    labels = {value: str(label) for value, label in model_field.flatchoices}
+
+    def convert(value):
+        return labels.get(value, str(value))
+    return convert
+
+
+# Model fields whose database values are already what the serializer field
+# outputs, so they are copied without a call
+PASS_THROUGH = {
+    drf_fields.CharField: {'CharField', 'TextField', 'EmailField', 'SlugField', 'URLField'},
+    drf_fields.IntegerField: {'IntegerField', 'BigIntegerField', 'SmallIntegerField', 'AutoField', 'BigAutoField',
+                              'PositiveIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField'},
+    drf_fields.BooleanField: {'BooleanField'},
+}
+
+CONVERTERS = (
+    (drf_fields.DecimalField, _decimal),
+    (drf_fields.DateTimeField, _datetime),
+    (drf_fields.ChoiceField, _choice),
+    # CharField covers EmailField, SlugField and URLField
+    (drf_fields.CharField, lambda field, utc: str),
+    (drf_fields.IntegerField, lambda field, utc: int),
+    (drf_fields.BooleanField, lambda field, utc: bool),
+    (drf_fields.JSONField, lambda field, utc: field.to_representation if field.binary else None),
+    (drf_fields.ReadOnlyField, lambda field, utc: None),
+)
+
+
+def _passes_through(field, model_field):
+    internal_type = model_field.get_internal_type()
+    if isinstance(field, drf_fields.ChoiceField):
+        # Text choices map to themselves
+        return internal_type in PASS_THROUGH[drf_fields.CharField] and all(
+            isinstance(key, str) for key in field.choice_strings_to_values.values()
+        )
+    return any(
+        type(field) is field_class or (field_class is drf_fields.CharField and isinstance(field, field_class))
+        for field_class, types in PASS_THROUGH.items() if internal_type in types
+    )
+
+
+@lru_cache(maxsize=None)
+def row_layout(serializer_class, utc=True):
+    """
+    (columns to select, [(output name, column index, converter or None)]) for a
+    serializer class; `utc` says whether the current time zone is UTC.
+    """
+    serializer = serializer_class()
+    model = serializer_class.Meta.model
+    columns = []
+    layout = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if source.startswith('get_') and source.endswith('_display'):
+            model_field = model._meta.get_field(source[4:-8])
+            convert = _display(model_field)
+            # DRF's CharField formats the label with str()
+            if not isinstance(field, drf_fields.CharField):
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: unsupported display field')
+        else:
+            if '.' in source or source == '*':
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: unsupported source {source!r}')
+            model_field = model._meta.get_field(source)
+            if model_field.is_relation:
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: relations are not supported')
+            for field_class, factory in CONVERTERS:
+                if isinstance(field, field_class):
+                    convert = None if _passes_through(field, model_field) else factory(field, utc)
+                    break
+            else:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name}: unsupported field {type(field).__name__}'
+                )
+        column = model_field.attname
+        if column not in columns:
+            columns.append(column)
+        layout.append((name, columns.index(column), convert))
+    return columns, layout
+
+
+def _getter(index, convert):
+    if convert is None:
+        return itemgetter(index)
+
+    def get(row):
+        value = row[index]
+        return None if value is None else convert(value)
+    return get
+
+
+@lru_cache(maxsize=None)
+def row_builder(serializer_class, utc=True):
+    """(columns, function turning one values_list() row into the serializer's dict)"""
+    columns, layout = row_layout(serializer_class, utc)
+    names = tuple(name for name, _, _ in layout)
+    getters = tuple(_getter(index, convert) for _, index, convert in layout)
+
+    def build(row):
+        return dict(zip(names, [get(row) for get in getters]))
+    return columns, build
+
+
+def serialize_rows(queryset, serializer_class):
+    """Same data as serializer_class(queryset, many=True).data, built from values_list() rows"""
+    columns, build = row_builder(serializer_class, timezone.get_current_timezone_name() == 'UTC')
+    return [build(row) for row in queryset.values_list(*columns)]
@@ -0,0 +1,251 @@
+"""
+Ranked full-text search over lost & found reports.
+
+On SQLite the search runs against the lost_found_fts FTS5 table, which is an
+external-content index over lost_found kept in sync by triggers (see
+migration 0011). Other databases, or SQLite builds without FTS5, use an
+in-process inverted index with the same BM25 ranking that is updated from
+model signals.
+"""
+import json
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+
+from .models import LostFound
+
+FTS_TABLE = 'lost_found_fts'
+SEARCH_FIELDS = ('person_name', 'description', 'location')
+# BM25 column weights: a hit in the name matters more than one in the description
+FIELD_WEIGHTS = (10.0, 1.0, 3.0)
+
+FTS_SETUP_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        person_name, description, location,
+        content='lost_found', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER lost_found_fts_ai AFTER INSERT ON lost_found BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, person_name, description, location)
+        VALUES (new.id, new.person_name, new.description, new.location);
+    END""",
+    f"""CREATE TRIGGER lost_found_fts_ad AFTER DELETE ON lost_found BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, person_name, description, location)
+        VALUES ('delete', old.id, old.person_name, old.description, old.location);
+    END""",
+    f"""CREATE TRIGGER lost_found_fts_au AFTER UPDATE OF person_name, description, location ON lost_found BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, person_name, description, location)
+        VALUES ('delete', old.id, old.person_name, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, person_name, description, location)
+        VALUES (new.id, new.person_name, new.description, new.location);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+FTS_TEARDOWN_SQL = [
+    'DROP TRIGGER IF EXISTS lost_found_fts_ai',
+    'DROP TRIGGER IF EXISTS lost_found_fts_ad',
+    'DROP TRIGGER IF EXISTS lost_found_fts_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def fts5_supported(conn):
+    """True if the given DB connection is SQLite compiled with FTS5"""
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+_fts_ready = {}
+
+
+def _use_fts():
+    if connection.alias not in _fts_ready:
+        _fts_ready[connection.alias] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_ready[connection.alias]
+
+
+def _fts_query(terms):
+    # Quote every term so user input can't inject FTS operators; match prefixes
+    # so partially typed names still hit. Every term must match, like the old
+    # icontains search required the whole phrase.
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def _fts_search(terms, filters, limit, offset, restrict_to=None):
+    where = [f'{FTS_TABLE} MATCH %s', 'lf.is_active = %s']
+    params = [_fts_query(terms), True]
+    for field, value in filters.items():
+        where.append(f'lf.{field} = %s')
+        params.append(value)
+    if isinstance(restrict_to, QuerySet):
+        subquery, subquery_params = restrict_to.query.get_compiler(connection=connection).as_sql()
+        where.append(f'lf.id IN ({subquery})')
+        params.extend(subquery_params)
+    elif restrict_to is not None:
+        # One parameter however many ids there are
+        where.append('lf.id IN (SELECT value FROM json_each(%s))')
+        params.append(json.dumps(list(restrict_to)))
+    where_sql = ' AND '.join(where)
+    join_sql = f'FROM {FTS_TABLE} JOIN lost_found lf ON lf.id = {FTS_TABLE}.rowid'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) {join_sql} WHERE {where_sql}', params)
+        total = cursor.fetchone()[0]
+        weights = ', '.join(str(w) for w in FIELD_WEIGHTS)
+        cursor.execute(
+            f'SELECT lf.id {join_sql} WHERE {where_sql} '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}), lf.created_at DESC LIMIT %s OFFSET %s',
+            params + [limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    return total, ids
+
+
+class InvertedIndex:
+    """In-process BM25 index used when FTS5 is not available"""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings = defaultdict(dict)  # term -> {doc_id: weighted term frequency}
+        self._docs = {}  # doc_id -> (terms, length, filter values)
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def _document(self, report):
+        weighted = defaultdict(float)
+        for field, weight in zip(SEARCH_FIELDS, FIELD_WEIGHTS):
+            for term in tokenize(getattr(report, field)):
+                weighted[term] += weight
+        attrs = {'is_active': report.is_active, 'report_type': report.report_type, 'status': report.status}
+        return weighted, sum(weighted.values()), attrs, report.created_at
+
+    def add(self, report):
+        weighted, length, attrs, created_at = self._document(report)
+        with self._lock:
+            self._remove(report.pk)
+            for term, tf in weighted.items():
+                self._postings[term][report.pk] = tf
+            self._docs[report.pk] = (list(weighted), length, attrs, created_at)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in doc[0]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def load(self, queryset):
+        for report in queryset.iterator(chunk_size=2000):
+            self.add(report)
+        self.loaded = True
+
+    def search(self, terms, filters, limit, offset, restrict_to=None):
+        with self._lock:
+            n_docs = len(self._docs) or 1
+            avg_len = sum(doc[1] for doc in self._docs.values()) / n_docs or 1.0
+            scores = defaultdict(float)
+            matched = None
+            for query_term in set(terms):
+                # Prefix match, mirroring the FTS5 "term"* query
+                term_docs = set()
+                for term, postings in self._postings.items():
+                    if not term.startswith(query_term):
+                        continue
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        length = self._docs[doc_id][1]
+                        norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+                        scores[doc_id] += idf * norm
+                        term_docs.add(doc_id)
+                # Every term must match
+                matched = term_docs if matched is None else matched & term_docs
+
+            if restrict_to is not None:
+                matched &= set(restrict_to)
+            wanted = dict(filters, is_active=True)
+            matches = [
+                (score, self._docs[doc_id][3], doc_id)
+                for doc_id, score in scores.items()
+                if doc_id in matched and all(self._docs[doc_id][2].get(k) == v for k, v in wanted.items())
+            ]
+        matches.sort(key=lambda m: (-m[0], -m[1].timestamp()))
+        return len(matches), [doc_id for _, _, doc_id in matches[offset:offset + limit]]
+
+
+fallback_index = InvertedIndex()
+_fallback_lock = threading.Lock()
+
+
+def _fallback_search(terms, filters, limit, offset, restrict_to=None):
+    if not fallback_index.loaded:
+        with _fallback_lock:
+            if not fallback_index.loaded:
+                fallback_index.load(LostFound.objects.all())
+    if restrict_to is not None:
+        restrict_to = set(restrict_to)
+    return fallback_index.search(terms, filters, limit, offset, restrict_to)
+
+
+def search_lost_found(query, filters=None, page=1, page_size=20, restrict_to=None):
+    """
+    Return (total, reports) for a BM25-ranked search, one page at a time.
+
+    `filters` may restrict report_type and status; inactive reports are
+    always excluded. `restrict_to` optionally limits results to a list or
+    values queryset of report ids, such as kumbh.name_index.matching_ids().
+    """
+    terms = tokenize(query)
+    if not terms:
+        return 0, []
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    offset = (page - 1) * page_size
+
+    if _use_fts():
+        total, ids = _fts_search(terms, filters, page_size, offset, restrict_to)
+    else:
+        total, ids = _fallback_search(terms, filters, page_size, offset, restrict_to)
+
+    reports = LostFound.objects.select_related('photo').in_bulk(ids)
+    return total, [reports[pk] for pk in ids if pk in reports]
+
+
+def _sync_fallback_on_save(sender, instance, **kwargs):
+    if fallback_index.loaded and not _use_fts():
+        fallback_index.add(instance)
+
+
+def _sync_fallback_on_delete(sender, instance, **kwargs):
+    if fallback_index.loaded and not _use_fts():
+        fallback_index.remove(instance.pk)
+
+
+post_save.connect(_sync_fallback_on_save, sender=LostFound, dispatch_uid='lost_found_search_save')
+post_delete.connect(_sync_fallback_on_delete, sender=LostFound, dispatch_uid='lost_found_search_delete')
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound
+from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound, LostFoundMatch, LostFoundSubscription, Photo, SubscriptionHit, TourGroup, TourGroupMember
+from .photos import media_url, thumbnail_url
 
 
 class ZoneSerializer(serializers.ModelSerializer):
@@ -105,15 +106,106 @@ class FamilyInvitationSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'token', 'status', 'status_display', 'is_expired', 'created_at', 'accepted_at')
 
 
+class PhotoSerializer(serializers.ModelSerializer):
+    """Serializer for an uploaded photo"""
+    url = serializers.SerializerMethodField()
+    thumbnail_urls = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Photo
+        fields = ('id', 'sha256', 'url', 'thumbnail_urls', 'content_type', 'size', 'width', 'height',
+                  'phash', 'status', 'created_at')
+        read_only_fields = fields
+    
+    def get_url(self, obj):
+        return media_url(obj.file.name)
+    
+    def get_thumbnail_urls(self, obj):
+        return {size: media_url(path) for size, path in obj.thumbnails.items()}
+
+
 class LostFoundSerializer(serializers.ModelSerializer):
     """Serializer for LostFound model"""
     report_type_display = serializers.CharField(source='get_report_type_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = LostFound
         fields = ('id', 'report_type', 'report_type_display', 'user_email', 'user_name', 'user_phone',
                   'person_name', 'age', 'description', 'location', 'latitude', 'longitude',
-                  'photo_url', 'status', 'status_display', 'is_active', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'report_type_display', 'status_display', 'created_at', 'updated_at')
+                  'photo_url', 'photo', 'thumbnail_url', 'status', 'status_display', 'is_active',
+                  'created_at', 'updated_at')
+        read_only_fields = ('id', 'report_type_display', 'status_display', 'thumbnail_url', 'created_at', 'updated_at')
+
+    def get_thumbnail_url(self, obj):
+        """Small image for list views; falls back to the external photo_url"""
+        if obj.photo_id is None:
+            return obj.photo_url
+        return thumbnail_url(obj.photo)
+
 
+class LostFoundSubscriptionSerializer(serializers.ModelSerializer):
+    """Serializer for a saved lost & found search"""
+    
+    class Meta:
+        model = LostFoundSubscription
+        fields = ('id', 'user_email', 'query', 'report_type', 'latitude', 'longitude', 'radius_km',
+                  'is_active', 'last_matched_at', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'is_active', 'last_matched_at', 'created_at', 'updated_at')
+    
+    def validate(self, data):
+        """Require a name or an area to watch"""
+        has_area = data.get('latitude') is not None and data.get('longitude') is not None
+        if not data.get('query', '').strip() and not has_area:
+            raise serializers.ValidationError("Provide a name to search for or latitude/longitude to watch")
+        radius = data.get('radius_km')
+        if radius is not None and not 0 < radius <= 25:
+            raise serializers.ValidationError({'radius_km': "Radius must be between 0 and 25 km"})
+        return data
+
+
+class SubscriptionHitSerializer(serializers.ModelSerializer):
+    """Serializer for a report that matched a saved search"""
+    report = LostFoundSerializer(read_only=True)
+    
+    class Meta:
+        model = SubscriptionHit
+        fields = ('id', 'subscription', 'report', 'created_at')
+        read_only_fields = fields
+
+
+class TourGroupMemberSerializer(serializers.ModelSerializer):
+    """Serializer for Tour Group Member model"""
+    
+    class Meta:
+        model = TourGroupMember
+        fields = ('id', 'user_email', 'name', 'joined_at')
+        read_only_fields = ('id', 'joined_at')
+
+
+class TourGroupSerializer(serializers.ModelSerializer):
+    """Serializer for Tour Group model"""
+    member_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = TourGroup
+        fields = ('id', 'name', 'leader_email', 'member_count', 'is_active', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'member_count', 'created_at', 'updated_at')
+
+
+class LostFoundMatchSerializer(serializers.ModelSerializer):
+    """Serializer for a candidate match, showing the report on the other side"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    report = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = LostFoundMatch
+        fields = ('id', 'lost', 'found', 'score', 'name_score', 'age_score', 'distance_km', 'hours_apart',
+                  'status', 'status_display', 'report', 'created_at')
+        read_only_fields = ('id', 'lost', 'found', 'score', 'name_score', 'age_score', 'distance_km',
+                            'hours_apart', 'status_display', 'report', 'created_at')
+    
+    def get_report(self, obj):
+        other = obj.found if self.context.get('report_type') == 'lost' else obj.lost
+        return LostFoundSerializer(other).data
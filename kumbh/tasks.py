@@ -0,0 +1,136 @@
+"""Background jobs run by the run_jobs management command"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from user.models import RevokedToken
+
+from .jobs import register
+from .models import FamilyInvitation, Job, LostFound, Photo
+
+DEFAULT_INVITATION_RETENTION_DAYS = 30
+DEFAULT_JOB_RETENTION_DAYS = 7
+
+
+@register('expire_invitations', interval=timedelta(minutes=5))
+def expire_invitations():
+    """Flip every pending invitation past its expiry to 'expired' in one UPDATE"""
+    return FamilyInvitation.objects.filter(
+        status='pending',
+        expires_at__lte=timezone.now(),
+    ).update(status='expired')
+
+
+@register('table_maintenance', interval=timedelta(hours=24))
+def table_maintenance():
+    """Delete old invitations, finished jobs and expired token revocations, then refresh planner stats"""
+    now = timezone.now()
+    invitation_days = getattr(settings, 'INVITATION_RETENTION_DAYS', DEFAULT_INVITATION_RETENTION_DAYS)
+    job_days = getattr(settings, 'JOB_RETENTION_DAYS', DEFAULT_JOB_RETENTION_DAYS)
+
+    invitations, _ = FamilyInvitation.objects.filter(
+        status__in=['expired', 'cancelled'],
+        expires_at__lt=now - timedelta(days=invitation_days),
+    ).delete()
+    jobs, _ = Job.objects.filter(
+        status__in=['succeeded', 'failed'],
+        finished_at__lt=now - timedelta(days=job_days),
+    ).delete()
+    # Expired tokens are rejected on expiry alone, so their revocations can go
+    tokens, _ = RevokedToken.objects.filter(expires_at__lt=now).delete()
+
+    for connection in connections.all():
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA optimize')
+
+    return {'invitations_deleted': invitations, 'jobs_deleted': jobs, 'revoked_tokens_deleted': tokens}
+
+
+@register('prune_file_caches', interval=timedelta(hours=1))
+def prune_file_caches():
+    """Delete expired entries from file-based caches, which otherwise keep them until read or culled"""
+    from django.core.cache import caches
+    from django.core.cache.backends.filebased import FileBasedCache
+
+    pruned = 0
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if not isinstance(cache, FileBasedCache):
+            continue
+        for fname in cache._list_cache_files():
+            try:
+                with open(fname, 'rb') as f:
+                    # Deletes the file when it has expired
+                    pruned += cache._is_expired(f)
+            except FileNotFoundError:
+                pass
+    return pruned
+
+
+@register('match_lost_found')
+def match_lost_found(report_id=None):
+    """Find candidate matches for one new report, or for every open report when no id is given"""
+    from .matching import match_report
+
+    if report_id is not None:
+        reports = LostFound.objects.filter(pk=report_id, is_active=True)
+    else:
+        reports = LostFound.objects.filter(report_type='lost', status='open', is_active=True)
+    return sum(match_report(report) for report in reports.iterator())
+
+
+@register('percolate_report')
+def percolate_report(report_id):
+    """Notify the saved searches a new report matches"""
+    from .percolator import percolate
+
+    report = LostFound.objects.filter(pk=report_id, is_active=True).first()
+    return len(percolate(report)) if report is not None else 0
+
+
+@register('render_pending_thumbnails', interval=timedelta(minutes=10))
+def render_pending_thumbnails():
+    """Render thumbnails for photos whose upload-time rendering never finished, e.g. after a restart"""
+    from django.core.files.storage import default_storage
+
+    from .photos import hash_fields, thumbnail_sizes
+    from .thumbnails import render_thumbnails
+
+    rendered = 0
+    stuck = Photo.objects.filter(status='pending', created_at__lt=timezone.now() - timedelta(minutes=10))
+    for photo in stuck.iterator():
+        try:
+            result = render_thumbnails(
+                default_storage.path(photo.file.name), str(settings.MEDIA_ROOT), photo.sha256, thumbnail_sizes()
+            )
+        except Exception:
+            Photo.objects.filter(pk=photo.pk).update(status='failed')
+            continue
+        Photo.objects.filter(pk=photo.pk).update(status='ready', **hash_fields(result.pop('phash')), **result)
+        rendered += 1
+    return rendered
+
+
+@register('backfill_photo_hashes', interval=timedelta(hours=1))
+def backfill_photo_hashes(batch_size=500):
+    """Compute perceptual hashes for ready photos stored before hashing existed"""
+    from django.core.files.storage import default_storage
+
+    from .photos import hash_fields
+    from .thumbnails import hash_file
+
+    hashed = 0
+    for photo in Photo.objects.filter(status='ready', phash__isnull=True)[:batch_size]:
+        if not photo.thumbnails:
+            continue
+        # The smallest thumbnail, as render_thumbnails hashes
+        smallest = photo.thumbnails[str(min(int(size) for size in photo.thumbnails))]
+        try:
+            value = hash_file(default_storage.path(smallest))
+        except OSError:
+            continue
+        Photo.objects.filter(pk=photo.pk).update(**hash_fields(value))
+        hashed += 1
+    return hashed
@@ -0,0 +1,9 @@
+# Databases a test case needs when it touches the hot tables (see kumbh/routers.py)
+HOT_DATABASES = {'default', 'sos', 'locations'}
+
+# Every cache alias the settings use, kept in the test process rather than on disk
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-shared'},
+    'dummy': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
@@ -0,0 +1,38 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from kumbh.tasks import prune_file_caches
+
+
+class SharedFileCacheTests(SimpleTestCase):
+    """The 'shared' cache as configured, in a temporary directory"""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        shared = {**settings.CACHES['shared'], 'LOCATION': location}
+        override = override_settings(CACHES={**settings.CACHES, 'shared': shared})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.cache = caches['shared']
+
+    def test_more_keys_than_the_default_limit_are_kept(self):
+        keys = [f'location:pilgrim{i}@example.com' for i in range(400)]
+        for key in keys:
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.get_many(keys), {key: key for key in keys})
+
+    def test_expired_entries_are_pruned(self):
+        now = time.time()
+        self.cache.set('presence:ramesh@example.com', 1000, timeout=60)
+        self.cache.set('presence:sita@example.com', 1000, timeout=600)
+        with mock.patch('time.time', return_value=now + 120):
+            self.assertEqual(prune_file_caches(), 1)
+        self.assertEqual(len(self.cache._list_cache_files()), 1)
+        self.assertEqual(self.cache.get('presence:sita@example.com'), 1000)
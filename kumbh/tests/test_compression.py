@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+from unittest import mock
+
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from kumbh import compression
+from kumbh.middleware import CompressionMiddleware
+from kumbh.tests import TEST_CACHES
+
+BODY = json.dumps([{'id': i, 'name': 'Sector 4', 'status': 'open'} for i in range(100)]).encode()
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_negotiate(self):
+        cases = (
+            ('', None),
+            ('gzip, deflate, br', 'br'),
+            ('gzip;q=1.0, br;q=0.5', 'gzip'),
+            ('gzip; Q=0.5, br;q=0.8', 'br'),
+            ('br;q=0, gzip', 'gzip'),
+            ('GZIP', 'gzip'),
+            ('identity;q=0, gzip', 'gzip'),
+            ('identity;q=0', None),
+            ('*', 'br'),
+            ('*;q=0.5, br;q=0', 'gzip'),
+            ('*;q=0', None),
+            ('gzip;q=oops', None),
+            ('deflate', None),
+        )
+        with mock.patch.object(compression, 'available_encodings', return_value=('br', 'gzip')):
+            for header, expected in cases:
+                with self.subTest(header):
+                    self.assertEqual(compression.negotiate(header), expected)
+
+    def test_gzip_only_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.negotiate('br, gzip;q=0.1'), 'gzip')
+            self.assertIsNone(compression.negotiate('br'))
+
+
+@override_settings(CACHES=TEST_CACHES, COMPRESSION_CACHE='default', COMPRESSION_MIN_SIZE=512)
+@mock.patch.object(compression, 'available_encodings', return_value=('gzip',))
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def respond(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/api/zones/', headers={'Accept-Encoding': accept_encoding})
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=BODY, **headers):
+        return HttpResponse(body, content_type='application/json', headers=headers)
+
+    def test_compresses_json(self, _):
+        response = self.respond(self.json_response(ETag='"v1"'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_vary_even_when_the_client_takes_no_compression(self, _):
+        response = self.respond(self.json_response(ETag='"v1"'), accept_encoding='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], '"v1"')
+        self.assertEqual(response.content, BODY)
+
+    def test_weak_etags_stay_as_they_are(self, _):
+        self.assertEqual(self.respond(self.json_response(ETag='W/"v1"'))['ETag'], 'W/"v1"')
+
+    def test_left_alone(self, _):
+        responses = {
+            'small': self.json_response(b'{"id": 1}'),
+            'html': HttpResponse(BODY, content_type='text/html'),
+            'image': HttpResponse(BODY, content_type='image/jpeg'),
+            'already encoded': self.json_response(**{'Content-Encoding': 'br'}),
+            'no-transform': self.json_response(**{'Cache-Control': 'public, no-transform'}),
+            'streaming': StreamingHttpResponse(iter([BODY]), content_type='application/json'),
+        }
+        for name, response in responses.items():
+            with self.subTest(name):
+                encoding = response.get('Content-Encoding')
+                response = self.respond(response)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertFalse(response.has_header('Vary'))
+
+    def test_incompressible_bodies_are_sent_as_they_are(self, _):
+        body = os.urandom(2048)
+        response = self.respond(HttpResponse(body, content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+    def test_cached_responses_are_compressed_once_per_version(self, _):
+        def cached(version):
+            response = self.json_response()
+            response.compression_key = version
+            return response
+
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self.respond(cached('v1'))
+            second = self.respond(cached('v1'))
+            self.assertEqual(compress.call_count, 1)
+            self.respond(cached('v2'))
+            self.assertEqual(compress.call_count, 2)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(gzip.decompress(second.content), BODY)
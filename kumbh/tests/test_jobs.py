@@ -0,0 +1,39 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from kumbh import jobs
+from kumbh.models import Job
+
+SPEC = jobs.JobSpec(name='sweep', func=lambda: 'swept', interval=timedelta(minutes=5))
+
+
+@mock.patch.dict(jobs.registry, {'sweep': SPEC}, clear=True)
+class PeriodicJobTests(TestCase):
+    def test_one_active_instance_when_runners_race(self):
+        now = timezone.now()
+        # Two runners that both found no queued instance
+        self.assertIsNotNone(jobs._enqueue_periodic(SPEC, now))
+        self.assertIsNone(jobs._enqueue_periodic(SPEC, now + timedelta(seconds=1)))
+        self.assertEqual(jobs.schedule_periodic(now), [])
+        self.assertEqual(Job.objects.filter(name='sweep').count(), 1)
+
+    def test_run_schedules_the_next_instance(self):
+        now = timezone.now()
+        [scheduled] = jobs.schedule_periodic(now)
+        job = jobs.claim_next('worker', now)
+        self.assertEqual(job.pk, scheduled.pk)
+        self.assertEqual(jobs.schedule_periodic(now), [])
+
+        jobs.run_job(job)
+        queued = Job.objects.get(name='sweep', status='queued')
+        self.assertTrue(queued.periodic)
+        self.assertGreater(queued.run_at, now)
+        self.assertEqual(Job.objects.filter(name='sweep').count(), 2)
+
+    def test_one_off_runs_are_not_limited(self):
+        jobs.enqueue('sweep')
+        jobs.enqueue('sweep')
+        self.assertEqual(Job.objects.filter(name='sweep', status='queued').count(), 2)
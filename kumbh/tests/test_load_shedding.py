@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+
+from kumbh.load_shedding import BULK, CRITICAL, NORMAL, READ, LoadShedder, classify
+from kumbh.models import Zone
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+class ClassifyTests(SimpleTestCase):
+    def test_priorities(self):
+        cases = (
+            ('post', '/api/sos-requests/', CRITICAL),
+            ('patch', '/api/sos-requests/1/', CRITICAL),
+            ('get', '/api/sos-requests/', NORMAL),
+            ('get', '/api/zones/', READ),
+            ('head', '/api/lost-found/', READ),
+            ('post', '/api/lost-found/', NORMAL),
+            ('get', '/api/exports/sos/', BULK),
+            ('post', '/api/photos/', BULK),
+            ('get', '/admin/', BULK),
+            ('get', '/dashboard/', BULK),
+            ('get', '/invite/token/', NORMAL),
+            ('get', '/media/thumbs/160/ab/abc.jpg', NORMAL),
+        )
+        for method, path, expected in cases:
+            with self.subTest(method=method, path=path):
+                request = getattr(RequestFactory(), method)(path)
+                request.resolver_match = resolve(path)
+                self.assertEqual(classify(request, request.resolver_match.func), expected)
+
+
+@override_settings(LOAD_SHEDDING_MAX_IN_FLIGHT=10, LOAD_SHEDDING_TARGET_LATENCY=0.5)
+class LoadShedderTests(SimpleTestCase):
+    def test_priorities_are_shed_in_order(self):
+        shedder = LoadShedder()
+        cases = (
+            (0.69, set()),
+            (0.7, {BULK}),
+            (0.85, {BULK, READ}),
+            (1.0, {BULK, READ, NORMAL}),
+            (50.0, {BULK, READ, NORMAL}),
+        )
+        for load, expected in cases:
+            with self.subTest(load=load), mock.patch.object(shedder, 'load', return_value=load):
+                self.assertEqual({p for p in (CRITICAL, BULK, READ, NORMAL) if shedder.should_shed(p)}, expected)
+
+    def test_load_from_requests_in_flight(self):
+        shedder = LoadShedder()
+        for _ in range(7):
+            shedder.begin()
+        self.assertAlmostEqual(shedder.load(), 0.7)
+        self.assertTrue(shedder.should_shed(BULK))
+        shedder.end()
+        self.assertFalse(shedder.should_shed(BULK))
+
+    def test_latency_decays_while_nothing_completes(self):
+        with mock.patch('time.monotonic', return_value=1000.0):
+            shedder = LoadShedder()
+            shedder.begin()
+            shedder.end(duration=10.0)
+            self.assertAlmostEqual(shedder.latency(), 1.0)
+            self.assertAlmostEqual(shedder.load(), 2.0)
+        with mock.patch('time.monotonic', return_value=1005.0):
+            self.assertAlmostEqual(shedder.latency(), 0.5)
+        with mock.patch('time.monotonic', return_value=1060.0):
+            self.assertLess(shedder.load(), 0.7)
+
+    @override_settings(LOAD_SHEDDING_ENABLED=False)
+    def test_disabled(self):
+        shedder = LoadShedder()
+        with mock.patch.object(shedder, 'load', return_value=50.0):
+            self.assertFalse(shedder.should_shed(BULK))
+
+
+@override_settings(CACHES=TEST_CACHES, LOAD_SHEDDING_CACHE='default', RESPONSE_CACHE='dummy', LOAD_SHEDDING_RETRY_AFTER=5)
+class LoadSheddingMiddlewareTests(TestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        caches['default'].clear()
+        self.shedder = LoadShedder()
+        patcher = mock.patch('kumbh.middleware.shedder', self.shedder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Zone.objects.create(name='Sector 4', zone_type='circle', capacity=10)
+
+    def overloaded(self, load=0.9):
+        return mock.patch.object(self.shedder, 'load', return_value=load)
+
+    def test_reads_get_a_stale_copy(self):
+        fresh = self.client.get('/api/zones/')
+        self.assertEqual(fresh.status_code, 200)
+        Zone.objects.create(name='Sector 9', zone_type='circle', capacity=10)
+        with self.overloaded():
+            stale = self.client.get('/api/zones/')
+            self.assertEqual(stale.status_code, 200)
+            self.assertEqual(stale['X-Load-Shed'], 'stale')
+            self.assertEqual(stale.content, fresh.content)
+            # No copy kept for this URL
+            response = self.client.get('/api/amenities/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual((response['X-Load-Shed'], response['Retry-After']), (READ, '5'))
+        self.assertEqual(self.shedder.stats()['served_stale'], 1)
+
+    def test_sos_is_never_shed(self):
+        with self.overloaded(50.0):
+            self.assertEqual(self.client.get('/api/exports/sos/').status_code, 503)
+            self.assertEqual(self.client.get('/api/sos-requests/').status_code, 503)
+            response = self.client.post('/api/sos-requests/', {}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.shedder.stats()['admitted'], {CRITICAL: 1})
+        self.assertEqual(self.shedder.stats()['shed'], {BULK: 1, NORMAL: 1})
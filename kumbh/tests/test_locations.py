@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kumbh.models import FamilyMember, TourGroup, TourGroupMember
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+@override_settings(LOCATION_CACHE='shared', CACHES=TEST_CACHES)
+class TourGroupPositionsTests(TestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.group = TourGroup.objects.create(name='Varanasi 12', leader_email='leader@example.com', join_token='join')
+        for email in ('ramesh@example.com', 'sita@example.com'):
+            TourGroupMember.objects.create(group=self.group, user_email=email, name=email.split('@')[0])
+        # Sita tracks Ramesh as a family member, so his updates are persisted on her row
+        FamilyMember.objects.create(user_email='sita@example.com', name='Ramesh', phone='ramesh_1234', relationship='sibling')
+        response = self.client.post(
+            '/api/family-members/update-location/',
+            {'user_email': 'ramesh@example.com', 'latitude': '25.4358', 'longitude': '81.8463'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def positions(self):
+        response = self.client.get(f'/api/tour-groups/{self.group.pk}/positions/', {'token': 'join'})
+        self.assertEqual(response.status_code, 200)
+        return {member['user_email']: (member['lat'], member['lng']) for member in response.json()['results']}
+
+    def test_positions_come_from_the_cache(self):
+        self.assertEqual(self.positions(), {
+            'ramesh@example.com': ('25.435800', '81.846300'),
+            'sita@example.com': (None, None),
+        })
+
+    def test_cache_misses_fall_back_to_family_member_rows(self):
+        # As seen by a worker whose cache never got the update
+        caches['shared'].clear()
+        self.assertEqual(self.positions(), {
+            'ramesh@example.com': ('25.435800', '81.846300'),
+            'sita@example.com': (None, None),
+        })
+        self.assertIsNotNone(caches['shared'].get('location:ramesh@example.com'))
+
+    def test_rows_of_other_users_with_the_same_prefix_are_left_alone(self):
+        FamilyMember.objects.create(user_email='sita@example.com', name='Ramesh Doe', phone='ramesh_doe_3', relationship='friend')
+        self.client.post(
+            '/api/family-members/update-location/',
+            {'user_email': 'ramesh@example.com', 'latitude': '25.5', 'longitude': '81.9'},
+            content_type='application/json',
+        )
+        self.assertIsNone(FamilyMember.objects.get(phone='ramesh_doe_3').latitude)
+        # ramesh_doe@example.com's position is not read back from Ramesh's row
+        caches['shared'].clear()
+        TourGroupMember.objects.create(group=self.group, user_email='ramesh_doe@example.com', name='ramesh_doe')
+        self.assertEqual(self.positions()['ramesh_doe@example.com'], (None, None))
+        self.assertEqual(self.positions()['ramesh@example.com'], ('25.500000', '81.900000'))
+
+    def test_positions_need_the_join_token_or_membership(self):
+        url = f'/api/tour-groups/{self.group.pk}/positions/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, {'token': 'guess'}).status_code, 403)
+        for email, expected in (('stranger@example.com', 403), ('Sita@example.com', 200)):
+            user = get_user_model().objects.create_user(email=email, password='secret', full_name=email)
+            response = self.client.get(url, headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+            self.assertEqual(response.status_code, expected)
+
+    def test_lists_leave_out_the_join_token(self):
+        response = self.client.get('/api/tour-groups/', {'user_email': 'sita@example.com'})
+        self.assertEqual(response.status_code, 200)
+        [group] = response.json()['results']
+        self.assertNotIn('join_token', group)
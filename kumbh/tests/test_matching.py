@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from kumbh.matching import match_report
+from kumbh.models import Job, LostFound, LostFoundMatch
+
+
+def report(report_type, person_name, **fields):
+    return LostFound.objects.create(
+        report_type=report_type, user_email='reporter@example.com', person_name=person_name,
+        description='Wearing a saffron shawl', location='Sector 4', age=8,
+        latitude='25.4358', longitude='81.8463', **fields,
+    )
+
+
+class RematchOnUpdateTests(TestCase):
+    def queued(self):
+        return sorted(Job.objects.filter(name='match_lost_found').values_list('payload__report_id', flat=True))
+
+    def test_updates_to_scored_fields_rematch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lost = report('lost', 'Ramesh Kumar')
+            found = report('found', 'Rameshh Kumar')
+        self.assertEqual(self.queued(), [lost.pk, found.pk])
+        match_report(found)
+        self.assertTrue(LostFoundMatch.objects.filter(lost=lost, found=found).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            found.description = 'Blue kurta'
+            found.save()
+            found.status = 'open'
+            found.save(update_fields=['status'])
+        self.assertEqual(self.queued(), [lost.pk, found.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            found.person_name = 'Sita Devi'
+            found.latitude, found.longitude = '25.3176', '82.9739'
+            found.save()
+        self.assertEqual(self.queued(), [lost.pk, found.pk, found.pk])
+        match_report(found)
+        self.assertFalse(LostFoundMatch.objects.filter(lost=lost, found=found).exists())
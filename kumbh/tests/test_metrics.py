@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kumbh import metrics, response_cache
+from kumbh.load_shedding import LoadShedder
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+BUCKETS = (0.1, 1.0)
+
+
+def worker_file(directory, pid, written_at, series, served_stale=0):
+    snapshot = {
+        'pid': pid,
+        'written_at': written_at,
+        'buckets': list(BUCKETS),
+        'series': series,
+        'load_shedding': {'admitted': {'read': 2}, 'shed': {'bulk': 1}, 'served_stale': served_stale,
+                          'in_flight': 3, 'load': 0.5},
+        'response_cache': {'hit': 4},
+    }
+    path = Path(directory) / f'{pid}-{int(written_at * 1e9)}.json'
+    path.write_text(json.dumps(snapshot))
+    return path
+
+
+def series(count, seconds, buckets, statuses):
+    return {'count': count, 'seconds': seconds, 'buckets': buckets, 'statuses': statuses,
+            'queries': count, 'query_seconds': seconds / 2, 'bytes': 100 * count}
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+class MetricsTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        overrides = override_settings(METRICS_DIR=self.directory, METRICS_BUCKETS=BUCKETS, METRICS_FLUSH_INTERVAL=5.0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # The module's counters hold whatever other tests' requests recorded
+        self.registry = metrics.Registry()
+        for patcher in (
+            mock.patch('kumbh.metrics.registry', self.registry),
+            mock.patch('kumbh.middleware.registry', self.registry),
+            mock.patch('kumbh.metrics.shedder', LoadShedder()),
+            mock.patch.dict(response_cache.stats, dict.fromkeys(response_cache.stats, 0)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def samples(self, text):
+        return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+class RegistryTests(MetricsTestCase):
+    def test_threads_are_merged(self):
+        def observe(seconds):
+            self.registry.observe('zones_list', 'GET', 200, seconds, queries=1)
+
+        threads = [threading.Thread(target=observe, args=(seconds,)) for seconds in (0.05, 0.5, 5.0)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.registry.observe('zones_list', 'GET', 404, 0.05)
+        self.registry.observe('zones_list', 'BREW', 200, 0.05)
+        snapshot = self.registry.snapshot()
+        self.assertEqual(sorted(snapshot), ['zones_list\tGET', 'zones_list\tother'])
+        merged = snapshot['zones_list\tGET']
+        self.assertEqual((merged['count'], merged['buckets'], merged['statuses']), (4, [2, 1, 1], {200: 3, 404: 1}))
+        self.assertEqual(merged['queries'], 3)
+        self.assertAlmostEqual(merged['seconds'], 5.6)
+
+
+class ExpositionTests(MetricsTestCase):
+    def test_workers_are_summed(self):
+        now = time.time()
+        worker_file(self.directory, 101, now, {'zones_list\tGET': series(2, 0.3, [1, 1, 0], {'200': 2})})
+        worker_file(self.directory, 102, now, {
+            'zones_list\tGET': series(1, 2.0, [0, 0, 1], {'200': 1}),
+            'say "hi"\\\tPOST': series(1, 0.01, [1, 0, 0], {'201': 1}),
+        }, served_stale=1)
+        text = metrics.exposition()
+        self.assertIn(
+            '# HELP kumbh_http_request_duration_seconds Time from request to response, by view and method.\n'
+            '# TYPE kumbh_http_request_duration_seconds histogram\n', text,
+        )
+        self.assertIn(
+            'kumbh_http_request_duration_seconds_bucket{view="zones_list",method="GET",le="0.1"} 1\n'
+            'kumbh_http_request_duration_seconds_bucket{view="zones_list",method="GET",le="1.0"} 2\n'
+            'kumbh_http_request_duration_seconds_bucket{view="zones_list",method="GET",le="+Inf"} 3\n'
+            'kumbh_http_request_duration_seconds_sum{view="zones_list",method="GET"} 2.3\n'
+            'kumbh_http_request_duration_seconds_count{view="zones_list",method="GET"} 3\n', text,
+        )
+        samples = self.samples(text)
+        self.assertEqual(samples['kumbh_http_responses_total{view="zones_list",method="GET",status="200"}'], '3')
+        self.assertEqual(samples['kumbh_http_responses_total{view="say \\"hi\\"\\\\",method="POST",status="201"}'], '1')
+        self.assertEqual(samples['kumbh_http_response_bytes_total{view="zones_list",method="GET"}'], '300')
+        self.assertEqual(samples['kumbh_load_shedding_requests_total{priority="read",outcome="admitted"}'], '4')
+        self.assertEqual(samples['kumbh_load_shedding_requests_total{priority="read",outcome="stale"}'], '1')
+        self.assertEqual(samples['kumbh_response_cache_lookups_total{result="hit"}'], '8')
+        self.assertEqual(samples['kumbh_load_shedding_in_flight{pid="101"}'], '3')
+        self.assertTrue(text.endswith('\n'))
+
+    def test_files_of_exited_workers_are_folded(self):
+        old = time.time() - 60
+        gone = worker_file(self.directory, exited_pid(), old, {'zones_list\tGET': series(2, 0.3, [1, 1, 0], {'200': 2})})
+        # Idle, but still running
+        idle = worker_file(self.directory, os.getppid(), old, {'zones_list\tGET': series(1, 2.0, [0, 0, 1], {'200': 1})})
+        worker_file(self.directory, exited_pid(), time.time(), {'zones_list\tGET': series(1, 0.05, [1, 0, 0], {'200': 1})})
+        before = self.samples(metrics.exposition())
+        self.assertFalse(gone.exists())
+        self.assertTrue(idle.exists())
+        self.assertTrue((self.directory / metrics.RETIRED).exists())
+        self.assertEqual(self.samples(metrics.exposition()), before)
+        self.assertEqual(before['kumbh_http_request_duration_seconds_count{view="zones_list",method="GET"}'], '4')
+        self.assertEqual(before['kumbh_response_cache_lookups_total{result="hit"}'], '12')
+        self.assertNotIn(f'kumbh_load_shedding_in_flight{{pid="{os.getppid()}"}}', before)
+        self.assertEqual(len(list(self.directory.glob('*-*.json'))), 3)  # idle, recent, and this process
+
+
+@override_settings(CACHES=TEST_CACHES, RESPONSE_CACHE='dummy')
+class MetricsEndpointTests(MetricsTestCase, TestCase):
+    databases = HOT_DATABASES
+
+    def bearer(self, **fields):
+        user = get_user_model().objects.create_user(email='ramesh@example.com', password='secret', full_name='Ramesh', **fields)
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers=self.bearer()).status_code, 403)
+
+    def test_scrape(self):
+        self.client.get('/api/zones/')
+        response = self.client.get('/metrics', headers=self.bearer(is_staff=True))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        samples = self.samples(response.content.decode())
+        self.assertEqual(samples['kumbh_http_responses_total{view="zones_list",method="GET",status="200"}'], '1')
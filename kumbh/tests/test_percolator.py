@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from kumbh import jobs
+from kumbh.models import Job, LostFound, LostFoundSubscription, SubscriptionHit
+from kumbh.percolator import MAX_RADIUS_KM, percolate, report_terms, subscription_matches, subscription_terms
+
+
+def report(person_name='Ramesh Kumar', report_type='found', **fields):
+    fields = {
+        'user_email': 'reporter@example.com', 'description': 'Wearing a saffron shawl', 'location': 'Sector 4',
+        'latitude': '25.4358', 'longitude': '81.8463', **fields,
+    }
+    return LostFound(report_type=report_type, person_name=person_name, **fields)
+
+
+def subscription(query='', **fields):
+    fields = {'user_email': 'sita@example.com', 'report_type': 'found', **fields}
+    return LostFoundSubscription(query=query, **fields)
+
+
+class TermTests(SimpleTestCase):
+    def test_spellings_and_scripts_share_a_name_term(self):
+        terms = {tuple(subscription_terms(subscription(query))) for query in ('Ramesh', 'RAMESHH', 'Shri Ramesch', 'रमेश')}
+        self.assertEqual(len(terms), 1)
+        [(term,)] = terms
+        self.assertTrue(term.startswith('n:'))
+        self.assertIn(term, report_terms(report('Rameshh Kumar')))
+
+    def test_area_only_subscriptions_use_geohash_cells(self):
+        nearby = subscription(latitude='25.4358', longitude='81.8463', radius_km=1)
+        terms = subscription_terms(nearby)
+        self.assertTrue(terms and all(term.startswith('g:') for term in terms))
+        self.assertIn(report_terms(report())[-1], terms)
+        # The radius is capped, so no search covers the whole country
+        huge = subscription_terms(subscription(latitude='25.4358', longitude='81.8463', radius_km=5000))
+        capped = subscription_terms(subscription(latitude='25.4358', longitude='81.8463', radius_km=MAX_RADIUS_KM))
+        self.assertEqual(huge, capped)
+        self.assertEqual(subscription_terms(subscription()), [])
+
+    def test_matches(self):
+        cases = (
+            (subscription('Ramesh'), report('Rameshh Kumar'), True),
+            (subscription('Ramesh Kumar'), report('Ramesh Verma'), False),
+            (subscription('Ramesh', report_type='lost'), report('Ramesh'), False),
+            (subscription('Ramesh', latitude='25.4358', longitude='81.8463', radius_km=1), report('Ramesh'), True),
+            (subscription('Ramesh', latitude='25.3176', longitude='82.9739', radius_km=5), report('Ramesh'), False),
+            (subscription('Ramesh', latitude='25.3176', longitude='82.9739'), report('Ramesh', latitude=None, longitude=None), True),
+            (subscription(latitude='25.4358', longitude='81.8463'), report('Sita'), True),
+            (subscription(latitude='25.4358', longitude='81.8463'), report('Sita', latitude=None, longitude=None), False),
+        )
+        for saved, new, expected in cases:
+            with self.subTest(query=saved.query, area=saved.latitude, report=new.person_name):
+                self.assertEqual(subscription_matches(saved, new), expected)
+
+
+@mock.patch('kumbh.percolator.publish_to_user')
+class PercolateTests(TestCase):
+    def setUp(self):
+        self.saved = LostFoundSubscription.objects.create(user_email='sita@example.com', query='Ramesh', report_type='found')
+        LostFoundSubscription.objects.create(user_email='geeta@example.com', query='Sita', report_type='found')
+
+    def test_new_reports_are_percolated_by_a_job(self, publish):
+        with self.captureOnCommitCallbacks(execute=True):
+            found = report('Rameshh Kumar')
+            found.save()
+        publish.assert_not_called()
+        job = Job.objects.get(name='percolate_report')
+        self.assertEqual(job.payload, {'report_id': found.pk})
+
+        jobs.run_job(job)
+        self.assertEqual(list(SubscriptionHit.objects.values_list('subscription', 'report')), [(self.saved.pk, found.pk)])
+        publish.assert_called_once_with('sita@example.com', mock.ANY)
+        self.assertEqual(publish.call_args.args[1]['report_id'], found.pk)
+        self.saved.refresh_from_db()
+        self.assertIsNotNone(self.saved.last_matched_at)
+
+    def test_subscribers_are_notified_once(self, publish):
+        found = report('Ramesh')
+        found.save()
+        self.assertEqual(percolate(found), [self.saved])
+        # As a retried job would
+        self.assertEqual(percolate(found), [])
+        self.assertEqual(publish.call_count, 1)
+        self.assertEqual(SubscriptionHit.objects.count(), 1)
+
+    def test_own_reports_do_not_notify(self, publish):
+        found = report('Ramesh', user_email='sita@example.com')
+        found.save()
+        self.assertEqual(percolate(found), [])
+        publish.assert_not_called()
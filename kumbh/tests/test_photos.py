@@ -0,0 +1,164 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from PIL import Image, ImageDraw
+
+from kumbh.models import Photo
+from kumbh.photos import _thumbnails_done, hash_chunks, hash_fields, similar_photos
+from kumbh.tasks import backfill_photo_hashes
+from kumbh.thumbnails import render_thumbnails
+
+
+def jpeg_bytes(size=(1200, 800)):
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((size[0] // 4, size[1] // 4, size[0] // 2, size[1] // 2), fill=(200, 40, 40))
+    draw.rectangle((size[0] * 2 // 3, 0, size[0], size[1] // 3), fill=(20, 20, 160))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def photo(value=None, **fields):
+    """A Photo row with the given 64-bit perceptual hash"""
+    sha256 = hashlib.sha256(str(fields or value).encode()).hexdigest()
+    fields = {'sha256': sha256, 'file': f'photos/{sha256[:2]}/{sha256}.jpg', 'size': 1, **fields}
+    if value is not None:
+        fields.update(hash_fields(value))
+    return Photo.objects.create(**fields)
+
+
+class MediaRootTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+@mock.patch('kumbh.photos.schedule_thumbnails')
+class UploadTests(MediaRootTestCase):
+    def upload(self, content):
+        return self.client.post('/api/photos/', {'photo': io.BytesIO(content)})
+
+    def test_upload_is_stored_under_its_hash(self, schedule):
+        content = jpeg_bytes()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.assertEqual(response.json()['sha256'], sha256)
+        stored = Photo.objects.get()
+        self.assertEqual((stored.file.name, stored.width, stored.height), (f'photos/{sha256[:2]}/{sha256}.jpg', 1200, 800))
+        with stored.file.open('rb') as f:
+            self.assertEqual(f.read(), content)
+        schedule.assert_called_once_with(stored)
+
+        # The same bytes again are not stored twice
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Photo.objects.count(), 1)
+
+    @override_settings(PHOTO_MAX_UPLOAD_SIZE=1024)
+    def test_too_large(self, schedule):
+        self.assertEqual(self.upload(jpeg_bytes()).status_code, 413)
+        self.assertFalse(Photo.objects.exists())
+
+    def test_not_an_image(self, schedule):
+        self.assertEqual(self.upload(b'not an image').status_code, 400)
+        self.assertFalse(Photo.objects.exists())
+
+
+# The callback closes the thread's connection, which here is the test's
+@mock.patch('kumbh.photos.connection')
+class ThumbnailsDoneTests(TestCase):
+    def test_ready_with_hash(self, _):
+        pending = photo(status='pending')
+        future = Future()
+        future.set_result({'width': 1200, 'height': 800, 'thumbnails': {'160': 'thumbs/160/x.jpg'}, 'phash': 0x0123456789abcdef})
+        _thumbnails_done(pending.pk, future)
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.width, pending.thumbnails), ('ready', 1200, {'160': 'thumbs/160/x.jpg'}))
+        self.assertEqual(
+            (pending.phash, pending.phash_0, pending.phash_1, pending.phash_2, pending.phash_3),
+            ('0123456789abcdef', 0x0123, 0x4567, 0x89ab, 0xcdef),
+        )
+
+    def test_failed(self, _):
+        pending = photo(status='pending')
+        future = Future()
+        future.set_exception(OSError('truncated image'))
+        with self.assertLogs('kumbh.photos', 'ERROR'):
+            _thumbnails_done(pending.pk, future)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'failed')
+
+
+class SimilarPhotosTests(TestCase):
+    BASE = 0x0123456789abcdef
+
+    def flip(self, *bits_per_chunk):
+        """BASE with the given number of low bits flipped in each 16-bit chunk, most significant first"""
+        value = self.BASE
+        for i, bits in enumerate(bits_per_chunk):
+            value ^= ((1 << bits) - 1) << (16 * (3 - i))
+        return value
+
+    def test_hash_chunks(self):
+        self.assertEqual(hash_chunks(self.BASE), [0x0123, 0x4567, 0x89ab, 0xcdef])
+
+    def test_finds_every_photo_within_the_distance(self):
+        near = {
+            photo(self.BASE).pk: 0,
+            photo(self.flip(2, 2, 2, 2)).pk: 8,  # every chunk within the per-chunk radius
+            photo(self.flip(3, 3, 3, 1)).pk: 10,  # only the last chunk is
+            photo(self.flip(0, 0, 0, 10)).pk: 10,  # all the distance in one chunk
+        }
+        photo(self.flip(3, 3, 3, 2))  # 11 bits away
+        photo(self.flip(0, 0, 0, 16))
+        results = similar_photos(f'{self.BASE:016x}', max_distance=10)
+        self.assertEqual(results, sorted((distance, pk) for pk, distance in near.items()))
+        self.assertEqual([pk for _, pk in similar_photos(f'{self.BASE:016x}', 10, exclude=results[0][1])], [
+            pk for _, pk in results[1:]
+        ])
+
+
+class PhotoHashTests(MediaRootTestCase):
+    def test_backfill_hashes_like_rendering(self):
+        content = jpeg_bytes()
+        sha256 = hashlib.sha256(content).hexdigest()
+        source = f'{self.media_root}/original.jpg'
+        with open(source, 'wb') as f:
+            f.write(content)
+        result = render_thumbnails(source, self.media_root, sha256, (640, 160))
+        self.assertEqual(set(result['thumbnails']), {'640', '160'})
+
+        stored = photo(sha256=sha256, file='original.jpg', status='ready', thumbnails=result['thumbnails'])
+        self.assertEqual(backfill_photo_hashes(), 1)
+        stored.refresh_from_db()
+        self.assertEqual(stored.phash, hash_fields(result['phash'])['phash'])
+
+
+class MediaFileTests(MediaRootTestCase):
+    def test_cached_forever(self):
+        path = 'thumbs/160/ab/abc.jpg'
+        os.makedirs(f'{self.media_root}/thumbs/160/ab')
+        with open(f'{self.media_root}/{path}', 'wb') as f:
+            f.write(b'jpeg')
+        response = self.client.get(f'/media/{path}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg')
+
+    def test_only_photos_and_thumbnails(self):
+        with open(f'{self.media_root}/notes.txt', 'w') as f:
+            f.write('private')
+        self.assertEqual(self.client.get('/media/notes.txt').status_code, 404)
+        self.assertEqual(self.client.post('/media/thumbs/160/ab/abc.jpg').status_code, 405)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from kumbh.models import FamilyInvitation, FamilyMember
+from kumbh.presence import AWAY, OFFLINE, ONLINE, PresenceTracker, phone_matches
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+@override_settings(PRESENCE_CACHE='shared', CACHES=TEST_CACHES)
+class PresenceTrackerTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_heartbeats_are_seen_by_every_worker(self):
+        first, second = PresenceTracker(write_interval=15), PresenceTracker(write_interval=15)
+        first.touch('Ramesh@Example.com', now=1000)
+        self.assertEqual(second.get('ramesh@example.com', now=1010), (ONLINE, 1000))
+        # Within the write interval the shared copy is not refreshed
+        first.touch('ramesh@example.com', now=1005)
+        self.assertEqual(first.get('ramesh@example.com', now=1010), (ONLINE, 1005))
+        self.assertEqual(second.get('ramesh@example.com', now=1100), (AWAY, 1000))
+        self.assertEqual(second.get('sita@example.com'), (OFFLINE, None))
+
+    def test_phone_matches(self):
+        self.assertTrue(phone_matches('ramesh_1234', 'Ramesh@example.com'))
+        self.assertTrue(phone_matches('geeta_devi_at_exampl', 'geeta_devi@example.com'))
+        self.assertFalse(phone_matches('ramesh_kumar_1234', 'ramesh@example.com'))
+        self.assertFalse(phone_matches('9876543210', 'ramesh@example.com'))
+
+
+@override_settings(PRESENCE_CACHE='shared', CACHES=TEST_CACHES)
+class FamilyPresenceTests(TestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        caches['shared'].clear()
+        # Heartbeats from other tests' requests are kept by the module's tracker
+        self.tracker = PresenceTracker()
+        patcher = mock.patch('kumbh.views.presence_tracker', self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        expires_at = timezone.now() + timedelta(days=1)
+        for relative, phone in (('ramesh@example.com', 'ramesh_1234'), ('geeta_devi@example.com', 'geeta_devi_at_exampl')):
+            FamilyInvitation.objects.create(
+                inviter_email='sita@example.com', invitee_email=relative, token=relative,
+                status='accepted', expires_at=expires_at,
+            )
+            FamilyMember.objects.create(user_email='sita@example.com', name=relative, phone=phone, relationship='sibling')
+
+    def statuses(self):
+        response = self.client.get('/api/presence/family/', {'user_email': 'sita@example.com'})
+        self.assertEqual(response.status_code, 200)
+        return {member['name']: member['status'] for member in response.json()['results']}
+
+    def test_members_are_matched_by_full_email(self):
+        # Same email prefix, but not in Sita's family
+        self.tracker.touch('ramesh@elsewhere.org')
+        self.assertEqual(self.statuses(), {'ramesh@example.com': OFFLINE, 'geeta_devi@example.com': OFFLINE})
+        self.tracker.touch('ramesh@example.com')
+        self.tracker.touch('geeta_devi@example.com')
+        self.assertEqual(self.statuses(), {'ramesh@example.com': ONLINE, 'geeta_devi@example.com': ONLINE})
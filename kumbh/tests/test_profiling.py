@@ -0,0 +1,57 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kumbh.models import LostFound, RequestProfile
+from kumbh.profiling import Sampler
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+class SamplerTests(SimpleTestCase):
+    def test_switch_interval_restored_after_overlapping_profiles(self):
+        original = sys.getswitchinterval()
+        first, second = Sampler(interval=0.0005), Sampler(interval=0.0002)
+        first.__enter__()
+        self.assertEqual(sys.getswitchinterval(), 0.0005)
+        second.__enter__()
+        # The first to finish leaves it lowered for the other
+        first.__exit__(None, None, None)
+        self.assertLess(sys.getswitchinterval(), original)
+        second.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), original)
+
+
+@override_settings(CACHES=TEST_CACHES, RESPONSE_CACHE='dummy')
+class ProfilingMiddlewareTests(TestCase):
+    databases = HOT_DATABASES
+
+    def bearer(self, email, **fields):
+        user = get_user_model().objects.create_user(email=email, password='secret', full_name=email, **fields)
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_only_staff_can_profile(self):
+        pilgrim = self.bearer('ramesh@example.com')
+        for headers in ({}, pilgrim, {**pilgrim, 'X-Profile': '1'}):
+            response = self.client.get('/api/zones/', {'__profile': '1'}, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_profile(self):
+        LostFound.objects.create(
+            report_type='lost', user_email='reporter@example.com', person_name='Ramesh Kumar',
+            description='Wearing a saffron shawl', location='Sector 4',
+        )
+        staff = self.bearer('admin@example.com', is_staff=True)
+        response = self.client.get('/api/lost-found/', {'search': 'saffron'}, headers={**staff, 'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(profile.pk))
+        self.assertEqual((profile.requested_by, profile.view, profile.status_code), ('admin@example.com', 'lost_found_list', 200))
+        self.assertGreater(profile.query_count, 0)
+        # Statements only: the values bound to them can be personal data
+        self.assertTrue(all(set(query) == {'alias', 'sql', 'many', 'at_ms', 'ms'} for query in profile.queries))
+        self.assertNotIn('saffron', json.dumps(profile.queries))
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kumbh import realtime
+from kumbh.realtime import LocalBroker, Subscription, family_group, family_location_socket, user_group
+
+
+class BrokerTests(SimpleTestCase):
+    async def test_publish_fans_out_to_the_group(self):
+        loop = asyncio.get_running_loop()
+        broker = LocalBroker()
+        first, second, other = (Subscription(loop, 4) for _ in range(3))
+        for subscription in (first, second):
+            broker.subscribe(family_group('sita@example.com'), subscription)
+        broker.subscribe(family_group('ramesh@example.com'), other)
+
+        self.assertEqual(broker.publish(family_group('Sita@example.com'), {'n': 1}), 2)
+        await asyncio.sleep(0)
+        self.assertEqual([first.queue.get_nowait(), second.queue.get_nowait()], [{'n': 1}, {'n': 1}])
+        self.assertTrue(other.queue.empty())
+
+        broker.unsubscribe(family_group('sita@example.com'), first)
+        broker.unsubscribe(family_group('sita@example.com'), second)
+        self.assertEqual(broker.publish(family_group('sita@example.com'), {'n': 2}), 0)
+        self.assertEqual(broker.stats(), {'groups': 1, 'subscribers': 1})
+
+    async def test_a_slow_subscriber_drops_its_oldest_messages(self):
+        subscription = Subscription(asyncio.get_running_loop(), 2)
+        for n in range(5):
+            subscription.offer(n)
+        self.assertEqual([subscription.queue.get_nowait() for _ in range(2)], [3, 4])
+        self.assertEqual(subscription.dropped, 3)
+
+    def test_publish_from_another_thread(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        broker = LocalBroker()
+        subscription = Subscription(loop, 4)
+        broker.subscribe(user_group('sita@example.com'), subscription)
+        thread = threading.Thread(target=broker.publish, args=(user_group('sita@example.com'), 'hit'))
+        thread.start()
+        thread.join()
+        self.assertEqual(loop.run_until_complete(subscription.queue.get()), 'hit')
+
+
+class FamilySocketTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sita@example.com', password='secret', full_name='Sita')
+        self.touched = []
+        tracker = mock.Mock()
+        tracker.touch.side_effect = lambda email: self.touched.append((email, threading.get_ident()))
+        patcher = mock.patch.object(realtime, 'presence_tracker', tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def open_socket(self, query_string):
+        """(task running the socket, inbox of events for it, outbox of what it sent)"""
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': realtime.FAMILY_SOCKET_PATH, 'query_string': query_string.encode()}
+        inbox.put_nowait({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(family_location_socket(scope, inbox.get, outbox.put))
+        return task, inbox, outbox
+
+    async def test_missing_or_bad_token_is_refused(self):
+        for query_string in ('', 'token=', 'token=not-a-jwt', f'other={AccessToken.for_user(self.user)}'):
+            with self.subTest(query_string):
+                task, _, outbox = await self.open_socket(query_string)
+                await asyncio.wait_for(task, 1)
+                self.assertEqual(outbox.get_nowait(), {'type': 'websocket.close', 'code': 4401})
+                self.assertTrue(outbox.empty())
+        self.assertEqual(self.touched, [])
+
+    async def test_updates_are_pushed_to_the_client(self):
+        task, inbox, outbox = await self.open_socket(f'token={AccessToken.for_user(self.user)}')
+        self.assertEqual(await asyncio.wait_for(outbox.get(), 1), {'type': 'websocket.accept'})
+
+        inbox.put_nowait({'type': 'websocket.receive', 'text': 'ping'})
+        self.assertEqual(await asyncio.wait_for(outbox.get(), 1), {'type': 'websocket.send', 'text': '{"type": "pong"}'})
+        # Heartbeats are written off the event loop
+        self.assertEqual([email for email, _ in self.touched], ['sita@example.com', 'sita@example.com'])
+        self.assertNotIn(threading.get_ident(), {thread for _, thread in self.touched})
+
+        realtime.get_broker().publish(family_group('sita@example.com'), {'type': 'family_member.location'})
+        message = await asyncio.wait_for(outbox.get(), 1)
+        self.assertEqual(message['text'], '{"type": "family_member.location"}')
+
+        inbox.put_nowait({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(realtime.get_broker().publish(family_group('sita@example.com'), {}), 0)
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import fields
+from rest_framework.renderers import JSONRenderer
+
+from kumbh.models import SosRequest, Zone
+from kumbh.renderers import ORJSONRenderer
+from kumbh.row_serializers import _choice, _datetime, _decimal, serialize_rows
+from kumbh.serializers import SosRequestSerializer, ZoneSerializer
+from kumbh.tests import HOT_DATABASES
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_the_stock_renderer(self):
+        data = {
+            'text': 'Sangam ghat   é "quoted"',
+            'decimal': Decimal('25.435800'),
+            'when': datetime(2026, 1, 14, 5, 30, tzinfo=dt_timezone.utc),
+            'floats': [0.1, 1e16, 1.5e300, 1e-5, 2.5e-7, -0.0],
+            'nested': [{'id': 1, 'ok': True, 'none': None}],
+            7: 'integer key',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_nan_and_infinity_are_written_as_null(self):
+        # The stock renderer refuses them in strict mode
+        data = {'score': float('nan'), 'distance_km': float('inf')}
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        self.assertEqual(ORJSONRenderer().render(data), b'{"score":null,"distance_km":null}')
+
+
+class RowConverterTests(SimpleTestCase):
+    """The fast-path converters give what the DRF field would, or raise as it does"""
+
+    def assertSameAs(self, field, convert, value):
+        try:
+            expected = field.to_representation(value)
+        except InvalidOperation:
+            with self.assertRaises(InvalidOperation):
+                convert(value)
+        else:
+            self.assertEqual(convert(value), expected)
+
+    def test_decimals(self):
+        field = fields.DecimalField(max_digits=9, decimal_places=6)
+        convert = _decimal(field, utc=True)
+        for value in (
+            '25.435800', '25.4358', '25.43580049', '25.4358005', '1E+2', '1E-7',  # not quantized by the database
+            '-81.846300', '-81.8463', '0', '0.000000', '-0', '-0.000000',
+            '1234.567890', '999.9999995',  # more digits than the column allows
+        ):
+            with self.subTest(value):
+                self.assertSameAs(field, convert, Decimal(value))
+
+    def test_datetimes(self):
+        field = fields.DateTimeField()
+        values = (
+            datetime(2026, 1, 14, 5, 30, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 14, 5, 30, 0, 123456, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 14, 5, 30, 0, 5, tzinfo=ZoneInfo('UTC')),
+            datetime(2026, 1, 14, 5, 30, tzinfo=ZoneInfo('Asia/Kolkata')),
+            datetime(2026, 1, 14, 5, 30),  # naive
+            datetime(2026, 1, 14, 5, 30, 0, 5),
+        )
+        for zone in ('UTC', 'Asia/Kolkata', 'America/St_Johns'):
+            with timezone.override(zone):
+                convert = _datetime(field, utc=zone == 'UTC')
+                for value in values:
+                    with self.subTest(zone=zone, value=value):
+                        self.assertSameAs(field, convert, value)
+
+    def test_choices(self):
+        field = fields.ChoiceField(choices=[('open', 'Open'), (1, 'One')])
+        convert = _choice(field, utc=True)
+        for value in ('open', 'closed', 1, 2, '1', ''):
+            with self.subTest(value=value):
+                self.assertSameAs(field, convert, value)
+
+
+class SerializeRowsTests(TestCase):
+    databases = HOT_DATABASES
+
+    def test_same_data_as_the_serializer(self):
+        Zone.objects.create(name='Sector 4', zone_type='circle', capacity=10, latitude='25.4358', longitude='81.8463')
+        Zone.objects.create(name='Sector 9', zone_type='circle', capacity=10)
+        SosRequest.objects.create(user_email='a@example.com', user_name='A', sos_type='medical', latitude='25.4', longitude='81.8')
+        for queryset, serializer_class in (
+            (Zone.objects.order_by('pk'), ZoneSerializer),
+            (SosRequest.objects.order_by('pk'), SosRequestSerializer),
+        ):
+            with self.subTest(serializer_class.__name__):
+                expected = serializer_class(queryset, many=True).data
+                rows = serialize_rows(queryset, serializer_class)
+                self.assertEqual(rows, expected)
+                self.assertEqual([list(row) for row in rows], [list(item) for item in expected])
@@ -0,0 +1,34 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from kumbh import response_cache
+from kumbh.models import LostFound, Photo
+from kumbh.tests import TEST_CACHES
+
+
+@override_settings(RESPONSE_CACHE='default', CACHES=TEST_CACHES)
+class LostFoundListCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        photo = Photo.objects.create(
+            sha256='a' * 64, file='photos/a.jpg', size=1, status='ready', thumbnails={'160': 'photos/thumbs/a_160.jpg'},
+        )
+        LostFound.objects.create(
+            report_type='lost', user_email='reporter@example.com', person_name='Ramesh Kumar',
+            description='Saffron shawl', location='Sector 4', photo=photo,
+        )
+
+    def thumbnail_urls(self, host):
+        response = self.client.get('/api/lost-found/', headers={'Host': host})
+        self.assertEqual(response.status_code, 200)
+        return [item['thumbnail_url'] for item in response.json()['results']]
+
+    def test_hosts_share_one_entry(self):
+        refreshes = response_cache.stats['refresh']
+        self.assertEqual(self.thumbnail_urls('kumbh.example.org'), ['/media/photos/thumbs/a_160.jpg'])
+        self.assertEqual(self.thumbnail_urls('attacker.example'), ['/media/photos/thumbs/a_160.jpg'])
+        self.assertEqual(response_cache.stats['refresh'], refreshes + 1)
+
+    @override_settings(PUBLIC_BASE_URL='https://kumbh.example.org/')
+    def test_urls_use_the_configured_base(self):
+        self.assertEqual(self.thumbnail_urls('attacker.example'), ['https://kumbh.example.org/media/photos/thumbs/a_160.jpg'])
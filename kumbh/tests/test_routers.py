@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+
+from kumbh.models import FamilyMember, NameKey, SosRequest, Zone
+from kumbh.name_index import matching_ids
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+def family_member(name, phone, **fields):
+    return FamilyMember(user_email='pilgrim@example.com', name=name, phone=phone, relationship='sibling', **fields)
+
+
+class HotTableRouterTests(TestCase):
+    databases = HOT_DATABASES
+
+    def test_hot_tables_are_read_and_written_in_their_own_database(self):
+        sos = SosRequest.objects.create(user_email='a@example.com', user_name='A', sos_type='medical', latitude='25.4', longitude='81.8')
+        member = FamilyMember.objects.create(user_email='a@example.com', name='Ramesh', phone='1', relationship='sibling')
+        zone = Zone.objects.create(name='Sector 4', zone_type='circle', capacity=10, latitude='25.4', longitude='81.8')
+
+        self.assertEqual((sos._state.db, member._state.db, zone._state.db), ('sos', 'locations', DEFAULT_DB_ALIAS))
+        self.assertEqual(SosRequest.objects.db, 'sos')
+        self.assertEqual(FamilyMember.objects.db, 'locations')
+        self.assertTrue(SosRequest.objects.using('sos').filter(pk=sos.pk).exists())
+
+    def test_each_database_is_migrated_with_its_own_tables(self):
+        self.assertIn('sos_requests', connections['sos'].introspection.table_names())
+        self.assertNotIn('zones', connections['sos'].introspection.table_names())
+        self.assertIn('family_members', connections['locations'].introspection.table_names())
+        self.assertNotIn('family_members', connections[DEFAULT_DB_ALIAS].introspection.table_names())
+        self.assertFalse(router.allow_migrate('locations', 'kumbh', model_name='namekey'))
+
+    def test_name_search_across_databases(self):
+        # The index lives in 'default' and the family members in 'locations'
+        member = FamilyMember.objects.create(user_email='a@example.com', name='Ramesh Kumar', phone='1', relationship='sibling')
+        FamilyMember.objects.create(user_email='a@example.com', name='Sita Devi', phone='2', relationship='sibling')
+        self.assertEqual(NameKey.objects.db, DEFAULT_DB_ALIAS)
+        found = FamilyMember.objects.filter(pk__in=matching_ids(FamilyMember, 'Rameshh Kumar'))
+        self.assertEqual(list(found), [member])
+
+
+class MoveHotTablesTests(TransactionTestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        # An install from before the split, with family members in 'default'
+        with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
+            editor.create_model(FamilyMember)
+        self.addCleanup(self._drop_default_table)
+
+    def _drop_default_table(self):
+        with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
+            editor.delete_model(FamilyMember)
+
+    def test_copies_rows_and_rebuilds_the_name_index(self):
+        FamilyMember.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+            family_member('Ramesh Kumar', '1'),
+            family_member('Sita Devi', '2'),
+        ])
+        self.assertFalse(NameKey.objects.filter(source='family_member').exists())
+
+        call_command('move_hot_tables', '--delete', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(FamilyMember.objects.values_list('name', flat=True)), ['Ramesh Kumar', 'Sita Devi'],
+        )
+        self.assertFalse(FamilyMember.objects.using(DEFAULT_DB_ALIAS).exists())
+        found = FamilyMember.objects.filter(pk__in=matching_ids(FamilyMember, 'Ramesh'))
+        self.assertEqual([member.name for member in found], ['Ramesh Kumar'])
+
+    def test_rerun_skips_rows_already_copied(self):
+        FamilyMember.objects.using(DEFAULT_DB_ALIAS).bulk_create([family_member('Ramesh Kumar', '1')])
+        call_command('move_hot_tables', stdout=StringIO())
+        call_command('move_hot_tables', stdout=StringIO())
+        self.assertEqual(FamilyMember.objects.count(), 1)
+        self.assertEqual(FamilyMember.objects.using(DEFAULT_DB_ALIAS).count(), 1)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['sos'],
+    DATABASE_REPLICA_PIN_CACHE='pins',
+    RESPONSE_CACHE='dummy',
+    LOAD_SHEDDING_ENABLED=False,
+)
+class ReplicaRouterTests(TransactionTestCase):
+    """'sos' stands in for a replica of 'default': two SQLite files that differ"""
+
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        caches_override = override_settings(CACHES={
+            **TEST_CACHES,
+            # File based, like the 'shared' cache of the settings, so every Client below sees the pins
+            'pins': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        })
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+
+        with connections['sos'].schema_editor() as editor:
+            editor.create_model(Zone)
+        self.addCleanup(self._drop_replica_table)
+        Zone.objects.create(name='Primary', zone_type='circle', capacity=10, latitude='25.4', longitude='81.8')
+        Zone.objects.using('sos').create(name='Replica', zone_type='circle', capacity=10, latitude='25.4', longitude='81.8')
+
+    def _drop_replica_table(self):
+        with connections['sos'].schema_editor() as editor:
+            editor.delete_model(Zone)
+
+    def client_with_session(self, session_key):
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        return client
+
+    def zone_names(self, client):
+        response = client.get('/api/zones/')
+        self.assertEqual(response.status_code, 200)
+        return [zone['name'] for zone in response.json()['results']]
+
+    def test_list_reads_go_to_the_replica(self):
+        self.assertEqual(self.zone_names(Client()), ['Replica'])
+        # Other views and writes keep to the primary
+        self.assertEqual(Zone.objects.get().name, 'Primary')
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        response = self.client_with_session('pilgrim').post('/api/zones/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        # A fresh Client each time, as the next request may reach another worker
+        self.assertEqual(self.zone_names(self.client_with_session('pilgrim')), ['Primary'])
+        self.assertEqual(self.zone_names(self.client_with_session('someone-else')), ['Replica'])
+        with self.settings(DATABASE_REPLICA_PIN_SECONDS=0):
+            self.client_with_session('pilgrim').post('/api/zones/', {}, content_type='application/json')
+        self.assertEqual(self.zone_names(self.client_with_session('pilgrim')), ['Replica'])
+
+    def test_refuses_a_per_process_pin_cache(self):
+        with self.settings(DATABASE_REPLICA_PIN_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                Client().get('/api/zones/')
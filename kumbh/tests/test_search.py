@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+
+from kumbh import name_index, search
+from kumbh.models import FamilyMember, LostFound
+from kumbh.name_index import matching_ids
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+def report(person_name, description='Wearing a saffron shawl'):
+    return LostFound.objects.create(
+        report_type='lost', user_email='reporter@example.com', person_name=person_name,
+        description=description, location='Sector 4',
+    )
+
+
+@override_settings(RESPONSE_CACHE='dummy', CACHES=TEST_CACHES)
+class NameSearchTests(TestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        self.ramesh = report('Ramesh Kumar')
+        self.verma = report('Ramesh Verma')
+        report('Sita Devi', description='Saffron bag near the ghat')
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['person_name'] for item in response.json()['results'])
+
+    def test_matching_ids_is_a_subquery_in_the_index_database(self):
+        ids = matching_ids(LostFound, 'Rameshh Kumar')
+        self.assertIsInstance(ids, QuerySet)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(LostFound.objects.filter(id__in=ids)), [self.ramesh])
+        self.assertEqual(matching_ids(LostFound, '!!'), [])
+
+    def test_matching_ids_is_a_capped_list_in_another_database(self):
+        members = [
+            FamilyMember.objects.create(user_email='a@example.com', name=name, phone=str(i), relationship='sibling')
+            for i, name in enumerate(('Rameshh Kumar', 'Ramesh Kumar', 'Sita Devi'))
+        ]
+        self.assertEqual(matching_ids(FamilyMember, 'Ramesh Kumar'), [members[1].pk, members[0].pk])
+        with mock.patch.object(name_index, 'CROSS_DATABASE_LIMIT', 1):
+            self.assertEqual(matching_ids(FamilyMember, 'Ramesh Kumar'), [members[1].pk])
+
+    def test_name_filter(self):
+        self.assertEqual(self.names(self.client.get('/api/lost-found/', {'name': 'Rameshh Kumar'})), ['Ramesh Kumar'])
+
+    def test_full_text_search_restricted_to_name_matches(self):
+        response = self.client.get('/api/lost-found/', {'search': 'saffron', 'name': 'Ramesh'})
+        self.assertEqual(self.names(response), ['Ramesh Kumar', 'Ramesh Verma'])
+        response = self.client.get('/api/lost-found/', {'search': 'saffron', 'name': 'Nobody'})
+        self.assertEqual(self.names(response), [])
+
+    def test_fallback_search_restricted_to_name_matches(self):
+        with mock.patch.object(search, '_use_fts', return_value=False), \
+                mock.patch.object(search, 'fallback_index', search.InvertedIndex()):
+            response = self.client.get('/api/lost-found/', {'search': 'saffron', 'name': 'Ramesh Kumar'})
+        self.assertEqual(self.names(response), ['Ramesh Kumar'])
+
+    def test_admin_search_finds_name_variants(self):
+        admin = get_user_model().objects.create_superuser('admin@example.com', 'secret', full_name='Admin')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/kumbh/lostfound/', {'q': 'Rameshh Kumar'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.ramesh])
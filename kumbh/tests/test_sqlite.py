@@ -0,0 +1,71 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from core.sqlite.base import DatabaseWrapper
+
+
+class SingleWriterTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = str(Path(directory.name) / 'writers.sqlite3')
+        wrapper = self.connect(single_writer=False)
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (1, 0)')
+
+    def connect(self, single_writer):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': self.name,
+            # Deferred transactions and no busy wait, so a racing upgrade to a write fails at once
+            'OPTIONS': {'single_writer': single_writer, 'pragmas': {'busy_timeout': 0}},
+        }
+        return DatabaseWrapper(settings_dict, alias='writers')
+
+    def increment(self, single_writer, errors):
+        # Each thread gets its own connection, as Django's would
+        wrapper = self.connect(single_writer)
+        try:
+            wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT value FROM counter WHERE id = 1')
+                [value] = cursor.fetchone()
+                time.sleep(0.05)
+                cursor.execute('UPDATE counter SET value = %s WHERE id = 1', [value + 1])
+            wrapper.commit()
+        except OperationalError as exc:
+            errors.append(exc)
+            wrapper.rollback()
+        finally:
+            wrapper.set_autocommit(True)
+            wrapper.close()
+
+    def race(self, single_writer, writers=4):
+        errors = []
+        threads = [threading.Thread(target=self.increment, args=(single_writer, errors)) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wrapper = self.connect(single_writer=False)
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT value FROM counter WHERE id = 1')
+            return cursor.fetchone()[0], errors
+
+    def test_concurrent_writers_queue_on_the_file_lock(self):
+        self.assertEqual(self.race(single_writer=True), (4, []))
+
+    def test_without_the_lock_upgrades_fail(self):
+        value, errors = self.race(single_writer=False)
+        self.assertLess(value, 4)
+        self.assertEqual(value + len(errors), 4)
+        self.assertTrue(all('database is locked' in str(exc) for exc in errors))
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kumbh.tests import HOT_DATABASES, TEST_CACHES
+
+
+@override_settings(RESPONSE_CACHE='dummy', THROTTLE_CACHE='shared', CACHES=TEST_CACHES)
+class TokenBucketThrottleTests(TestCase):
+    databases = HOT_DATABASES
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def bearer(self, email):
+        user = get_user_model().objects.create_user(email=email, password='secret', full_name=email)
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    @override_settings(THROTTLE_BUCKETS={'zones_list': {'ip': '3/min', 'user': '1/min'}})
+    def test_refused_request_takes_no_tokens(self):
+        ramesh, sita = self.bearer('ramesh@example.com'), self.bearer('sita@example.com')
+        self.assertEqual(self.client.get('/api/zones/', headers=ramesh).status_code, 200)
+        response = self.client.get('/api/zones/', headers=ramesh)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Ramesh's refused request left the address's bucket alone, so two remain
+        self.assertEqual(self.client.get('/api/zones/', headers=sita).status_code, 200)
+        self.assertEqual(self.client.get('/api/zones/').status_code, 200)
+        self.assertEqual(self.client.get('/api/zones/').status_code, 429)
+
+    @override_settings(THROTTLE_BUCKETS={'sos_requests_list': {'ip': '1/min'}})
+    def test_only_raising_an_sos_is_exempt(self):
+        for _ in range(3):
+            response = self.client.post('/api/sos-requests/', {}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/sos-requests/').status_code, 200)
+        self.assertEqual(self.client.get('/api/sos-requests/').status_code, 429)
+
+    @override_settings(THROTTLE_BUCKETS={'zones_list': {'ip': '1/min'}})
+    def test_forwarded_for_header_does_not_pick_the_bucket(self):
+        self.assertEqual(self.client.get('/api/zones/', headers={'X-Forwarded-For': '203.0.113.7'}).status_code, 200)
+        self.assertEqual(self.client.get('/api/zones/', headers={'X-Forwarded-For': '203.0.113.8'}).status_code, 429)
+
+    @override_settings(THROTTLE_BUCKETS={'zones_list': {'ip': '1/min'}})
+    def test_forwarded_for_header_from_a_trusted_proxy(self):
+        with mock.patch('rest_framework.throttling.api_settings.NUM_PROXIES', 1):
+            for address in ('203.0.113.7', '203.0.113.8'):
+                response = self.client.get('/api/zones/', headers={'X-Forwarded-For': address})
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,72 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import AsyncClient, TestCase, override_settings
+
+from kumbh.models import Zone
+from kumbh.tests import TEST_CACHES
+
+TRACEPARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-{flags}'
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.trace_file = directory / 'traces.jsonl'
+        settings_override = override_settings(
+            TRACING_FILE=self.trace_file,
+            TRACING_SAMPLE_RATE=0.0,
+            TRACING_SAMPLE_RATES={},
+            METRICS_DIR=directory / 'metrics',
+            RESPONSE_CACHE='dummy',
+            CACHES=TEST_CACHES,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Zone.objects.create(name='Sector 4', zone_type='circle', capacity=10, latitude='25.4', longitude='81.8')
+
+    def spans(self):
+        lines = self.trace_file.read_text().splitlines()
+        self.assertEqual(len(lines), 1)
+        return json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+
+    def test_unsampled_request_writes_nothing(self):
+        response = self.client.get('/api/zones/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertFalse(self.trace_file.exists())
+
+    def test_sampled_request_has_view_and_query_spans(self):
+        with self.settings(TRACING_SAMPLE_RATES={'zones_list': 1.0}):
+            response = self.client.get('/api/zones/')
+        self.assertEqual(response.status_code, 200)
+        spans = {span['name']: span for span in self.spans()}
+        root = spans['GET /api/zones/']
+        self.assertEqual(root['traceId'], response['X-Trace-Id'])
+        self.assertEqual(spans['view zones_list']['parentSpanId'], root['spanId'])
+        self.assertEqual(spans['SELECT default']['parentSpanId'], spans['view zones_list']['spanId'])
+
+    def test_traceparent_continues_the_callers_trace(self):
+        response = self.client.get('/api/zones/', headers={'traceparent': TRACEPARENT.format(flags='01')})
+        root = next(span for span in self.spans() if span['kind'] == 2)
+        self.assertEqual(response['X-Trace-Id'], '0af7651916cd43dd8448eb211c80319c')
+        self.assertEqual(root['parentSpanId'], 'b7ad6b7169203331')
+
+    def test_unsampled_traceparent_is_respected(self):
+        with self.settings(TRACING_SAMPLE_RATES={'zones_list': 1.0}):
+            response = self.client.get('/api/zones/', headers={'traceparent': TRACEPARENT.format(flags='00')})
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertFalse(self.trace_file.exists())
+
+    async def test_sampled_request_under_asgi(self):
+        # process_view() runs in another context than __call__ under ASGI
+        response = await AsyncClient().get('/api/zones/', headers={'traceparent': TRACEPARENT.format(flags='01')})
+        self.assertEqual(response.status_code, 200)
+        names = {span['name'] for span in self.spans()}
+        self.assertTrue({'GET /api/zones/', 'view zones_list', 'SELECT default'} <= names)
+        # Nothing of the trace is left current afterwards
+        response = await AsyncClient().get('/api/zones/')
+        self.assertNotIn('X-Trace-Id', response)
@@ -0,0 +1,107 @@
+"""
+Token-bucket throttling for API views.
+
+Limits are configured per view in THROTTLE_BUCKETS, keyed by the view's name
+(the function name for @api_view views, the class name otherwise), optionally
+suffixed with the HTTP method ('lost_found_list:POST' wins over
+'lost_found_list'). Each entry maps a scope to a rate:
+
+    'create_family_invitation': {'ip': '30/min', 'user': '10/min'}
+
+'ip' buckets are keyed by client address and 'user' buckets by the
+authenticated user; a request must find a token in every bucket that applies,
+and takes none unless it does. The address is REMOTE_ADDR unless
+REST_FRAMEWORK['NUM_PROXIES'] says which X-Forwarded-For entry to trust. A rate of '30/min' allows bursts of 30 that
+refill at 30 per minute. Views without an entry are not throttled, and
+EXEMPT_VIEWS are never throttled whatever the settings say.
+
+Buckets live in THROTTLE_CACHE, which must be shared by every worker: with a
+per-process cache each worker keeps its own buckets and the real limit is the
+rate times the number of workers. Updates are exact within a process; two
+workers racing on one bucket can let a request or two more through.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# Raising an SOS must get through even from a flooded IP or a misbehaving
+# client; listing them is throttled like any other read
+EXEMPT_VIEWS = frozenset({'sos_requests_list:POST'})
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'30/min' -> (capacity 30, refill 0.5 tokens per second)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Per-view, per-IP and per-user token buckets kept in the THROTTLE_CACHE cache"""
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    @staticmethod
+    def view_name(view):
+        return type(view).__name__
+
+    def buckets_for(self, request, view):
+        name = self.view_name(view)
+        if f'{name}:{request.method}' in EXEMPT_VIEWS:
+            return {}
+        config = getattr(settings, 'THROTTLE_BUCKETS', {})
+        return config.get(f'{name}:{request.method}', config.get(name, {}))
+
+    def identity(self, request, scope):
+        if scope == 'ip':
+            return self.get_ident(request)
+        if scope == 'user':
+            user = getattr(request, 'user', None)
+            return str(user.pk) if user is not None and user.is_authenticated else None
+        raise ValueError(f'Unknown throttle scope: {scope}')
+
+    def allow_request(self, request, view):
+        buckets = self.buckets_for(request, view)
+        if not buckets:
+            return True
+
+        cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+        name = self.view_name(view)
+        rates = {}
+        for scope, rate in buckets.items():
+            ident = self.identity(request, scope)
+            if ident is not None:
+                rates[f'throttle:{name}:{scope}:{ident}'] = parse_rate(rate)
+        if not rates:
+            return True
+
+        # The lock makes the read-modify-write exact within this process
+        with _lock:
+            now = time.time()
+            stored = cache.get_many(list(rates))
+            tokens = {}
+            waits = []
+            for key, (capacity, refill) in rates.items():
+                available, updated = stored.get(key) or (capacity, now)
+                tokens[key] = min(capacity, available + (now - updated) * refill)
+                if tokens[key] < 1:
+                    waits.append((1 - tokens[key]) / refill)
+            if waits:
+                # Refused requests take no tokens, from this bucket or any other
+                self.wait_seconds = max(waits)
+                return False
+            for key, (capacity, refill) in rates.items():
+                # Once full again the bucket is the same as a missing key
+                cache.set(key, (tokens[key] - 1, now), timeout=int(capacity / refill) + 1)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,98 @@
+"""
+Thumbnail rendering, run in worker processes.
+
+This module must not import Django: the process pool starts its workers with
+the 'spawn' method, and they only import what the submitted function needs.
+"""
+import math
+import os
+
+from PIL import Image, ImageOps
+
+ORIENTATION_TAG = 0x0112
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+THUMBNAIL_QUALITY = 80
+
+# Perceptual hash: DCT of a 32x32 greyscale image, keeping the 8x8 lowest frequencies
+HASH_IMAGE_SIZE = 32
+HASH_SIZE = 8
+DCT_TABLE = [
+    [math.cos(math.pi * (2 * x + 1) * u / (2 * HASH_IMAGE_SIZE)) for x in range(HASH_IMAGE_SIZE)]
+    for u in range(HASH_SIZE)
+]
+
+
+def thumbnail_path(sha256, size):
+    """Storage path of one thumbnail, relative to MEDIA_ROOT"""
+    return f'thumbs/{size}/{sha256[:2]}/{sha256}.jpg'
+
+
+def perceptual_hash(image):
+    """
+    64-bit pHash of a PIL image.
+
+    Each bit says whether one of the 8x8 lowest DCT coefficients is above their
+    median, so the hash survives rescaling, recompression and small edits;
+    similar images differ in only a few bits. Only the 8 needed frequencies are
+    computed per axis, which keeps the pure-Python DCT to about 10k products.
+    """
+    pixels = list(image.convert('L').resize((HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), Image.Resampling.LANCZOS).getdata())
+    rows = [pixels[y * HASH_IMAGE_SIZE:(y + 1) * HASH_IMAGE_SIZE] for y in range(HASH_IMAGE_SIZE)]
+    # DCT along each row, then down each of the kept columns
+    row_dct = [[sum(c * p for c, p in zip(basis, row)) for basis in DCT_TABLE] for row in rows]
+    coefficients = [
+        sum(DCT_TABLE[v][y] * row_dct[y][u] for y in range(HASH_IMAGE_SIZE))
+        for v in range(HASH_SIZE)
+        for u in range(HASH_SIZE)
+    ]
+    median = sorted(coefficients)[len(coefficients) // 2 - 1:len(coefficients) // 2 + 1]
+    median = sum(median) / 2
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+def hash_file(path):
+    """pHash of an image file: the smallest thumbnail, both when rendering and when backfilling"""
+    with Image.open(path) as image:
+        return perceptual_hash(image)
+
+
+def render_thumbnails(source, media_root, sha256, sizes):
+    """
+    Write a JPEG thumbnail per size (longest edge) and return the image details
+    along with its perceptual hash.
+
+    Sizes are rendered largest first, each one shrunk from the previous, and
+    JPEG sources are decoded at reduced scale via draft(), so a large photo is
+    only fully decoded when it is smaller than the largest thumbnail anyway.
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(ORIENTATION_TAG) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        image.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        thumbnails = {}
+        for size in sizes:
+            image.thumbnail((size, size), reducing_gap=3.0)
+            relative = thumbnail_path(sha256, size)
+            destination = os.path.join(media_root, relative)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            # Write then rename so a half-written thumbnail is never served
+            partial = f'{destination}.{os.getpid()}.tmp'
+            image.save(partial, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            os.replace(partial, destination)
+            thumbnails[str(size)] = relative
+
+    # Hash the smallest thumbnail as written: cheap, the same input scale for
+    # every photo, and the same bytes backfill_photo_hashes reads back
+    phash = hash_file(destination)
+
+    return {'width': width, 'height': height, 'thumbnails': thumbnails, 'phash': phash}
@@ -0,0 +1,242 @@
+"""
+Request tracing with spans for the request, the DRF view, serializer
+validation and saves, and every SQL query.
+
+Sampling is decided once the view is known: a request is traced when its
+W3C `traceparent` header says the caller sampled it, or otherwise with
+probability TRACING_SAMPLE_RATES.get(view name, TRACING_SAMPLE_RATE). Only
+sampled requests get the SQL hook; on the others each instrumented call
+costs one context variable lookup.
+
+Finished traces are appended to TRACING_FILE, one OTLP/JSON
+ExportTraceServiceRequest per line, which the OpenTelemetry Collector's
+otlpjsonfile receiver and most trace viewers read as they are.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_SERVICE_NAME = 'kumbh'
+
+# OTLP span kinds and status codes
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current = ContextVar('kumbh_tracing_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start_ns', 'end_ns', 'status')
+
+    def __init__(self, trace, name, kind=INTERNAL, parent_id=None, attributes=None, start_ns=None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = None
+
+    def set_error(self, exc):
+        self.status = (STATUS_ERROR, f'{type(exc).__name__}: {exc}')
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace.spans.append(self)
+
+
+class Trace:
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans = []
+
+
+@contextmanager
+def span(name, kind=INTERNAL, **attributes):
+    """Child span of the current one; does nothing, and yields None, outside a sampled trace"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, kind, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.set_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(name_for):
+    """Decorate a method so sampled calls get a span named name_for(self)"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if _current.get() is None:
+                return method(self, *args, **kwargs)
+            with span(name_for(self)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class QueryTracer:
+    """connection.execute_wrapper() hook opening a span per query"""
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        operation = sql.split(None, 1)[0].upper() if sql else 'SQL'
+        with span(f'{operation} {connection.alias}', CLIENT, **{
+            'db.system': connection.vendor,
+            'db.namespace': connection.alias,
+            'db.operation.name': operation,
+            'db.query.text': sql,
+        }) as query_span:
+            result = execute(sql, params, many, context)
+            if query_span is not None and context['cursor'].rowcount >= 0:
+                query_span.attributes['db.response.returned_rows'] = context['cursor'].rowcount
+            return result
+
+
+def sampled(view):
+    rates = getattr(settings, 'TRACING_SAMPLE_RATES', {})
+    return random.random() < rates.get(view, getattr(settings, 'TRACING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE))
+
+
+@contextmanager
+def request_scope():
+    """
+    Bound a request's trace: a root span started inside is not current after it.
+
+    The root span is started from process_view(), which Django may run in
+    another context under ASGI, so its value is set there without a token
+    and cleared here, where the token was made.
+    """
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def start(trace_id=None, parent_id=None, **kwargs):
+    """Open the root span of a new trace and make it current; call inside request_scope()"""
+    root = Span(Trace(trace_id), parent_id=parent_id, **kwargs)
+    _current.set(root)
+    return root
+
+
+def finish(root):
+    """End the root span and export the trace"""
+    root.end()
+    exporter.export(root.trace)
+
+
+def parse_traceparent(header):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None"""
+    match = TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # int64 is a string in OTLP/JSON
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes):
+    return [{'key': key, 'value': _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp(trace):
+    """OTLP/JSON ExportTraceServiceRequest for a finished trace"""
+    spans = []
+    for finished in trace.spans:
+        item = {
+            'traceId': trace.trace_id,
+            'spanId': finished.span_id,
+            'name': finished.name,
+            'kind': finished.kind,
+            'startTimeUnixNano': str(finished.start_ns),
+            'endTimeUnixNano': str(finished.end_ns),
+            'attributes': _attributes(finished.attributes),
+        }
+        if finished.parent_id:
+            item['parentSpanId'] = finished.parent_id
+        if finished.status is not None:
+            item['status'] = {'code': finished.status[0], 'message': finished.status[1]}
+        spans.append(item)
+    return {'resourceSpans': [{
+        'resource': {'attributes': _attributes({
+            'service.name': getattr(settings, 'TRACING_SERVICE_NAME', DEFAULT_SERVICE_NAME),
+            'process.pid': os.getpid(),
+        })},
+        'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+    }]}
+
+
+class FileExporter:
+    """Appends each trace to a file as one line of OTLP/JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        line = json.dumps(otlp(trace), separators=(',', ':')) + '\n'
+        path = Path(getattr(settings, 'TRACING_FILE', Path(settings.BASE_DIR) / 'traces' / 'traces.jsonl'))
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # One write in append mode, so lines from several workers do not interleave
+            with open(path, 'a', encoding='utf-8') as output:
+                output.write(line)
+
+
+exporter = FileExporter()
+
+_instrumented = False
+
+
+def instrument():
+    """Open spans around DRF view dispatch and serializer is_valid() and save()"""
+    global _instrumented
+    if _instrumented:
+        return
+    from rest_framework.serializers import BaseSerializer, ListSerializer
+    from rest_framework.views import APIView
+
+    APIView.dispatch = traced(lambda view: f'view {type(view).__name__}')(APIView.dispatch)
+    # ListSerializer has its own is_valid() and save()
+    for serializer_class in (BaseSerializer, ListSerializer):
+        for method in ('is_valid', 'save'):
+            setattr(serializer_class, method, traced(
+                lambda serializer, method=method: f'{type(serializer).__name__}.{method}'
+            )(serializer_class.__dict__[method]))
+    _instrumented = True
@@ -8,6 +8,7 @@ from .views import (
     admin_crowding_zones_view,
     admin_logout_view,
     invitation_accept_view,
+    media_file,
 )
 
 app_name = 'kumbh'
@@ -23,4 +24,5 @@ urlpatterns = [
     path("dashboard/crowding-zones/", admin_crowding_zones_view, name="admin_crowding_zones"),
     path("logout/", admin_logout_view, name="admin_logout"),
     path("invite/<str:token>/", invitation_accept_view, name="invitation_accept"),
+    path("media/<path:path>", media_file, name="media"),
 ]
@@ -1,16 +1,34 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.views.decorators.http import require_safe
+from django.views.static import serve
 from django.contrib import messages
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from django.db.models import Q
-from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound
-from .serializers import ZoneSerializer, AmenitySerializer, AmenityListSerializer, SosRequestSerializer, FamilyMemberSerializer, FamilyInvitationSerializer, LostFoundSerializer
+from rest_framework.permissions import AllowAny, IsAdminUser
+from django.db.models import Count, Q
+from .models import Zone, Amenity, SosRequest, FamilyMember, FamilyInvitation, LostFound, LostFoundSubscription, Photo, TourGroup, TourGroupMember
+from .serializers import ZoneSerializer, AmenitySerializer, AmenityListSerializer, SosRequestSerializer, FamilyMemberSerializer, FamilyInvitationSerializer, LostFoundSerializer, LostFoundMatchSerializer, LostFoundSubscriptionSerializer, PhotoSerializer, SubscriptionHitSerializer, TourGroupSerializer, TourGroupMemberSerializer
+from . import locations
+from .exports import DATASETS, FORMATS, day_bounds, export_filename, parse_bound, stream_export
+from .photos import HashingUploadHandler, InvalidPhoto, similar_photos, store_upload
+from .load_shedding import shedder
+from . import metrics
+from . import response_cache
+from .row_serializers import serialize_rows
+from .search import search_lost_found
+from .matching import matches_for
+from .name_index import matching_ids
+from .realtime import publish_family_locations, location_message
+from .presence import OFFLINE, tracker as presence_tracker, phone_matches
+from user.hashing import HashingBusy
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 import secrets
 
 
@@ -24,7 +42,11 @@ def admin_login_view(request):
         username = request.POST.get("username")
         password = request.POST.get("password")
 
-        user = authenticate(request, username=username, password=password)
+        try:
+            user = authenticate(request, username=username, password=password)
+        except HashingBusy:
+            messages.error(request, "Too many sign-ins right now, please retry in a moment.")
+            return render(request, "admin_login.html", status=503)
 
         if user is not None and user.is_staff:
             login(request, user)
@@ -100,12 +122,14 @@ class ZoneViewSet(viewsets.ReadOnlyModelViewSet):
 def zones_list(request):
     """Get list of all active zones or create a new zone"""
     if request.method == 'GET':
-        zones = Zone.objects.filter(is_active=True)
-        serializer = ZoneSerializer(zones, many=True)
-        return Response({
-            'count': zones.count(),
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        def build():
+            results = serialize_rows(Zone.objects.filter(is_active=True), ZoneSerializer)
+            return {
+                'count': len(results),
+                'results': results
+            }
+        
+        return response_cache.cached_response('zones', (), build)
     
     elif request.method == 'POST':
         serializer = ZoneSerializer(data=request.data)
@@ -157,17 +181,21 @@ def amenities_list(request):
     """Get list of amenities with optional category filter or create a new amenity"""
     if request.method == 'GET':
         category = request.query_params.get('category', None)
-        queryset = Amenity.objects.filter(is_active=True)
         
-        if category:
-            queryset = queryset.filter(category=category)
+        def build():
+            queryset = Amenity.objects.filter(is_active=True)
+            
+            if category:
+                queryset = queryset.filter(category=category)
+            
+            results = serialize_rows(queryset, AmenityListSerializer)
+            return {
+                'count': len(results),
+                'category': category,
+                'results': results
+            }
         
-        serializer = AmenityListSerializer(queryset, many=True)
-        return Response({
-            'count': queryset.count(),
-            'category': category,
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        return response_cache.cached_response('amenities', (category,), build)
     
     elif request.method == 'POST':
         serializer = AmenitySerializer(data=request.data)
@@ -203,10 +231,13 @@ def amenities_detail(request, pk):
 @permission_classes([AllowAny])
 def amenities_categories(request):
     """Get list of all amenity categories"""
-    categories = Amenity.CATEGORY_CHOICES
-    return Response({
-        'categories': [{'value': value, 'label': label} for value, label in categories]
-    }, status=status.HTTP_200_OK)
+    def build():
+        categories = Amenity.CATEGORY_CHOICES
+        return {
+            'categories': [{'value': value, 'label': label} for value, label in categories]
+        }
+    
+    return response_cache.cached_response('amenity_categories', (), build)
 
 
 # SOS Request APIs
@@ -221,10 +252,10 @@ def sos_requests_list(request):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        serializer = SosRequestSerializer(queryset, many=True)
+        results = serialize_rows(queryset, SosRequestSerializer)
         return Response({
-            'count': queryset.count(),
-            'results': serializer.data
+            'count': len(results),
+            'results': results
         }, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
@@ -308,9 +339,21 @@ def family_members_detail(request, pk):
         serializer = FamilyMemberSerializer(family_member, data=request.data, partial=True)
         if serializer.is_valid():
             # If location is being updated, set last_location_update
-            if 'latitude' in request.data or 'longitude' in request.data:
+            location_changed = 'latitude' in request.data or 'longitude' in request.data
+            if location_changed:
                 family_member.last_location_update = timezone.now()
-            serializer.save()
+            family_member = serializer.save()
+            if location_changed:
+                publish_family_locations([(
+                    family_member.user_email,
+                    location_message(
+                        family_member.id,
+                        None,
+                        family_member.latitude,
+                        family_member.longitude,
+                        family_member.last_location_update,
+                    ),
+                )])
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -339,6 +382,13 @@ def update_user_location(request):
             {'detail': 'latitude and longitude are required'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    try:
+        latitude, longitude = locations.coordinate(latitude), locations.coordinate(longitude)
+    except ValueError:
+        return Response(
+            {'detail': 'latitude and longitude must be numbers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     try:
         # Get current user's details to find records where they appear as a family member
@@ -349,21 +399,30 @@ def update_user_location(request):
         except User.DoesNotExist:
             user_name = user_email.split('@')[0]
         
-        # Phone is generated as: email_prefix_hash
-        # So we need to find records where phone matches this pattern
-        # The phone format is: email_prefix + '_' + hash
-        email_prefix = user_email.split('@')[0]
-        
-        # Update records where current user appears as a family member in others' lists
-        # These are records where user_email != current_user_email
-        # and phone starts with the email prefix (since phone is generated from email)
-        updated_count = FamilyMember.objects.filter(
-            is_active=True,
-            phone__startswith=email_prefix + '_'
-        ).exclude(user_email=user_email).update(
+        # Update records where current user appears as a family member in others' lists:
+        # other users' records whose phone was generated from this email
+        watchers = [
+            (member_id, watcher_email)
+            for member_id, watcher_email, phone in locations.tracking_rows([user_email])
+            .exclude(user_email=user_email)
+            .values_list('id', 'user_email', 'phone')
+            if phone_matches(phone, user_email)
+        ]
+        records = FamilyMember.objects.filter(id__in=[member_id for member_id, _ in watchers])
+        updated_at = timezone.now()
+        updated_count = records.update(
             latitude=latitude,
             longitude=longitude,
-            last_location_update=timezone.now()
+            last_location_update=updated_at
+        )
+        
+        presence_tracker.touch(user_email)
+        locations.store(user_email, latitude, longitude, updated_at)
+        
+        # Push the new position to every family that tracks this user
+        publish_family_locations(
+            (watcher_email, location_message(member_id, user_email, latitude, longitude, updated_at))
+            for member_id, watcher_email in watchers
         )
         
         return Response({
@@ -377,6 +436,67 @@ def update_user_location(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def presence_ping(request):
+    """Heartbeat for a user whose app is open but not sending other requests"""
+    if request.user.is_authenticated:
+        user_email = request.user.email
+    else:
+        user_email = request.data.get('user_email')
+    
+    if not user_email:
+        return Response(
+            {'detail': 'user_email is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    presence_tracker.touch(user_email)
+    presence, _ = presence_tracker.get(user_email)
+    return Response({'status': presence}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def family_presence(request):
+    """Get online/away/offline status for every member in a user's family list"""
+    user_email = request.query_params.get('user_email', None)
+    if not user_email:
+        return Response(
+            {'detail': 'user_email parameter is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    members = list(
+        FamilyMember.objects.filter(user_email=user_email, is_active=True).values_list('id', 'name', 'phone')
+    )
+    # Members joined through invitations, whose phone values encode their email
+    invitations = FamilyInvitation.objects.filter(
+        Q(inviter_email=user_email) | Q(invitee_email=user_email), status='accepted'
+    ).values_list('inviter_email', 'invitee_email')
+    relatives = {invitee if inviter == user_email else inviter for inviter, invitee in invitations}
+    member_emails = {
+        member_id: next((email for email in relatives if phone_matches(phone, email)), None)
+        for member_id, _, phone in members
+    }
+    presence = presence_tracker.get_many(set(member_emails.values()) - {None})
+    
+    results = []
+    for member_id, name, phone in members:
+        member_status, last_seen = presence.get(member_emails[member_id], (OFFLINE, None))
+        results.append({
+            'member_id': member_id,
+            'name': name,
+            'status': member_status,
+            'last_seen': datetime.fromtimestamp(last_seen, tz=dt_timezone.utc).isoformat() if last_seen else None,
+        })
+    
+    return Response({
+        'count': len(results),
+        'results': results
+    }, status=status.HTTP_200_OK)
+
+
 # Family Invitation APIs
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -449,10 +569,8 @@ def accept_family_invitation(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Check if invitation is expired
+    # Check if invitation is expired (the expire_invitations job updates the status)
     if invitation.is_expired():
-        invitation.status = 'expired'
-        invitation.save()
         return Response(
             {'detail': 'This invitation has expired'},
             status=status.HTTP_400_BAD_REQUEST
@@ -593,6 +711,143 @@ def accept_family_invitation(request):
         }, status=status.HTTP_200_OK)
 
 
+# Tour Group APIs
+def _tour_group_links(request, group):
+    base_url = request.build_absolute_uri('/').rstrip('/')
+    return {
+        # Only shown to the leader who created the group; lists leave it out
+        'join_token': group.join_token,
+        'join_link': f"{base_url}/api/tour-groups/join/?token={group.join_token}",
+        # Rendered as a QR code by the app so members can scan to join
+        'qr_payload': f"kumbhsuraksha://group?token={group.join_token}",
+    }
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def tour_groups_list(request):
+    """Get the tour groups a user belongs to or create a new tour group"""
+    if request.method == 'GET':
+        user_email = request.query_params.get('user_email', None)
+        if not user_email:
+            return Response(
+                {'detail': 'user_email parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = TourGroup.objects.filter(
+            id__in=TourGroupMember.objects.filter(user_email=user_email).values('group_id'),
+            is_active=True
+        ).annotate(member_count=Count('members'))
+        serializer = TourGroupSerializer(queryset, many=True)
+        return Response({
+            'count': len(serializer.data),
+            'results': serializer.data
+        }, status=status.HTTP_200_OK)
+    
+    elif request.method == 'POST':
+        serializer = TourGroupSerializer(data=request.data)
+        if serializer.is_valid():
+            group = serializer.save(join_token=secrets.token_urlsafe(16))
+            leader_name = request.data.get('leader_name') or group.leader_email.split('@')[0]
+            TourGroupMember.objects.create(group=group, user_email=group.leader_email, name=leader_name)
+            group.member_count = 1
+            return Response({
+                'group': TourGroupSerializer(group).data,
+                **_tour_group_links(request, group),
+            }, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def join_tour_group(request):
+    """Get tour group details by join token or join the group"""
+    token = request.query_params.get('token') or request.data.get('token')
+    
+    if not token:
+        return Response(
+            {'detail': 'token is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        group = TourGroup.objects.annotate(member_count=Count('members')).get(join_token=token, is_active=True)
+    except TourGroup.DoesNotExist:
+        return Response(
+            {'detail': 'Invalid join token'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if request.method == 'GET':
+        return Response({'group': TourGroupSerializer(group).data}, status=status.HTTP_200_OK)
+    
+    elif request.method == 'POST':
+        user_email = request.data.get('user_email')
+        if not user_email:
+            return Response(
+                {'detail': 'user_email is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # A single row per member replaces the N x (N-1) pairwise FamilyMember links
+        member, created = TourGroupMember.objects.get_or_create(
+            group=group,
+            user_email=user_email,
+            defaults={'name': request.data.get('name') or user_email.split('@')[0]},
+        )
+        if created:
+            group.member_count += 1
+        return Response({
+            'detail': 'Successfully joined the group' if created else 'You are already in this group',
+            'group': TourGroupSerializer(group).data,
+            'member': TourGroupMemberSerializer(member).data,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def tour_group_positions(request, pk):
+    """Get the last known position of every member of a tour group, for its members or holders of its join token"""
+    try:
+        group = TourGroup.objects.get(pk=pk, is_active=True)
+    except TourGroup.DoesNotExist:
+        return Response(
+            {'detail': 'Tour group not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    members = list(group.members.values_list('id', 'user_email', 'name'))
+    token = request.query_params.get('token', '')
+    if not secrets.compare_digest(token.encode(), group.join_token.encode()) and not (
+        request.user.is_authenticated
+        and request.user.email.lower() in {user_email.lower() for _, user_email, _ in members}
+    ):
+        return Response(
+            {'detail': 'Pass the group join token or sign in as a member'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    positions = locations.get_many(email for _, email, _ in members)
+    
+    results = []
+    for member_id, user_email, name in members:
+        position = positions[user_email] or {}
+        results.append({
+            'member_id': member_id,
+            'user_email': user_email,
+            'name': name,
+            'lat': position.get('lat'),
+            'lng': position.get('lng'),
+            'last_location_update': position.get('last_location_update'),
+        })
+    
+    return Response({
+        'group_id': group.id,
+        'count': len(results),
+        'results': results
+    }, status=status.HTTP_200_OK)
+
+
 # Lost & Found APIs
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
@@ -602,36 +857,71 @@ def lost_found_list(request):
         report_type = request.query_params.get('type', None)  # 'lost' or 'found'
         status_filter = request.query_params.get('status', 'open')  # Filter by status
         search = request.query_params.get('search', None)  # Search query
-        
-        queryset = LostFound.objects.filter(is_active=True)
-        
-        if report_type:
-            queryset = queryset.filter(report_type=report_type)
-        
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
+        name = request.query_params.get('name', None)  # Person name, matched phonetically
+        name_matches = matching_ids(LostFound, name) if name else None
         
         if search:
-            queryset = queryset.filter(
-                Q(person_name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(location__icontains=search)
-            )
+            return _lost_found_search(request, search, report_type, status_filter, name_matches)
         
-        serializer = LostFoundSerializer(queryset, many=True)
-        return Response({
-            'count': queryset.count(),
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        def build():
+            queryset = LostFound.objects.filter(is_active=True).select_related('photo')
+            
+            if report_type:
+                queryset = queryset.filter(report_type=report_type)
+            
+            if status_filter:
+                queryset = queryset.filter(status=status_filter)
+            
+            if name_matches is not None:
+                queryset = queryset.filter(id__in=name_matches)
+            
+            serializer = LostFoundSerializer(queryset, many=True, context={'request': request})
+            return {
+                'count': queryset.count(),
+                'results': serializer.data
+            }
+        
+        if name_matches is not None:
+            return Response(build(), status=status.HTTP_200_OK)
+        # The unfiltered first screen is what every app opens with
+        variant = (report_type, status_filter)
+        return response_cache.cached_response('lost_found', variant, build)
     
     elif request.method == 'POST':
-        serializer = LostFoundSerializer(data=request.data)
+        serializer = LostFoundSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _lost_found_search(request, search, report_type, status_filter, name_matches=None):
+    """Ranked, paginated full-text search for lost_found_list"""
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return Response(
+            {'detail': 'page and page_size must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    total, reports = search_lost_found(
+        search,
+        filters={'report_type': report_type, 'status': status_filter},
+        page=page,
+        page_size=page_size,
+        restrict_to=name_matches,
+    )
+    serializer = LostFoundSerializer(reports, many=True, context={'request': request})
+    return Response({
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': serializer.data
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET', 'PATCH', 'DELETE'])
 @permission_classes([AllowAny])
 def lost_found_detail(request, pk):
@@ -645,11 +935,11 @@ def lost_found_detail(request, pk):
         )
     
     if request.method == 'GET':
-        serializer = LostFoundSerializer(report)
+        serializer = LostFoundSerializer(report, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'PATCH':
-        serializer = LostFoundSerializer(report, data=request.data, partial=True)
+        serializer = LostFoundSerializer(report, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -661,6 +951,259 @@ def lost_found_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def lost_found_matches(request, pk):
+    """Get ranked candidate matches for a lost/found report"""
+    try:
+        report = LostFound.objects.get(pk=pk, is_active=True)
+    except LostFound.DoesNotExist:
+        return Response(
+            {'detail': 'Report not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    serializer = LostFoundMatchSerializer(matches_for(report), many=True, context={'report_type': report.report_type})
+    return Response({
+        'count': len(serializer.data),
+        'results': serializer.data
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def lost_found_similar_photos(request, pk):
+    """Get other reports whose photo looks like this report's photo, most similar first"""
+    try:
+        report = LostFound.objects.select_related('photo').get(pk=pk, is_active=True)
+    except LostFound.DoesNotExist:
+        return Response(
+            {'detail': 'Report not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if report.photo is None or not report.photo.phash:
+        return Response(
+            {'detail': 'Report has no processed photo'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        max_distance = min(max(int(request.query_params.get('max_distance', 10)), 0), 16)
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response(
+            {'detail': 'max_distance and limit must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # The same photo attached to another report counts as distance 0
+    distances = {report.photo_id: 0}
+    for distance, photo_id in similar_photos(report.photo.phash, max_distance, exclude=report.photo_id):
+        distances[photo_id] = distance
+    
+    reports = (
+        LostFound.objects.filter(photo_id__in=distances, is_active=True)
+        .exclude(pk=report.pk)
+        .select_related('photo')
+    )
+    ranked = sorted(reports, key=lambda r: (distances[r.photo_id], -r.created_at.timestamp()))[:limit]
+    results = [
+        {'distance': distances[r.photo_id], 'report': LostFoundSerializer(r, context={'request': request}).data}
+        for r in ranked
+    ]
+    return Response({
+        'count': len(results),
+        'results': results
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def lost_found_subscriptions(request):
+    """Get a user's saved lost & found searches or create a new one"""
+    if request.method == 'GET':
+        user_email = request.query_params.get('user_email', None)
+        if not user_email:
+            return Response(
+                {'detail': 'user_email parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = LostFoundSubscription.objects.filter(user_email=user_email, is_active=True)
+        serializer = LostFoundSubscriptionSerializer(queryset, many=True)
+        return Response({
+            'count': len(serializer.data),
+            'results': serializer.data
+        }, status=status.HTTP_200_OK)
+    
+    elif request.method == 'POST':
+        serializer = LostFoundSubscriptionSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['DELETE'])
+@permission_classes([AllowAny])
+def lost_found_subscription_detail(request, pk):
+    """Cancel a saved lost & found search"""
+    try:
+        subscription = LostFoundSubscription.objects.get(pk=pk, is_active=True)
+    except LostFoundSubscription.DoesNotExist:
+        return Response(
+            {'detail': 'Subscription not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Soft delete; saving drops the subscription from the reverse index
+    subscription.is_active = False
+    subscription.save()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def lost_found_subscription_hits(request, pk):
+    """Get the reports that matched a saved lost & found search"""
+    try:
+        subscription = LostFoundSubscription.objects.get(pk=pk)
+    except LostFoundSubscription.DoesNotExist:
+        return Response(
+            {'detail': 'Subscription not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    hits = subscription.hits.filter(report__is_active=True).select_related('report__photo')
+    serializer = SubscriptionHitSerializer(hits, many=True)
+    return Response({
+        'count': len(serializer.data),
+        'results': serializer.data
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+@permission_classes([AllowAny])
+def photos_upload(request):
+    """Upload a photo as multipart field 'photo'; identical files are stored once"""
+    # Must be installed before request.data is first read
+    handler = HashingUploadHandler(request._request)
+    request.upload_handlers = [handler]
+    
+    uploaded = request.FILES.get('photo')
+    if handler.too_large:
+        return Response(
+            {'detail': f'Photo exceeds the {handler.max_size // (1024 * 1024)} MB limit'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    if uploaded is None:
+        return Response(
+            {'detail': 'photo file is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        photo, created = store_upload(uploaded, uploaded_by=request.data.get('user_email') or None)
+    except InvalidPhoto as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    finally:
+        uploaded.close()
+    
+    serializer = PhotoSerializer(photo, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def photos_detail(request, pk):
+    """Get an uploaded photo and its thumbnail URLs"""
+    try:
+        photo = Photo.objects.get(pk=pk)
+    except Photo.DoesNotExist:
+        return Response(
+            {'detail': 'Photo not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    serializer = PhotoSerializer(photo, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def load_shedding_stats(request):
+    """This worker's load and the requests it admitted and shed, by priority"""
+    return Response(shedder.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def prometheus_metrics(request):
+    """Request metrics of every worker process in Prometheus text format"""
+    return HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_dataset(request, dataset):
+    """
+    Stream a staff-only export of SOS requests or lost/found reports.
+    
+    Query parameters: output=ndjson|csv, compress=gzip, and either date=YYYY-MM-DD
+    for one day or since/until as ISO dates or datetimes.
+    """
+    if dataset not in DATASETS:
+        return Response(
+            {'detail': f"Unknown dataset. Use one of: {', '.join(DATASETS)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    output = request.query_params.get('output', 'ndjson')
+    if output not in FORMATS:
+        return Response(
+            {'detail': f"output must be one of: {', '.join(FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    compress = request.query_params.get('compress') == 'gzip'
+    
+    day = request.query_params.get('date')
+    try:
+        if day:
+            since, until = day_bounds(day)
+        else:
+            since = parse_bound(request.query_params['since']) if request.query_params.get('since') else None
+            until = parse_bound(request.query_params['until']) if request.query_params.get('until') else None
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(
+        stream_export(dataset, output, since, until, compress),
+        content_type='application/gzip' if compress else FORMATS[output][0],
+    )
+    filename = export_filename(dataset, output, compress, label=day)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_safe
+def media_file(request, path):
+    """
+    Serve uploaded photos and thumbnails.
+    
+    File names are content hashes, so a URL always refers to the same bytes and
+    clients may cache it forever. In production the front proxy should serve
+    MEDIA_ROOT directly with the same Cache-Control header.
+    """
+    if not path.startswith(('photos/', 'thumbs/')):
+        raise Http404('Not found')
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 # Web view for invitation acceptance
 def invitation_accept_view(request, token):
     """Web view that handles invitation links - redirects to app or shows web form"""
@@ -671,10 +1214,8 @@ def invitation_accept_view(request, token):
             'error': 'Invalid or expired invitation link'
         })
     
-    # Check if invitation is expired
+    # Check if invitation is expired (the expire_invitations job updates the status)
     if invitation.is_expired():
-        invitation.status = 'expired'
-        invitation.save()
         return render(request, 'invitation_error.html', {
             'error': 'This invitation has expired'
         })
@@ -717,7 +1258,16 @@ def invitation_accept_view(request, token):
             })
         
         # Authenticate user
-        user = authenticate(request, username=email, password=password)
+        try:
+            user = authenticate(request, username=email, password=password)
+        except HashingBusy as exc:
+            response = render(request, 'invitation_accept.html', {
+                'invitation': invitation,
+                'error': 'Too many sign-ins right now, please retry in a moment.',
+                'token': token,
+            }, status=503)
+            response['Retry-After'] = str(exc.wait)
+            return response
         if user is None:
             return render(request, 'invitation_accept.html', {
                 'invitation': invitation,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User
+from .models import RevokedToken, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -7,3 +7,13 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'is_staff', 'date_joined')
     search_fields = ('email', 'full_name')
     ordering = ('-date_joined',)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'token_type', 'user', 'expires_at', 'revoked_at')
+    list_filter = ('token_type', 'revoked_at')
+    search_fields = ('jti', 'user__email')
+    ordering = ('-revoked_at',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('revoked_at',)
@@ -0,0 +1,111 @@
+"""
+JWT authentication backed by a small in-process user cache.
+
+The token signature and expiry are still verified on every request; only the
+users-table lookup that follows is cached. Entries are dropped when the user
+is saved or deleted in this process (see user/signals.py) and expire after
+AUTH_USER_CACHE_TTL seconds, which bounds how long another worker process, or
+a queryset.update() that bypasses signals, can serve a stale user.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .revocation import store as revocation_store
+
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 10000
+
+
+class UserCache:
+    """Thread-safe LRU cache of user objects whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, user):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache(
+    getattr(settings, 'AUTH_USER_CACHE_SIZE', DEFAULT_SIZE),
+    getattr(settings, 'AUTH_USER_CACHE_TTL', DEFAULT_TTL),
+)
+
+
+def cache_key(user_id):
+    # Token claims and model fields may disagree on type (e.g. '5' vs 5)
+    return str(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that rejects revoked tokens and resolves the user from user_cache before the database"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_store.is_revoked(validated_token.get(api_settings.JTI_CLAIM, '')):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        cached = user_cache.get(cache_key(user_id))
+        if cached is None:
+            user = super().get_user(validated_token)
+            user_cache.set(cache_key(user_id), user)
+            return copy.copy(user)
+
+        # Same checks as JWTAuthentication.get_user, against the cached row
+        if api_settings.CHECK_USER_IS_ACTIVE and not cached.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(cached.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        # Each request gets its own instance so in-request changes don't leak into the cache
+        return copy.copy(cached)
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+
+from .hashing import hash_password, verify_password
+
+UserModel = get_user_model()
+
+
+def _needs_rehash(encoded):
+    """Whether a stored hash is not in the preferred hasher's current format"""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that hashes on the bounded pool in user/hashing.py"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown and known emails take the same time
+            hash_password(password)
+            return None
+
+        if not verify_password(password, user.password) or not self.user_can_authenticate(user):
+            return None
+        if _needs_rehash(user.password):
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,168 @@
+"""
+Password hashing on a bounded worker pool.
+
+PBKDF2 is deliberately expensive, and a login storm would otherwise tie up
+every request thread hashing while SOS and location requests wait. Hashing is
+run on PASSWORD_HASHING_WORKERS threads (hashlib releases the GIL, so each
+one uses a core) with at most PASSWORD_HASHING_QUEUE calls waiting. When that
+is full the call fails at once with HashingBusy, a 503 with Retry-After.
+
+A call that gets in still holds its request thread until its hash is done,
+so the pool caps a storm at workers + queue request threads per process.
+Size the queue so that cap stays well below the server's threads per process
+(gunicorn --threads, say), leaving the rest for SOS and location requests:
+with 32 threads, 4 workers and a queue of 12 keep 16 free.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 12
+DEFAULT_RETRY_AFTER = 2
+SAMPLE_SIZE = 1024  # recent calls kept for wait/run percentiles
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins right now, please retry in a moment.'
+    default_code = 'hashing_busy'
+
+    def __init__(self, retry_after, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns `wait` into a Retry-After header
+        self.wait = retry_after
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from PASSWORD_HASH_ITERATIONS.
+
+    Lowering the count for the festival makes new hashes cheaper. Stored
+    hashes keep the cost they were made with, and are only re-hashed on login
+    when the setting is raised above it, never lowered, so changing the
+    setting does not trigger a wave of extra hashing.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+    def must_update(self, encoded):
+        return self.decode(encoded)['iterations'] < self.iterations
+
+
+class _Timings:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return recent[min(int(len(recent) * p), len(recent) - 1)] if recent else 0.0
+
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(percentile(0.5) * 1000, 2),
+            'p95_ms': round(percentile(0.95) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+
+class HashingPool:
+    """Fixed thread pool with a bounded queue that rejects instead of waiting"""
+
+    def __init__(self, workers, queue_size, retry_after):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._wait = _Timings()
+        self._run = _Timings()
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn on the pool and wait for its result; raise HashingBusy if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy(self.retry_after)
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait.add(started - submitted)
+                    self._run.add(finished - started)
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._executor.submit(task).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self._in_flight,
+                'rejected': self._rejected,
+                'queue_wait': self._wait.summary(),
+                'hashing': self._run.summary(),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    getattr(settings, 'PASSWORD_HASHING_WORKERS', DEFAULT_WORKERS),
+                    getattr(settings, 'PASSWORD_HASHING_QUEUE', DEFAULT_QUEUE),
+                    getattr(settings, 'PASSWORD_HASHING_RETRY_AFTER', DEFAULT_RETRY_AFTER),
+                )
+    return _pool
+
+
+def hash_password(raw_password):
+    """make_password() on the hashing pool"""
+    return get_pool().run(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """check_password() on the hashing pool; never re-hashes, see PooledModelBackend"""
+    return get_pool().run(check_password, raw_password, encoded)
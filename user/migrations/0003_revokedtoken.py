@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(help_text='Token id (jti claim)', max_length=255, unique=True)),
+                ('token_type', models.CharField(blank=True, default='', help_text='access or refresh', max_length=20)),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the token expires anyway; the row can be deleted after this')),
+                ('revoked_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revoked_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'revoked_tokens',
+                'ordering': ['-revoked_at'],
+            },
+        ),
+    ]
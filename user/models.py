@@ -44,3 +44,19 @@ class User(AbstractUser):
         
     def __str__(self):
         return self.email
+
+
+class RevokedToken(models.Model):
+    """JWT that must no longer be accepted, identified by its jti claim"""
+    jti = models.CharField(max_length=255, unique=True, help_text="Token id (jti claim)")
+    token_type = models.CharField(max_length=20, blank=True, default='', help_text="access or refresh")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='revoked_tokens')
+    expires_at = models.DateTimeField(db_index=True, help_text="When the token expires anyway; the row can be deleted after this")
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'revoked_tokens'
+        ordering = ['-revoked_at']
+        
+    def __str__(self):
+        return f"{self.token_type or 'token'} {self.jti}"
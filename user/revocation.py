@@ -0,0 +1,159 @@
+"""
+Revoked JWT store.
+
+Revocations are written to the revoked_tokens table and mirrored in memory
+in every worker as a Bloom filter plus an exact set of token ids (jti). A
+token that is not in the Bloom filter, which is nearly every token, is
+accepted after a few hash probes with no lock and no query. The exact set
+answers the rare filter hit. Each worker pulls new revocations from the table
+at most every TOKEN_REVOCATION_SYNC_INTERVAL seconds, so checking an access
+token never touches the database. Refresh token checks use strict=True,
+which also asks the database on a memory miss and closes the sync window.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+DEFAULT_SYNC_INTERVAL = 5
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.001
+# Rebuild from scratch this often to drop tokens that have expired anyway
+REBUILD_INTERVAL = 60 * 60
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing of one blake2b digest"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        bits = -self.capacity * math.log(error_rate) / (math.log(2) ** 2)
+        self.size = max(int(math.ceil(bits)), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    """In-memory view of the revoked_tokens table, refreshed incrementally"""
+
+    def __init__(self, sync_interval, capacity, error_rate):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._exact = set()
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+
+    def _add(self, jti):
+        if jti in self._exact:
+            return
+        if self._bloom.count >= self._bloom.capacity:
+            # Past capacity the false positive rate climbs; reload with room to grow
+            self._rebuild(capacity=self._bloom.capacity * 2)
+            if jti in self._exact:
+                return
+        self._exact.add(jti)
+        self._bloom.add(jti)
+
+    def _rebuild(self, capacity=None):
+        from .models import RevokedToken
+
+        rows = list(
+            RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('id', 'jti').order_by('id')
+        )
+        self.capacity = max(capacity or self.capacity, len(rows) * 2)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        exact = set()
+        for _, jti in rows:
+            bloom.add(jti)
+            exact.add(jti)
+        self._bloom, self._exact = bloom, exact
+        if rows:
+            self._last_id = max(self._last_id, rows[-1][0])
+        self._next_rebuild = time.monotonic() + REBUILD_INTERVAL
+
+    def sync(self, force=False):
+        """Load revocations written by other workers since the last sync"""
+        from .models import RevokedToken
+
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            if now >= self._next_rebuild:
+                self._rebuild()
+            else:
+                new = RevokedToken.objects.filter(id__gt=self._last_id).values_list('id', 'jti').order_by('id')
+                for row_id, jti in new:
+                    self._add(jti)
+                    self._last_id = max(self._last_id, row_id)
+            self._next_sync = now + self.sync_interval
+
+    def is_revoked(self, jti, strict=False):
+        self.sync()
+        if jti in self._bloom and jti in self._exact:
+            return True
+        if strict:
+            from .models import RevokedToken
+            return RevokedToken.objects.filter(jti=jti).exists()
+        return False
+
+    def revoke(self, token, user=None):
+        """Revoke a validated simplejwt token; returns False if it was already revoked"""
+        from .models import RevokedToken
+
+        jti = token['jti']
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    token_type=token.get('token_type', ''),
+                    user=user,
+                    expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+                )
+            created = True
+        except IntegrityError:
+            created = False
+        with self._lock:
+            self._add(jti)
+        return created
+
+    def stats(self):
+        return {
+            'revoked': len(self._exact),
+            'bloom_capacity': self._bloom.capacity,
+            'bloom_bits': self._bloom.size,
+            'bloom_hashes': self._bloom.hash_count,
+        }
+
+
+store = RevocationStore(
+    getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL),
+    getattr(settings, 'TOKEN_REVOCATION_CAPACITY', DEFAULT_CAPACITY),
+    getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', DEFAULT_ERROR_RATE),
+)
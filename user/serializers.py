@@ -1,7 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from .hashing import hash_password
 from .models import User
+from .revocation import store as revocation_store
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -17,11 +22,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         }
     
     def create(self, validated_data):
-        user = User.objects.create_user(
-            email=validated_data['email'],
+        # Hash on the bounded pool, then save once with the finished hash
+        user = User(
+            email=User.objects.normalize_email(validated_data['email']),
             full_name=validated_data['full_name'],
-            password=validated_data['password']
+            password=hash_password(validated_data['password']),
         )
+        user.save()
         return user
 
 
@@ -54,3 +61,22 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ('id', 'email', 'full_name', 'date_joined', 'last_login')
         read_only_fields = ('id', 'email', 'date_joined', 'last_login')
 
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """Refresh serializer that rejects revoked refresh tokens and revokes them on rotation"""
+    
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # Revoking first means two concurrent refreshes with one token can't both succeed
+            if not revocation_store.revoke(refresh):
+                raise InvalidToken('Token has been revoked')
+        elif revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM], strict=True):
+            raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
+
+
+class LogoutSerializer(serializers.Serializer):
+    """Serializer for logout"""
+    refresh = serializers.CharField(write_only=True)
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import cache_key, user_cache
+
+
+def _invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(cache_key(getattr(instance, api_settings.USER_ID_FIELD)))
+
+
+post_save.connect(_invalidate_cached_user, sender=get_user_model(), dispatch_uid='invalidate_cached_user_on_save')
+post_delete.connect(_invalidate_cached_user, sender=get_user_model(), dispatch_uid='invalidate_cached_user_on_delete')
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import CachedJWTAuthentication, UserCache, user_cache
+
+
+class UserCacheTests(SimpleTestCase):
+    def test_entries_expire_after_the_ttl(self):
+        cache = UserCache(maxsize=10, ttl=60)
+        with mock.patch('time.monotonic', return_value=1000):
+            cache.set('1', 'ramesh')
+        with mock.patch('time.monotonic', return_value=1059):
+            self.assertEqual(cache.get('1'), 'ramesh')
+        with mock.patch('time.monotonic', return_value=1060):
+            self.assertIsNone(cache.get('1'))
+        self.assertEqual(cache.stats(), {'size': 0, 'hits': 1, 'misses': 1})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        cache.set('1', 'ramesh')
+        cache.set('2', 'sita')
+        cache.get('1')
+        cache.set('3', 'geeta')
+        self.assertEqual([cache.get(key) for key in ('1', '2', '3')], ['ramesh', None, 'geeta'])
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = get_user_model().objects.create_user(email='ramesh@example.com', password='secret', full_name='Ramesh')
+        self.token = AccessToken.for_user(self.user)
+
+    def authenticate(self):
+        return CachedJWTAuthentication().get_user(self.token)
+
+    def test_users_are_cached(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            cached = self.authenticate()
+        self.assertEqual(cached, self.user)
+        # Every request gets its own copy
+        self.assertIsNot(cached, self.authenticate())
+
+    def test_deactivating_evicts(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_changing_the_password_evicts(self):
+        self.authenticate()
+        self.user.set_password('changed')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.authenticate().check_password('changed'))
+
+    def test_deleting_evicts(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed) as raised:
+            self.authenticate()
+        self.assertEqual(raised.exception.detail['code'], 'user_not_found')
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from kumbh.models import FamilyInvitation
+from user.hashing import HashingBusy, HashingPool
+
+
+class HashingBusyTests(TestCase):
+    """Server-rendered sign-in forms answer a full hashing queue with the form and a 503"""
+
+    def setUp(self):
+        busy = mock.patch.object(HashingPool, 'run', side_effect=HashingBusy(2))
+        busy.start()
+        self.addCleanup(busy.stop)
+
+    def test_admin_login(self):
+        response = self.client.post('/admin-login/', {'username': 'admin@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 503)
+        self.assertContains(response, 'retry in a moment', status_code=503)
+
+    def test_invitation_accept_form(self):
+        FamilyInvitation.objects.create(
+            inviter_email='inviter@example.com',
+            invitee_email='invitee@example.com',
+            token='invitation-token',
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+        response = self.client.post(
+            '/invite/invitation-token/', {'email': 'invitee@example.com', 'password': 'secret'},
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertContains(response, 'retry in a moment', status_code=503)
+        self.assertEqual(response.templates[0].name, 'invitation_accept.html')
@@ -0,0 +1,97 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from kumbh.tests import TEST_CACHES
+from user.models import RevokedToken
+from user.revocation import BloomFilter, RevocationStore
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [uuid.uuid4().hex for _ in range(1000)]
+        for jti in added:
+            bloom.add(jti)
+        self.assertTrue(all(jti in bloom for jti in added))
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RevocationStoreTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ramesh@example.com', password='secret', full_name='Ramesh')
+        self.store = RevocationStore(sync_interval=5, capacity=100, error_rate=0.01)
+
+    def test_bloom_false_positives_fall_through_to_the_exact_check(self):
+        revoked = RefreshToken.for_user(self.user)
+        self.store.revoke(revoked)
+        with mock.patch.object(BloomFilter, '__contains__', return_value=True):
+            self.assertTrue(self.store.is_revoked(revoked['jti']))
+            self.assertFalse(self.store.is_revoked('never-revoked'))
+
+    def test_strict_checks_see_revocations_before_the_next_sync(self):
+        self.store.sync()
+        # Revoked through another worker
+        token = RefreshToken.for_user(self.user)
+        RevocationStore(sync_interval=5, capacity=100, error_rate=0.01).revoke(token)
+        self.assertFalse(self.store.is_revoked(token['jti']))
+        self.assertTrue(self.store.is_revoked(token['jti'], strict=True))
+        self.store.sync(force=True)
+        self.assertTrue(self.store.is_revoked(token['jti']))
+
+    def test_grows_past_its_capacity(self):
+        store = RevocationStore(sync_interval=5, capacity=2, error_rate=0.01)
+        tokens = [RefreshToken.for_user(self.user) for _ in range(5)]
+        for token in tokens:
+            self.assertTrue(store.revoke(token))
+        self.assertFalse(store.revoke(tokens[0]))
+        self.assertTrue(all(store.is_revoked(token['jti']) for token in tokens))
+        self.assertGreaterEqual(store.stats()['bloom_capacity'], 5)
+
+
+@override_settings(CACHES=TEST_CACHES, THROTTLE_CACHE='shared')
+class TokenEndpointTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.ramesh = User.objects.create_user(email='ramesh@example.com', password='secret', full_name='Ramesh')
+        self.sita = User.objects.create_user(email='sita@example.com', password='secret', full_name='Sita')
+
+    def refresh(self, token):
+        return self.client.post('/api/user/token/refresh/', {'refresh': str(token)}, content_type='application/json')
+
+    def test_rotation_revokes_the_old_refresh_token(self):
+        token = RefreshToken.for_user(self.ramesh)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()['tokens']['refresh']
+        self.assertTrue(RevokedToken.objects.filter(jti=token['jti'], token_type='refresh').exists())
+
+        # Reusing the old one is refused; the new one works once
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+        self.assertEqual(self.refresh(rotated).status_code, 401)
+
+    def test_logout_revokes_both_tokens(self):
+        token = RefreshToken.for_user(self.ramesh)
+        headers = {'Authorization': f'Bearer {token.access_token}'}
+        self.assertEqual(self.client.get('/api/user/profile/', headers=headers).status_code, 200)
+        response = self.client.post(
+            '/api/user/logout/', {'refresh': str(token)}, content_type='application/json', headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/user/profile/', headers=headers).status_code, 401)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_logout_checks_the_refresh_token_owner(self):
+        sitas = RefreshToken.for_user(self.sita)
+        response = self.client.post(
+            '/api/user/logout/', {'refresh': str(sitas)}, content_type='application/json',
+            headers={'Authorization': f'Bearer {RefreshToken.for_user(self.ramesh).access_token}'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertEqual(self.refresh(sitas).status_code, 200)
@@ -6,6 +6,9 @@ app_name = 'user'
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
+    path('logout/', views.logout, name='logout'),
+    path('token/refresh/', views.refresh_token, name='token-refresh'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('hashing-stats/', views.hashing_stats, name='hashing-stats'),
 ]
 
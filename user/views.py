@@ -1,12 +1,18 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from .hashing import get_pool
+from .revocation import store as revocation_store
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
-    UserProfileSerializer
+    UserProfileSerializer,
+    TokenRefreshSerializer,
+    LogoutSerializer
 )
 
 User = get_user_model()
@@ -58,6 +64,41 @@ def login(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def refresh_token(request):
+    """Exchange a refresh token for a new access token (and a new refresh token when rotating)"""
+    serializer = TokenRefreshSerializer(data=request.data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response({'tokens': serializer.validated_data}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def logout(request):
+    """Revoke the given refresh token and the access token used for this request"""
+    serializer = LogoutSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        refresh = RefreshToken(serializer.validated_data['refresh'])
+    except TokenError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(getattr(request.user, api_settings.USER_ID_FIELD)):
+        return Response(
+            {'detail': 'Refresh token belongs to another user'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    revocation_store.revoke(refresh, user=request.user)
+    if request.auth is not None:
+        revocation_store.revoke(request.auth, user=request.user)
+    return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
+
 class ProfileView(generics.RetrieveUpdateAPIView):
     """User profile endpoint - Get and Update"""
     serializer_class = UserProfileSerializer
@@ -65,3 +106,10 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         return self.request.user
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def hashing_stats(request):
+    """Password hashing pool load: queue wait, hashing time and rejections"""
+    return Response(get_pool().stats(), status=status.HTTP_200_OK)